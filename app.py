@@ -1,11 +1,13 @@
+# Imported first, so startup timings start before any heavy import
+from services.startup import get_startup_report, start_warmup
 import streamlit as st
 from dotenv import load_dotenv
 import os
 import uuid
-from database import Database
-from services.ai_service import AIService
-from services.job_service import JobService
-from services.ui_service import UIService
+from dataclasses import dataclass
+from config.db_config import TRANSCRIPT_SETTINGS
+from config.startup_config import STARTUP_SETTINGS
+from services.metrics import get_metrics
 
 # Load environment variables
 load_dotenv()
@@ -20,12 +22,110 @@ def apply_custom_styles():
         </style>
     """, unsafe_allow_html=True)
 
-def display_chat():
+WELCOME_MESSAGE = {
+    "role": "assistant",
+    "content": "Welcome! 👋 Please take a look at our available positions on the right and select the role you're interested in. I'll help guide you through the application process."
+}
+
+@dataclass
+class AppServices:
+    """The process-wide services a rerun uses"""
+    db: object
+    catalog: object
+    job_service: object
+    ui_service: object
+    transcript_store: object
+
+def build_services():
+    """Fetch the shared services from the process-wide resource pool, building any that are missing
+
+    LangChain, the LLM clients and pymongo are imported here rather than at startup.
+    """
+    report = get_startup_report()
+    with report.step("imports"):
+        from services.catalog_cache import JobCatalog
+        from services.interaction_logger import InteractionLogger
+        from services.job_service import JobService
+        from services.metrics import MetricsExporter
+        from services.resource_pool import get_resource_pool
+        from services.transcript_store import TranscriptStore
+        from services.ui_service import UIService
+    
+    pool = get_resource_pool()
+    metrics = get_metrics()
+    # Prometheus text format on a local endpoint (and/or file), once per process
+    pool.get_or_create("metrics_exporter", lambda: MetricsExporter(metrics).start())
+    with report.step("database"):
+        db = pool.get_database()
+    catalog = pool.get_or_create("job_catalog", lambda: JobCatalog(db), owner=db)
+    interaction_logger = pool.get_or_create(
+        "interaction_logger", lambda: metrics.collected("interaction_logger", InteractionLogger(db))
+    )
+    job_service = pool.get_or_create(
+        "job_service", lambda: JobService(db, catalog=catalog, interaction_logger=interaction_logger)
+    )
+    ui_service = pool.get_or_create("ui_service", lambda: UIService(job_service))
+    transcript_store = pool.get_or_create("transcript_store", lambda: TranscriptStore(db))
+    return AppServices(db, catalog, job_service, ui_service, transcript_store)
+
+def warm_up():
+    """Everything the first rerun would otherwise build or load while the candidate waits"""
+    report = get_startup_report()
+    get_metrics().register_collector("startup", report.stats)
+    services = build_services()
+    # The shared LLM router, prompt chain, classifiers and caches
+    with report.step("ai_service"):
+        from services.ai_service import AIService
+        AIService(
+            db_client=services.db,
+            catalog=services.catalog,
+            search_index=services.job_service.search_index,
+            transcript_store=services.transcript_store
+        )
+    # The catalog and its search index, the first page of jobs and the facet counts
+    with report.step("job_catalog"):
+        services.job_service.get_job_page()
+        services.job_service.get_facets()
+
+def get_services():
+    """The shared services, once the startup warm-up is done"""
+    warmup = start_warmup(warm_up, background=STARTUP_SETTINGS["background_warmup"])
+    if warmup.done:
+        # Raises the warm-up's error; the next rerun tries again
+        warmup.result()
+    else:
+        with st.spinner("Getting things ready..."):
+            warmup.result()
+    return build_services()
+
+def load_transcript(transcript_store):
+    """Show the latest window of the stored transcript, or the welcome message for a new chat"""
+    page = transcript_store.recent(st.session_state.session_id)
+    st.session_state.messages = page.messages or [WELCOME_MESSAGE]
+    st.session_state.transcript_before = page.before
+
+def record_messages(transcript_store, messages):
+    """Append messages to the chat and the stored transcript, keeping a bounded window on screen"""
+    st.session_state.messages.extend(messages)
+    transcript_store.append(st.session_state.session_id, messages)
+    if len(st.session_state.messages) > TRANSCRIPT_SETTINGS["window"] + TRANSCRIPT_SETTINGS["page_size"]:
+        # Back to the latest window; earlier messages stay one click away
+        load_transcript(transcript_store)
+
+def display_chat(transcript_store):
     # Create a container for messages
     chat_container = st.container()
     
     # Display messages in the container
     with chat_container:
+        # Older messages are only read when asked for
+        if st.session_state.get("transcript_before"):
+            if st.button("⬆️ Load earlier messages", key="load_earlier", use_container_width=True):
+                page = transcript_store.earlier(st.session_state.session_id, st.session_state.transcript_before)
+                st.session_state.messages = page.messages + st.session_state.messages
+                st.session_state.transcript_before = page.before
+                st.rerun()
+        
         for message in st.session_state.messages:
             if message["role"] == "assistant":
                 with st.chat_message("assistant", avatar="👩‍💼"):
@@ -34,126 +134,165 @@ def display_chat():
                 with st.chat_message("user", avatar="👤"):
                     st.write(message["content"])
 
-def main():
-    apply_custom_styles()
+def display_tips():
+    st.markdown("### 💡 Tips & Guidelines")
+    st.markdown("---")
     
-    # Initialize services
-    db = Database()
-    job_service = JobService(db)
-    ui_service = UIService(job_service)
-    ai_service = AIService(db_client=db)
+    st.markdown("""
+    **Getting Started:**
+    1. Browse available positions
+    2. Click 'I'm Interested' on roles you like
+    3. Chat with our AI assistant
     
-    # Initialize additional session state variables
-    if 'job_acknowledged' not in st.session_state:
-        st.session_state.job_acknowledged = False
+    **Tips for Success:**
+    - Be specific about your experience
+    - Ask questions about the role
+    - Share your relevant skills
+    - Discuss your career goals
+    """)
+    
+    st.markdown("---")
+
+def main():
+    # On a cold start the shared services are built while the static page renders
+    start_warmup(warm_up, background=STARTUP_SETTINGS["background_warmup"])
+    apply_custom_styles()
     
     # Create three columns with custom widths
     tips_col, chat_col, jobs_col = st.columns([0.25, 0.45, 0.30])
     
-    # Left column - Tips and Guidelines
+    # The static parts of the page render before the services are needed, so the first paint never waits on them
     with tips_col:
-        st.markdown("### 💡 Tips & Guidelines")
+        display_tips()
+    with chat_col:
+        st.title("Careers Assistant 👩‍💼")
         st.markdown("---")
-        
-        st.markdown("""
-        **Getting Started:**
-        1. Browse available positions
-        2. Click 'I'm Interested' on roles you like
-        3. Chat with our AI assistant
-        
-        **Tips for Success:**
-        - Be specific about your experience
-        - Ask questions about the role
-        - Share your relevant skills
-        - Discuss your career goals
-        """)
-        
+    with jobs_col:
+        st.markdown("### 📋 Available Positions")
         st.markdown("---")
+    get_startup_report().mark("first_paint")
+    
+    with chat_col:
+        services = get_services()
+    from services.ai_service import AIService
+    db, catalog, job_service = services.db, services.catalog, services.job_service
+    ui_service, transcript_store = services.ui_service, services.transcript_store
+    
+    # With read_by_session_id the session id lives in the URL, so a reload or reconnect resumes the chat
+    if "session_id" not in st.session_state:
+        resume = TRANSCRIPT_SETTINGS["read_by_session_id"]
+        st.session_state.session_id = (resume and st.query_params.get("session")) or str(uuid.uuid4())
+        if resume:
+            st.query_params["session"] = st.session_state.session_id
+    session_id = st.session_state.session_id
+    
+    ai_service = AIService(
+        db_client=db, catalog=catalog, search_index=job_service.search_index, transcript_store=transcript_store
+    )
+    
+    # Load only the latest messages of a new or resumed chat
+    if "messages" not in st.session_state:
+        load_transcript(transcript_store)
+        # A resumed session continues the application it had started
+        if not st.session_state.get("selected_job"):
+            st.session_state.selected_job = ai_service.session_manager.get_user_data(session_id).selected_job
+            st.session_state.application_stage = ai_service.get_application_stage(session_id)
+    
+    # Initialize additional session state variables
+    if 'job_acknowledged' not in st.session_state:
+        st.session_state.job_acknowledged = False
     
     # Middle column - Chat Interface
     with chat_col:
-        st.title("Careers Assistant 👩‍💼")
-        st.markdown("---")
-        
-        # Initialize session state for messages if not exists
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-            
         # Display chat messages
-        display_chat()
+        display_chat(transcript_store)
         
         # Chat input
         if prompt := st.chat_input("Type your message here...", key="chat_input"):
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            with st.chat_message("user", avatar="👤"):
+                st.write(prompt)
             
-            response = ai_service.generate_career_response(
-                user_input=prompt,
-                message_history=st.session_state.messages,
-                user_context={}
-            )
+            # Stream the reply into a placeholder while it is generated
+            with st.chat_message("assistant", avatar="👩‍💼"):
+                placeholder = st.empty()
+                # The conversation memory keeps its own history (rebuilt from the stored transcript)
+                response = ai_service.generate_career_response(
+                    user_input=prompt,
+                    user_context={"selected_job": st.session_state.get("selected_job")},
+                    stream_handler=ai_service.create_stream_handler(placeholder)
+                )
+                # Local and cached answers arrive whole
+                placeholder.markdown(response)
             
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            record_messages(transcript_store, [
+                {"role": "user", "content": prompt},
+                {"role": "assistant", "content": response}
+            ])
+            # Queued and written in batches off the request path
+            job_service.save_interaction(st.session_state.session_id, prompt, response)
+            st.session_state.application_stage = ai_service.get_application_stage(st.session_state.session_id)
             st.rerun()
     
     # Right column - Jobs Display
     with jobs_col:
-        st.markdown("### 📋 Available Positions")
-        st.markdown("---")
-        
         # Search box for jobs
         search_term = st.text_input("🔍 Search positions", key="job_search")
         
-        # Get all jobs
-        all_jobs = job_service.match_jobs(search_term)
+        # Narrow the list by category, location or type
+        with st.expander("Filters", expanded=False):
+            filters = ui_service.display_job_filters()
         
-        if not all_jobs:
+        # Only the current page of job summaries is fetched and rendered
+        page = ui_service.get_job_page(search_term, filters=filters)
+        
+        if not page.jobs:
             st.info("No positions are currently available.")
         else:
-            for idx, job in enumerate(all_jobs):
+            for job in page.jobs:
                 with st.expander(f"🔸 {job['title']}", expanded=False):
                     st.markdown(f"""
                         **Location:** {job.get('location', 'Not specified')}  
                         **Type:** {job.get('type', 'Not specified')}
                     """)
                     
-                    if job.get('description'):
-                        st.markdown("**Description:**")
-                        description = job['description']
-                        if len(description) > 150:
-                            st.markdown(f"{description[:150]}...")
-                        else:
-                            st.markdown(description)
+                    ui_service.display_job_description(job)
                     
                     # Make the "I'm Interested" button more prominent
                     if st.button("📝 I'm Interested in This Role", 
-                               key=f"interest_{idx}_{job['title']}", 
+                               key=f"interest_{job['_id']}", 
                                use_container_width=True):
                         st.session_state.selected_job = job['title']
                         st.session_state.job_acknowledged = False
                         st.session_state.application_stage = 'initial'
                         
-                        # Add the job selection message
-                        st.session_state.messages.append({
-                            "role": "system",
-                            "content": f"You have selected the {job['title']} position."
-                        })
-                        
-                        # Immediately add the name request message
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": f"Great choice! I'll help you with your application for the {job['title']} position. To get started, could you please tell me your full name?"
-                        })
+                        # Add the job selection message and immediately the name request
+                        selection_messages = [
+                            {
+                                "role": "system",
+                                "content": f"You have selected the {job['title']} position."
+                            },
+                            {
+                                "role": "assistant",
+                                "content": f"Great choice! I'll help you with your application for the {job['title']} position. To get started, could you please tell me your full name?"
+                            }
+                        ]
+                        # The LLM sees the name request too, not only the chat on screen
+                        ai_service.remember_messages(session_id, selection_messages)
+                        record_messages(transcript_store, selection_messages)
                         
                         st.rerun()
+            
+            ui_service.display_page_controls(page)
+    
+    # Startup timings, once the first page and the warm-up are both done
+    report = get_startup_report()
+    if not report.reached("first_page"):
+        report.mark("first_page")
+        if report.reached("services_ready"):
+            report.log()
 
 if __name__ == "__main__":
-    # Initialize session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = [{
-            "role": "assistant",
-            "content": "Welcome! 👋 Please take a look at our available positions on the right and select the role you're interested in. I'll help guide you through the application process."
-        }]
-    
+    # Initialize session state (messages are loaded from the transcript store in main)
     if "selected_job" not in st.session_state:
         st.session_state.selected_job = None
     
@@ -165,5 +304,7 @@ if __name__ == "__main__":
         page_icon="💼",
         layout="wide"
     )
-    main()
+    # Whole-rerun duration; st.rerun() ends a run without counting as an error
+    with get_metrics().span("app.rerun", sampled=False):
+        main()
 
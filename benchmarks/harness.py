@@ -0,0 +1,355 @@
+"""Offline fixtures shared by the benchmarks
+
+Everything runs without network access: MongoDB is mongomock (or a
+throwaway mongod given with --mongo-uri) and the chat model is LangChain's
+FakeListChatModel, or the LLM router pointed at tools.fake_openai_server,
+installed into the process-wide ResourcePool.
+
+mongomock scans whole collections, so timings that touch MongoDB grow with
+the collection (e.g. response_cache during the memory benchmarks); use
+--mongo-uri for numbers that reflect indexed lookups.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import timeit
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Run from the repository root: python -m benchmarks.rerun
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit.config
+import streamlit.logger
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from pymongo import MongoClient, monitoring
+
+from config.db_config import DATABASE_SETTINGS
+from database import job_snippet
+from services.catalog_cache import JobCatalog
+from services.resource_pool import ResourcePool, install_resource_pool
+
+# "missing ScriptRunContext" warnings are expected outside `streamlit run`;
+# setting the option keeps a later config reload from restoring the level
+streamlit.config.set_option("logger.level", "error")
+streamlit.logger.set_log_level("error")
+
+TITLE_WORDS = [
+    "Warehouse", "Associate", "Driver", "Delivery", "Forklift", "Operator", "Picker",
+    "Packer", "Shift", "Lead", "Supervisor", "Inventory", "Clerk", "Loader", "Sorter",
+    "Maintenance", "Technician", "Customer", "Service", "Cashier", "Stocker", "Night",
+]
+LOCATIONS = [
+    "Dallas, TX", "Austin, TX", "Phoenix, AZ", "Columbus, OH", "Atlanta, GA",
+    "Reno, NV", "Memphis, TN", "Chicago, IL", "Newark, NJ", "Tacoma, WA",
+]
+CATEGORIES = ["Warehouse", "Transportation", "Retail", "Maintenance", "Customer Service", "Management"]
+DESCRIPTION_WORDS = (
+    "fast paced team environment lift up to fifty pounds scan pick pack ship orders safety "
+    "first weekly pay benefits overtime available flexible schedules training provided"
+).split()
+
+DEFAULT_REPLY = "Thanks for your question! 😊 Please browse the open positions on the right to get started."
+
+
+def make_jobs(count: int, seed: int = 7) -> List[dict]:
+    """Synthetic postings shaped like init_db.transform_job output"""
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(count):
+        title = " ".join(rng.sample(TITLE_WORDS, 2))
+        jobs.append({
+            "title": f"{title} {index}",
+            "location": rng.choice(LOCATIONS),
+            "type": rng.choice(["FULL_TIME", "PART_TIME"]),
+            "description": " ".join(rng.choices(DESCRIPTION_WORDS, k=60)),
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 2)),
+            "requisition_id": f"REQ-{index:07d}",
+            "apply_url": f"https://example.com/jobs/{index}",
+            "employment_types": ["FULL_TIME"],
+            "job_location": {},
+        })
+        jobs[-1]["snippet"] = job_snippet(jobs[-1]["description"])
+    return jobs
+
+
+def make_history(count: int) -> List[dict]:
+    """A chat transcript of count messages without personal data"""
+    messages = []
+    for index in range(count):
+        if index % 2 == 0:
+            messages.append({"role": "user", "content": f"Can you tell me more about shift option {index}?"})
+        else:
+            messages.append({"role": "assistant", "content": f"Sure! Option {index} runs five days a week. 😊"})
+    return messages
+
+
+def mongo_client(mongo_uri: Optional[str] = None, event_listeners: Optional[list] = None):
+    """A client for the given throwaway mongod, or an in-memory mongomock client"""
+    if mongo_uri:
+        return MongoClient(mongo_uri, event_listeners=event_listeners or [])
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("Offline benchmarks need mongomock (pip install -r requirements-dev.txt) or --mongo-uri")
+    _patch_mongomock_bulk()
+    return mongomock.MongoClient()
+
+
+def _patch_mongomock_bulk() -> None:
+    """Let mongomock's bulk builder accept the sort argument pymongo >= 4.9 passes"""
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if getattr(method, "_accepts_sort", False):
+            continue
+
+        def accept_sort(self, *args, _method=method, sort=None, **kwargs):
+            return _method(self, *args, **kwargs)
+
+        accept_sort._accepts_sort = True
+        setattr(BulkOperationBuilder, name, accept_sort)
+
+
+# Collection methods mapped to the server command pymongo would send
+MONGOMOCK_COMMANDS = {
+    "find": "find",
+    "find_one": "find",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "replace_one": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "find_one_and_update": "findAndModify",
+    "find_one_and_replace": "findAndModify",
+    "find_one_and_delete": "findAndModify",
+    "count_documents": "aggregate",
+    "aggregate": "aggregate",
+    "distinct": "distinct",
+    "estimated_document_count": "count",
+    "create_indexes": "createIndexes",
+}
+BULK_COMMANDS = {
+    "InsertOne": "insert",
+    "UpdateOne": "update",
+    "UpdateMany": "update",
+    "ReplaceOne": "update",
+    "DeleteOne": "delete",
+    "DeleteMany": "delete",
+}
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Counts the commands an application sends to MongoDB, by command name
+
+    Pass it to MongoClient(event_listeners=[...]) for a real server. mongomock
+    has no command monitoring, so instrument_mongomock() counts its collection
+    calls instead, mapped to the commands pymongo would send.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._local = threading.local()
+
+    def started(self, event) -> None:
+        self._add(event.command_name)
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def total(self, exclude: Iterable[str] = ("getMore", "endSessions")) -> int:
+        counts = self.counts()
+        return sum(count for name, count in counts.items() if name not in exclude)
+
+    @contextlib.contextmanager
+    def instrument_mongomock(self):
+        from mongomock.collection import Collection
+
+        originals = {name: getattr(Collection, name) for name in MONGOMOCK_COMMANDS}
+        originals["bulk_write"] = Collection.bulk_write
+        for name, method in originals.items():
+            setattr(Collection, name, self._counting(name, method))
+        try:
+            yield self
+        finally:
+            for name, method in originals.items():
+                setattr(Collection, name, method)
+
+    def _counting(self, name: str, method: Callable) -> Callable:
+        counter = self
+
+        def wrapper(collection, *args, **kwargs):
+            # mongomock calls its own public methods internally; count the outermost call
+            depth = getattr(counter._local, "depth", 0)
+            if depth == 0:
+                if name == "bulk_write":
+                    requests = args[0] if args else kwargs.get("requests", [])
+                    # One command per kind of write, as an unordered bulk sends them
+                    for command in {BULK_COMMANDS.get(type(r).__name__, "update") for r in requests}:
+                        counter._add(command)
+                else:
+                    counter._add(MONGOMOCK_COMMANDS[name])
+            counter._local.depth = depth + 1
+            try:
+                return method(collection, *args, **kwargs)
+            finally:
+                counter._local.depth = depth
+
+        return wrapper
+
+    def _add(self, command: str) -> None:
+        with self._lock:
+            self._counts[command] += 1
+
+
+class OfflineEnvironment:
+    """A ResourcePool on offline clients with a seeded job catalog
+
+    With --mongo-uri the jobs collection of the configured database is
+    replaced, so only point it at a throwaway mongod.
+    """
+
+    def __init__(
+        self,
+        job_count: int,
+        mongo_uri: Optional[str] = None,
+        reply: str = DEFAULT_REPLY,
+        llm_base_url: Optional[str] = None,
+        event_listeners: Optional[list] = None,
+    ):
+        client = mongo_client(mongo_uri, event_listeners)
+        jobs = client[DATABASE_SETTINGS["database_name"]].jobs
+        jobs.delete_many({})
+        if job_count:
+            jobs.insert_many(make_jobs(job_count))
+
+        # With llm_base_url the pooled LLM router talks to a fake server instead
+        self.pool = install_resource_pool(ResourcePool(
+            mongo_client=client,
+            chat_llm=None if llm_base_url else FakeListChatModel(responses=[reply]),
+            llm_base_url=llm_base_url,
+            llm_api_key="offline" if llm_base_url else None,
+            health_check_interval=float("inf"),
+        ))
+        self.db = self.pool.get_database()
+        self.catalog = self.pool.get_or_create(
+            "job_catalog", lambda: JobCatalog(self.db, use_change_stream=False), owner=self.db
+        )
+        self.catalog.get_jobs()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow stdout (debug prints) while keeping their cost in the measurement"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """Time fn like timeit: calibrate a loop count, then report per-call seconds"""
+    timer = timeit.Timer(fn)
+    with quiet():
+        number = 1
+        while True:
+            elapsed = timer.timeit(number)
+            if elapsed >= min_time or number >= 1_000_000:
+                break
+            number *= 10 if elapsed < min_time / 10 else 2
+        samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def percentiles(samples: List[float], points=(50, 95, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles plus the maximum"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {
+        f"p{point}": ordered[max(0, -(-point * len(ordered) // 100) - 1)]
+        for point in points
+    }
+    result["max"] = ordered[-1]
+    return result
+
+
+def environment_info() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """Median change for every benchmark present in both runs"""
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median"], result["median"]
+        change = (after - before) / before if before else 0.0
+        rows.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def load_json(path: str) -> Optional[dict]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def write_json(path: str, payload: dict) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(payload, file, indent=2, sort_keys=True)
+        file.write("\n")
+
@@ -0,0 +1,399 @@
+"""Concurrent application conversations driven through the service layer
+
+Each simulated candidate does what app.py does on their behalf:
+- loads the page and searches the open positions
+- asks a first question
+- clicks "I'm Interested" on a job
+- answers the eligibility questions, sometimes with an off-script
+  question in between
+
+Every chat turn is one rerun: AIService is built, generate_career_response
+answers, the interaction is logged and the application stage is read back.
+--sessions candidates run at once on their own threads, as Streamlit runs
+one script thread per session. The LLM is tools.fake_openai_server with
+configurable latency, reached through the pooled LLM router. MongoDB
+is mongomock, or a local throwaway mongod given with --mongo-uri.
+
+    python -m benchmarks.load --sessions 20 --candidates 100
+
+For large runs keep the fake LLM in its own process, so its threads do not
+compete with the candidates for the GIL:
+
+    python -m tools.fake_openai_server --port 8089 --latency 1.5 --token-delay 0.02 &
+    python -m benchmarks.load --sessions 200 --candidates 2000 \\
+        --llm-url http://127.0.0.1:8089/v1 --mongo-uri mongodb://localhost:27017
+
+Reports throughput, p50/p95/p99 latency per step, MongoDB commands per chat
+turn (background session and interaction writes included) and LLM calls per
+completed application.
+"""
+import argparse
+import contextlib
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import (
+    LOCATIONS,
+    MongoCommandCounter,
+    OfflineEnvironment,
+    environment_info,
+    format_seconds,
+    percentiles,
+    write_json,
+)
+from models.session_data import STAGE_COMPLETED, STAGE_NOT_ELIGIBLE
+from services.ai_service import AIService
+from services.interaction_logger import InteractionLogger
+from services.job_service import JobService
+from tools.fake_openai_server import FakeOpenAIServer
+
+DEFAULT_OUTPUT = "benchmarks/results/load-latest.json"
+
+WELCOME_MESSAGE = (
+    "Welcome! 👋 Please take a look at our available positions on the right and select the role "
+    "you're interested in. I'll help guide you through the application process."
+)
+FIRST_NAMES = ["Maria", "James", "Aisha", "Wei", "Carlos", "Olivia", "Dmitri", "Priya", "Kofi", "Emma"]
+LAST_NAMES = ["Garcia", "Smith", "Khan", "Chen", "Lopez", "Brown", "Ivanov", "Patel", "Mensah", "Jones"]
+SEARCHES = ["warehouse", "driver", "forklift operator", "night shift", "customer service", "picker packer"]
+FIRST_QUESTIONS = [
+    "Hi! What positions do you have in {location}?",
+    "Do you have any night shift jobs?",
+    "Which of these roles are full time?",
+    "Hello, I'm looking for warehouse work",
+    "What do I need to apply?",
+]
+OFF_SCRIPT_QUESTIONS = [
+    "How much does the {title} role pay?",
+    "Is there overtime available for this job?",
+    "Can you tell me more about the {title} position first?",
+]
+# Eligibility questions a candidate may answer "no" to, by position in the answer list
+CONSENT_ANSWER_INDEXES = (3, 4, 6)
+
+
+@dataclass
+class CandidateScript:
+    """What one simulated candidate will type, decided up front from the seed"""
+    search: str
+    first_question: str
+    job_title: str
+    answers: List[str]
+
+
+@dataclass
+class Recorder:
+    """Latency samples and outcomes shared by every worker thread"""
+    samples: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    outcomes: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, step: str, seconds: float) -> None:
+        with self.lock:
+            self.samples[step].append(seconds)
+
+    def outcome(self, name: str) -> None:
+        with self.lock:
+            self.outcomes[name] += 1
+
+    def error(self, exc: Exception) -> None:
+        with self.lock:
+            self.errors[type(exc).__name__] += 1
+
+
+def make_script(rng: random.Random, jobs: List[dict], ineligible_rate: float, question_rate: float) -> CandidateScript:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    job = rng.choice(jobs)
+    answers = [
+        f"My name is {first} {last}",
+        f"{rng.randint(200, 989)}-555-{rng.randint(0, 9999):04d}",
+        f"{first.lower()}.{last.lower()}{rng.randint(1, 999)}@example.com",
+        rng.choice(["Yes", f"I'm {rng.randint(18, 64)}"]),
+        rng.choice(["Yes", "Yes I am", "yep"]),
+        rng.choice(["Morning", "Night", "I prefer nights"]),
+        rng.choice(["Yes", "Sure", "absolutely"]),
+        rng.choice(["Email", "Phone", "please call me"]),
+    ]
+    if rng.random() < ineligible_rate:
+        index = rng.choice(CONSENT_ANSWER_INDEXES)
+        answers = answers[:index] + ["No"]
+    if rng.random() < question_rate:
+        question = rng.choice(OFF_SCRIPT_QUESTIONS).format(title=job["title"])
+        answers.insert(rng.randrange(1, len(answers)), question)
+    return CandidateScript(
+        search=rng.choice(SEARCHES),
+        first_question=rng.choice(FIRST_QUESTIONS).format(location=rng.choice(LOCATIONS)),
+        job_title=job["title"],
+        answers=answers,
+    )
+
+
+class Candidate:
+    """One browser session, replaying app.py's reruns for a script"""
+
+    def __init__(self, env: OfflineEnvironment, job_service: JobService, recorder: Recorder, think_time: float):
+        self.env = env
+        self.job_service = job_service
+        self.recorder = recorder
+        self.think_time = think_time
+        self.session_id = f"load-{uuid.uuid4().hex}"
+        self.messages = [{"role": "assistant", "content": WELCOME_MESSAGE}]
+        self.selected_job: Optional[str] = None
+        self.stage: Optional[str] = None
+
+    def run(self, script: CandidateScript) -> Optional[str]:
+        started = time.perf_counter()
+        self._timed("browse", lambda: self.job_service.get_job_page(""))
+        self._pause()
+        self._timed("search", lambda: self.job_service.get_job_page(script.search))
+        self._pause()
+        self._chat("question", script.first_question)
+        self._pause()
+        self._timed("select", lambda: self._select(script.job_title))
+        for answer in script.answers:
+            self._pause()
+            self._chat("answer", answer)
+            if self.stage in (STAGE_COMPLETED, STAGE_NOT_ELIGIBLE):
+                break
+        self.recorder.add("application", time.perf_counter() - started)
+        return self.stage
+
+    def _select(self, job_title: str) -> None:
+        # The "I'm Interested" button: canned messages, no model call
+        self.selected_job = job_title
+        self.messages.append({"role": "system", "content": f"You have selected the {job_title} position."})
+        self.messages.append({
+            "role": "assistant",
+            "content": f"Great choice! I'll help you with your application for the {job_title} position. "
+                       "To get started, could you please tell me your full name?"
+        })
+
+    def _chat(self, kind: str, prompt: str) -> None:
+        started = time.perf_counter()
+        # app.py builds AIService on every rerun
+        ai_service = AIService(db_client=self.env.db, catalog=self.env.catalog)
+        self.messages.append({"role": "user", "content": prompt})
+        response = ai_service.generate_career_response(
+            user_input=prompt,
+            message_history=self.messages,
+            user_context={"selected_job": self.selected_job},
+            session_id=self.session_id,
+        )
+        self.messages.append({"role": "assistant", "content": response})
+        self.job_service.save_interaction(self.session_id, prompt, response)
+        self.stage = ai_service.get_application_stage(self.session_id)
+        elapsed = time.perf_counter() - started
+        self.recorder.add("turn", elapsed)
+        self.recorder.add(f"turn:{kind}", elapsed)
+
+    def _timed(self, step: str, fn) -> None:
+        started = time.perf_counter()
+        fn()
+        self.recorder.add(step, time.perf_counter() - started)
+
+    def _pause(self) -> None:
+        if self.think_time:
+            time.sleep(random.expovariate(1 / self.think_time))
+
+
+def run_load(args) -> dict:
+    counter = MongoCommandCounter()
+    server = None
+    base_url = args.llm_url
+    if not base_url:
+        server = FakeOpenAIServer(latency=args.llm_latency, token_delay=args.token_delay, seed=args.seed)
+        base_url = server.start()
+    instrument = counter.instrument_mongomock() if not args.mongo_uri else contextlib.nullcontext()
+
+    with instrument:
+        print(f"Seeding {args.jobs} jobs...", file=sys.stderr)
+        env = OfflineEnvironment(
+            args.jobs, mongo_uri=args.mongo_uri, llm_base_url=base_url, event_listeners=[counter]
+        )
+        try:
+            interaction_logger = env.pool.get_or_create("interaction_logger", lambda: InteractionLogger(env.db))
+            job_service = JobService(env.db, catalog=env.catalog, interaction_logger=interaction_logger)
+            rng = random.Random(args.seed)
+            jobs = env.catalog.get_jobs()
+            scripts: "queue.Queue[CandidateScript]" = queue.Queue()
+            for _ in range(args.candidates):
+                scripts.put(make_script(rng, jobs, args.ineligible_rate, args.question_rate))
+
+            recorder = Recorder()
+
+            def worker() -> None:
+                while True:
+                    try:
+                        script = scripts.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        stage = Candidate(env, job_service, recorder, args.think_time).run(script)
+                    except Exception as e:
+                        recorder.error(e)
+                        recorder.outcome("error")
+                        continue
+                    if stage == STAGE_COMPLETED:
+                        recorder.outcome("completed")
+                    elif stage == STAGE_NOT_ELIGIBLE:
+                        recorder.outcome("not_eligible")
+                    else:
+                        recorder.outcome("incomplete")
+
+            # Setup traffic (seeding, indexes, the first catalog load) is not part of the load
+            counter.reset()
+            llm_before = llm_requests(server, base_url)
+            print(f"Running {args.candidates} candidates on {args.sessions} concurrent sessions...", file=sys.stderr)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr) if args.verbose else _discard_stdout():
+                with ThreadPoolExecutor(max_workers=args.sessions, thread_name_prefix="candidate") as executor:
+                    for _ in range(args.sessions):
+                        executor.submit(worker)
+            elapsed = time.perf_counter() - started
+            # Summaries still running are model calls this load caused
+            AIService(db_client=env.db, catalog=env.catalog).summarizer.close(wait=True)
+        finally:
+            # Flushes queued interactions and dirty sessions, so their writes are counted
+            with _discard_stdout():
+                env.close()
+    llm_calls = llm_requests(server, base_url) - llm_before
+    if server:
+        server.stop()
+
+    mongo_commands = counter.counts()
+    mongo_total = counter.total()
+    turns = len(recorder.samples["turn"])
+    completed = recorder.outcomes["completed"]
+
+    return {
+        "suite": "load",
+        "environment": environment_info(),
+        "config": {
+            "sessions": args.sessions,
+            "candidates": args.candidates,
+            "jobs": args.jobs,
+            "llm": args.llm_url or "in-process",
+            "llm_latency": None if args.llm_url else args.llm_latency,
+            "token_delay": None if args.llm_url else args.token_delay,
+            "think_time": args.think_time,
+            "ineligible_rate": args.ineligible_rate,
+            "question_rate": args.question_rate,
+            "mongo": "mongod" if args.mongo_uri else "mongomock",
+            "seed": args.seed,
+        },
+        "elapsed": elapsed,
+        "outcomes": dict(recorder.outcomes),
+        "errors": dict(recorder.errors),
+        "throughput": {
+            "turns_per_second": turns / elapsed if elapsed else 0.0,
+            "applications_per_second": completed / elapsed if elapsed else 0.0,
+        },
+        "latency": {step: {"count": len(samples), **percentiles(samples)} for step, samples in recorder.samples.items()},
+        "mongo": {
+            "commands": mongo_commands,
+            "total": mongo_total,
+            "per_turn": mongo_total / turns if turns else 0.0,
+        },
+        "llm": {
+            "calls": llm_calls,
+            "per_turn": llm_calls / turns if turns else 0.0,
+            "per_completed_application": llm_calls / completed if completed else None,
+        },
+    }
+
+
+def llm_requests(server: Optional[FakeOpenAIServer], base_url: str) -> int:
+    """Chat completion requests the fake server has received so far"""
+    if server:
+        return server.stats["requests"]
+    return httpx.get(f"{base_url.rstrip('/')}/stats", timeout=10).json().get("requests", 0)
+
+
+@contextlib.contextmanager
+def _discard_stdout():
+    # The services print diagnostics; keep the report readable
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def print_report(report: dict) -> None:
+    outcomes = report["outcomes"]
+    print(
+        f"{report['config']['candidates']} candidates on {report['config']['sessions']} sessions "
+        f"in {report['elapsed']:.1f} s: {outcomes.get('completed', 0)} completed, "
+        f"{outcomes.get('not_eligible', 0)} not eligible, {outcomes.get('incomplete', 0)} incomplete, "
+        f"{outcomes.get('error', 0)} failed"
+    )
+    if report["errors"]:
+        print("Errors: " + ", ".join(f"{name} x{count}" for name, count in report["errors"].items()))
+    throughput = report["throughput"]
+    print(
+        f"Throughput: {throughput['turns_per_second']:.1f} chat turns/s, "
+        f"{throughput['applications_per_second'] * 60:.1f} completed applications/min\n"
+    )
+
+    print(f"{'step':16} {'count':>7} {'p50':>11} {'p95':>11} {'p99':>11} {'max':>11}")
+    for step in ("browse", "search", "select", "turn", "turn:question", "turn:answer", "application"):
+        stats = report["latency"].get(step)
+        if not stats:
+            continue
+        print(
+            f"{step:16} {stats['count']:>7} " +
+            " ".join(f"{format_seconds(stats[key]):>11}" for key in ("p50", "p95", "p99", "max"))
+        )
+
+    mongo = report["mongo"]
+    breakdown = ", ".join(f"{name} {count}" for name, count in sorted(mongo["commands"].items()))
+    print(f"\nMongoDB commands per chat turn: {mongo['per_turn']:.2f} ({mongo['total']} total: {breakdown})")
+    llm = report["llm"]
+    per_application = llm["per_completed_application"]
+    per_application = f"{per_application:.2f}" if per_application is not None else "n/a"
+    print(
+        f"LLM calls per completed application: {per_application} "
+        f"({llm['calls']} total, {llm['per_turn']:.2f} per chat turn)"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent application conversations against the service layer")
+    parser.add_argument("--sessions", type=int, default=20, help="candidates chatting at the same time")
+    parser.add_argument("--candidates", type=int, default=100, help="conversations to run in total")
+    parser.add_argument("--jobs", type=int, default=200, help="catalog size")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before the fake LLM answers")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--llm-url",
+                        help="base URL of a fake server started with python -m tools.fake_openai_server; "
+                             "keeps its threads out of this process for large runs")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean seconds a candidate waits between actions (exponential)")
+    parser.add_argument("--ineligible-rate", type=float, default=0.15,
+                        help="fraction of candidates answering no to an eligibility question")
+    parser.add_argument("--question-rate", type=float, default=0.3,
+                        help="fraction of candidates asking an off-script question mid-application")
+    parser.add_argument("--mongo-uri", help="use a local throwaway mongod instead of mongomock")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--verbose", action="store_true", help="show the services' diagnostic output")
+    args = parser.parse_args()
+
+    report = run_load(args)
+    write_json(args.output, report)
+    print_report(report)
+    print(f"\nReport written to {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
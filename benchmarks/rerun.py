@@ -0,0 +1,161 @@
+"""Micro-benchmarks for the work a single Streamlit rerun does
+
+Run from the repository root:
+
+    python -m benchmarks.rerun                      # 10 / 1k / 100k jobs, compare with the baseline
+    python -m benchmarks.rerun --sizes 10,1000      # quicker
+    python -m benchmarks.rerun --update-baseline    # accept the current numbers
+
+Results are written as JSON (--output) and compared with the stored
+baseline; medians slower than --threshold are flagged as regressions.
+"""
+import argparse
+import itertools
+import sys
+import uuid
+
+from benchmarks.harness import (
+    OfflineEnvironment,
+    TITLE_WORDS,
+    compare,
+    environment_info,
+    format_seconds,
+    load_json,
+    make_history,
+    measure,
+    quiet,
+    write_json,
+)
+from database import Database
+from services.ai_service import AIService
+from services.job_service import JobService
+
+DEFAULT_OUTPUT = "benchmarks/results/rerun-latest.json"
+DEFAULT_BASELINE = "benchmarks/baselines/rerun.json"
+
+
+def catalog_benchmarks(env: OfflineEnvironment, size: int, repeat: int) -> dict:
+    """Benchmarks whose cost depends on the catalog size"""
+    job_service = JobService(env.db, catalog=env.catalog)
+    with quiet():
+        job_service.match_jobs("")
+        first_page = job_service.get_job_page("")
+    queries = itertools.cycle(
+        f"{first} {second}".lower() for first, second in itertools.permutations(TITLE_WORDS, 2)
+    )
+
+    return {
+        f"database_init/{size}": measure(Database, repeat),
+        f"match_jobs_all/{size}": measure(lambda: job_service.match_jobs(""), repeat),
+        # The same query on every rerun, as when a search box keeps its value
+        f"match_jobs_query_repeat/{size}": measure(lambda: job_service.match_jobs("warehouse driver"), repeat),
+        # A different query each time, past the query cache
+        f"match_jobs_query_fresh/{size}": measure(lambda: job_service.match_jobs(next(queries)), repeat),
+        # What the positions column fetches per rerun: one page of summaries
+        f"job_page_first/{size}": measure(lambda: job_service.get_job_page(""), repeat),
+        f"job_page_next/{size}": measure(lambda: job_service.get_job_page("", first_page.next_cursor), repeat),
+        f"job_page_query/{size}": measure(lambda: job_service.get_job_page("warehouse driver"), repeat),
+        f"ai_service_init/{size}": measure(lambda: AIService(db_client=env.db, catalog=env.catalog), repeat),
+        # Facet counts are cached per catalog version; filters page the in-memory postings
+        f"job_facets/{size}": measure(job_service.get_facets, repeat),
+        f"job_page_filtered/{size}": measure(
+            lambda: job_service.get_job_page("", filters={"categories": "Warehouse", "type": "FULL_TIME"}), repeat
+        ),
+    }
+
+
+def memory_benchmarks(env: OfflineEnvironment, history_sizes, repeat: int) -> dict:
+    """generate_career_response replaying transcripts of different lengths"""
+    ai_service = AIService(db_client=env.db, catalog=env.catalog)
+    counter = itertools.count()
+    results = {}
+
+    for length in history_sizes:
+        history = make_history(length)
+
+        def cold():
+            # A session this process has never seen: the whole transcript is folded in
+            turn = next(counter)
+            ai_service.generate_career_response(
+                f"What does option {turn} involve?", history, {}, session_id=f"cold-{uuid.uuid4().hex}"
+            )
+
+        session_id = f"warm-{length}"
+        transcript = list(history)
+        ai_service.generate_career_response("Hello again", transcript, {}, session_id=session_id)
+
+        def warm():
+            # The usual rerun: the session is in memory and only the new turn is synced
+            turn = next(counter)
+            transcript.append({"role": "user", "content": f"And what about option {turn}?"})
+            transcript.append({"role": "assistant", "content": f"Option {turn} is available. 👍"})
+            ai_service.generate_career_response(
+                f"What does option {turn} involve?", transcript, {}, session_id=session_id
+            )
+
+        results[f"memory_replay_cold/{length}"] = measure(cold, repeat)
+        results[f"memory_replay_warm/{length}"] = measure(warm, repeat)
+    return results
+
+
+def print_results(results: dict, comparison: list) -> None:
+    changes = {row["name"]: row for row in comparison}
+    print(f"{'benchmark':42} {'median':>12} {'min':>12}  vs baseline")
+    for name, result in results.items():
+        row = changes.get(name)
+        delta = ""
+        if row:
+            delta = f"{row['change'] * 100:+.1f}%" + ("  REGRESSION" if row["regression"] else "")
+        print(f"{name:42} {format_seconds(result['median']):>12} {format_seconds(result['min']):>12}  {delta}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for the Streamlit rerun hot path")
+    parser.add_argument("--sizes", default="10,1000,100000", help="catalog sizes (jobs)")
+    parser.add_argument("--history", default="10,100,1000", help="prior messages for the memory replay benchmarks")
+    parser.add_argument("--mongo-uri", help="use a throwaway mongod instead of mongomock")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown of the median reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    history_sizes = [int(size) for size in args.history.split(",") if size]
+    results = {}
+
+    for index, size in enumerate(sizes):
+        print(f"Seeding {size} jobs...", file=sys.stderr)
+        env = OfflineEnvironment(size, mongo_uri=args.mongo_uri)
+        try:
+            results.update(catalog_benchmarks(env, size, args.repeat))
+            if index == 0 and history_sizes:
+                results.update(memory_benchmarks(env, history_sizes, args.repeat))
+        finally:
+            env.close()
+
+    payload = {"suite": "rerun", "environment": environment_info(), "results": results}
+    write_json(args.output, payload)
+
+    baseline = load_json(args.baseline)
+    comparison = compare(results, baseline["results"], args.threshold) if baseline else []
+    print_results(results, comparison)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        write_json(args.baseline, payload)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    regressions = [row for row in comparison if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""LLM router latency under a slow tail, a failing endpoint and saturation
+
+Starts local fake chat completion servers (tools.fake_openai_server) with
+injected latency and runs the same calls through services.llm_router in
+four set-ups:
+- single: the primary endpoint alone, no hedging
+- hedged: primary and backup endpoints with hedged requests
+- failover: the primary answers every request with a 500
+- fallback: a primary with little concurrency and a cheaper fallback model
+
+The primary and backup answer after --latency seconds, and --slow-rate of
+their requests take --slow-latency longer. Every set-up first makes
+--warmup unmeasured calls so the hedge delay comes from observed latencies.
+
+    python -m benchmarks.router --calls 400 --concurrency 16
+
+Reports p50/p95/p99 call latency (time to first token with --stream) and
+the router's hedges, failovers, fallbacks and upstream requests.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.harness import environment_info, format_seconds, percentiles, write_json
+from services.async_llm import AsyncLLMClient
+from services.llm_router import CircuitBreaker, LLMEndpoint, LLMRouter
+from tools.fake_openai_server import FakeOpenAIServer
+
+DEFAULT_OUTPUT = "benchmarks/results/router-latest.json"
+SCENARIOS = ("single", "hedged", "failover", "fallback")
+MESSAGES = [{"role": "user", "content": "Which warehouse positions are open in Dallas?"}]
+EVENTS = ("hedge", "hedge_win", "failover", "fallback", "circuit_open", "deadline_exceeded")
+
+
+def build_router(scenario: str, urls: Dict[str, str], args) -> LLMRouter:
+    def endpoint(name: str, max_concurrency: int = 64, fallback: bool = False) -> LLMEndpoint:
+        client = AsyncLLMClient(
+            base_url=urls[name], api_key="offline", max_concurrency=max_concurrency, max_retries=0
+        )
+        return LLMEndpoint(name, client, fallback=fallback, breaker=CircuitBreaker())
+
+    if scenario == "single":
+        return LLMRouter([endpoint("primary")], hedge=False)
+    if scenario == "hedged":
+        return LLMRouter([endpoint("primary"), endpoint("backup")], hedge=True)
+    if scenario == "failover":
+        return LLMRouter([endpoint("failing"), endpoint("backup")], hedge=True)
+    return LLMRouter(
+        [endpoint("primary", max_concurrency=max(1, args.concurrency // 4)), endpoint("lite", fallback=True)],
+        hedge=True,
+    )
+
+
+async def run_calls(router: LLMRouter, count: int, concurrency: int, stream: bool) -> Dict[str, list]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    remaining = iter(range(count))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            first_token = []
+
+            def on_token(token: str) -> None:
+                if not first_token:
+                    first_token.append(time.perf_counter() - started)
+
+            try:
+                await router.complete(MESSAGES, on_token=on_token if stream else None, operation="benchmark")
+            except Exception as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(first_token[0] if first_token else time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+
+async def run_scenario(scenario: str, urls: Dict[str, str], servers: Dict[str, FakeOpenAIServer], args) -> dict:
+    router = build_router(scenario, urls, args)
+    try:
+        await run_calls(router, args.warmup, args.concurrency, args.stream)
+        before_events = router.stats()
+        before_requests = {name: server.stats["requests"] for name, server in servers.items()}
+        started = time.perf_counter()
+        result = await run_calls(router, args.calls, args.concurrency, args.stream)
+        elapsed = time.perf_counter() - started
+        after_events = router.stats()
+        requests = {
+            name: server.stats["requests"] - before_requests[name]
+            for name, server in servers.items()
+            if server.stats["requests"] != before_requests[name]
+        }
+    finally:
+        await router.aclose()
+    return {
+        "elapsed": elapsed,
+        "calls": len(result["latencies"]),
+        "errors": len(result["errors"]),
+        "latency": percentiles(result["latencies"]),
+        "events": {name: after_events.get(name, 0) - before_events.get(name, 0) for name in EVENTS},
+        "upstream_requests": requests,
+    }
+
+
+def run_router(args) -> dict:
+    tail = {"latency": args.latency, "slow_rate": args.slow_rate, "slow_latency": args.slow_latency}
+    # Separate seeds, so the primary and backup tails are independent
+    servers = {
+        "primary": FakeOpenAIServer(**tail, token_delay=args.token_delay, seed=args.seed),
+        "backup": FakeOpenAIServer(**tail, token_delay=args.token_delay, seed=args.seed + 1),
+        "failing": FakeOpenAIServer(latency=args.latency, failure_rate=1.0, token_delay=args.token_delay),
+        # The cheaper model answers sooner, without the tail
+        "lite": FakeOpenAIServer(latency=args.latency / 2, token_delay=args.token_delay),
+    }
+    with contextlib.ExitStack() as stack:
+        urls = {name: stack.enter_context(server) for name, server in servers.items()}
+        scenarios = {}
+        for scenario in args.scenarios:
+            with _discard_stdout():
+                scenarios[scenario] = asyncio.run(run_scenario(scenario, urls, servers, args))
+    return {
+        "environment": environment_info(),
+        "config": {name: value for name, value in vars(args).items() if name != "output"},
+        "scenarios": scenarios,
+    }
+
+
+@contextlib.contextmanager
+def _discard_stdout():
+    # The services print diagnostics; keep the report readable
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def print_report(report: dict) -> None:
+    config = report["config"]
+    measure = "time to first token" if config["stream"] else "call latency"
+    print(
+        f"{config['calls']} calls per set-up, {config['concurrency']} at a time; {measure} with "
+        f"{config['latency']}s upstream latency and {config['slow_rate']:.0%} of requests {config['slow_latency']}s slower\n"
+    )
+    print(f"{'set-up':10} {'p50':>11} {'p95':>11} {'p99':>11} {'max':>11} {'errors':>7}  router events / upstream requests")
+    for scenario, result in report["scenarios"].items():
+        latency = result["latency"]
+        events = ", ".join(f"{name} {count}" for name, count in result["events"].items() if count)
+        requests = ", ".join(f"{name} {count}" for name, count in result["upstream_requests"].items())
+        print(
+            f"{scenario:10} " +
+            " ".join(f"{format_seconds(latency[key]) if latency else 'n/a':>11}" for key in ("p50", "p95", "p99", "max")) +
+            f" {result['errors']:>7}  {events or '-'} / {requests}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LLM router latency against local fake endpoints")
+    parser.add_argument("--calls", type=int, default=400, help="measured calls per set-up")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured calls before each set-up")
+    parser.add_argument("--concurrency", type=int, default=16, help="calls in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the fake endpoints answer")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="fraction of requests in the latency tail")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="extra seconds for tail requests")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--stream", action="store_true", help="stream tokens and measure time to first token")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    report = run_router(args)
+    write_json(args.output, report)
+    print_report(report)
+    print(f"\nReport written to {args.output}")
+    return 1 if any(result["errors"] for result in report["scenarios"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,6 +26,8 @@ When suggesting jobs or giving advice, consider:
 
 AI_SETTINGS = {
     "model_name": "deepseek-chat",
+    # Overridable with the DEEPSEEK_BASE_URL secret, e.g. to point at a local fake server
+    "base_url": "https://api.deepseek.com",
     "temperature": 0.7,
     "max_tokens": 150,
     "streaming": True,
@@ -34,4 +36,96 @@ AI_SETTINGS = {
 MEMORY_SETTINGS = {
     "max_token_limit": 2000,
     "return_messages": True,
-}
\ No newline at end of file
+    # Sessions whose conversation window is kept in memory per process
+    "max_sessions": 5000,
+    # Most recent messages sent verbatim; older ones are folded into a summary
+    "max_verbatim_messages": 12,
+    # Cap on turns waiting for the background summarizer
+    "max_pending_tokens": 2000,
+    "summary_max_words": 150,
+    "summarizer_workers": 2,
+}
+
+HTTP_POOL_SETTINGS = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "timeout": 60.0,
+}
+
+INTENT_SETTINGS = {
+    "cache_size": 10000,
+    # Local predictions less confident than this are checked with the LLM
+    "confidence_threshold": 0.8,
+    # Fall back to a small Naive Bayes model for phrases the tables don't cover
+    "use_model": True,
+    # Only messages this short are checked for greetings and small talk
+    "max_words": 6,
+}
+
+RESPONSE_CACHE_SETTINGS = {
+    "ttl_seconds": 3600,
+    "max_entries": 5000,
+    # Upper bound on the response text held in memory per process
+    "max_bytes": 8 * 1024 * 1024,
+    # Share entries between app processes through the response_cache collection
+    "shared_tier": True,
+}
+
+STREAMING_SETTINGS = {
+    # Re-render the streamed reply at most this often (seconds)...
+    "flush_interval": 0.05,
+    # ...or as soon as this many characters are waiting
+    "flush_chars": 64,
+}
+
+ASYNC_LLM_SETTINGS = {
+    # Upstream requests in flight per process; further calls wait their turn
+    "max_concurrency": 64,
+    # Deadline for one generation, retries and backoff included (seconds)
+    "deadline": 45.0,
+    "max_retries": 3,
+    # Full-jitter exponential backoff: sleep up to min(max, base * 2 ** attempt)
+    "backoff_base": 0.5,
+    "backoff_max": 8.0,
+}
+
+# Upstream chat endpoints in order of preference. base_url and the API key default to
+# the DEEPSEEK_BASE_URL / DEEPSEEK_API_KEY secrets; other providers name their secrets.
+# Fallback endpoints serve a cheaper model when the primary ones are saturated or down.
+LLM_ENDPOINTS = [
+    {"name": "deepseek", "model": AI_SETTINGS["model_name"]},
+    # {"name": "backup", "base_url_secret": "BACKUP_LLM_BASE_URL", "api_key_secret": "BACKUP_LLM_API_KEY",
+    #  "model": "deepseek-chat"},
+    # {"name": "lite", "base_url_secret": "LITE_LLM_BASE_URL", "api_key_secret": "LITE_LLM_API_KEY",
+    #  "model": "<cheaper model>", "fallback": True},
+]
+
+LLM_ROUTER_SETTINGS = {
+    # Send a second (hedged) request when the first has not answered within this quantile
+    # of the endpoint's recent latencies (time to first token when streaming)
+    "hedge": True,
+    "hedge_quantile": 0.95,
+    # Hedge delay until an endpoint has min_latency_samples latencies, and its floor after that
+    "hedge_initial_delay": 3.0,
+    "hedge_min_delay": 0.25,
+    "latency_window": 500,
+    "min_latency_samples": 20,
+    # Consecutive failures that open an endpoint's circuit, and seconds before it is probed again
+    "breaker_failures": 5,
+    "breaker_reset": 30.0,
+    # Share of the primary endpoints' concurrency in use above which calls go to fallback
+    # endpoints first and are no longer hedged
+    "fallback_load": 0.8,
+    # Retries on the same endpoint before failing over to the next one
+    "endpoint_retries": 1,
+}
+
+JOB_CONTEXT_SETTINGS = {
+    # Positions described to the model per turn when no job is selected
+    "max_jobs": 5,
+    # Characters of each description included in the job context
+    "snippet_chars": 200,
+    # Earlier candidate messages searched along with the current one
+    "history_messages": 2,
+}
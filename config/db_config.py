@@ -0,0 +1,75 @@
+DATABASE_SETTINGS = {
+    "database_name": "hiring_agent_db",
+    "default_uri": "mongodb://localhost:27017/",
+    "max_pool_size": 50,
+    "min_pool_size": 0,
+    "max_idle_time_ms": 300000,
+    "connect_timeout_ms": 5000,
+    "server_selection_timeout_ms": 5000,
+}
+
+RESOURCE_POOL_SETTINGS = {
+    # Seconds between lazy health checks of the shared clients
+    "health_check_interval": 30,
+}
+
+CATALOG_SETTINGS = {
+    # Seconds between checks of the catalog version stamp when polling
+    "poll_interval": 5,
+    # Watch catalog_meta with a change stream when the deployment supports it
+    "use_change_stream": True,
+    # Feed records transformed and written per bulk_write by init_db.py --sync
+    "sync_batch_size": 500,
+}
+
+SESSION_STORE_SETTINGS = {
+    # Application sessions kept in memory per process (least recently used are dropped)
+    "max_sessions": 10000,
+    # Sessions idle for longer than this expire in memory and in MongoDB (seconds)
+    "ttl_seconds": 24 * 3600,
+    # Seconds between write-behind flushes of changed sessions
+    "flush_interval": 1.0,
+    # Changed sessions per bulk write; reaching it also triggers an early flush
+    "flush_batch_size": 500,
+}
+
+FUNNEL_SETTINGS = {
+    # Job/day rollups per bulk write of funnel increments or backfilled counts
+    "write_batch_size": 500,
+    # Application sessions read per backfill batch
+    "backfill_batch_size": 1000,
+}
+
+INTERACTION_LOG_SETTINGS = {
+    # Interactions waiting to be written; when full, loggers wait up to put_timeout
+    "max_queue": 10000,
+    "put_timeout": 0.5,
+    # Interactions per bulk write, and the longest a queued one waits (seconds)
+    "batch_size": 500,
+    "flush_interval": 1.0,
+}
+
+JOB_LISTING_SETTINGS = {
+    # Job summaries shown per page of the positions list
+    "page_size": 20,
+    # Characters of the description stored as each posting's listing snippet
+    "snippet_chars": 150,
+}
+
+TRANSCRIPT_SETTINGS = {
+    # Messages per transcript document; a new bucket starts when one fills up
+    "bucket_size": 50,
+    # Buckets kept per session; older ones are deleted when a new one starts
+    "max_buckets": 40,
+    # Transcripts idle for longer than this expire (seconds), like application sessions
+    "ttl_seconds": 24 * 3600,
+    # Most recent messages shown when a chat opens, and messages per "load earlier" page
+    "window": 30,
+    "page_size": 30,
+    # Latest messages read back to rebuild a conversation memory this process has not seen
+    "rehydrate_messages": 60,
+    # Hand out a stored transcript to anyone with its session id: GET /api/sessions/{id}/messages
+    # and resuming a chat from ?session= in the app URL. Transcripts hold phone numbers and
+    # emails, so only enable this behind authentication
+    "read_by_session_id": False,
+}
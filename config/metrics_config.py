@@ -0,0 +1,15 @@
+METRICS_SETTINGS = {
+    "enabled": True,
+    # Prefix of every exported metric name
+    "namespace": "hiring_agent",
+    # Fraction of spans that are timed; call and error counters see every call
+    "sample_rate": 0.1,
+    # Histogram buckets for durations (seconds)
+    "latency_buckets": (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    # Serve the Prometheus text format on http://<host>:<port>/metrics; None disables it
+    "http_host": "127.0.0.1",
+    "http_port": 9464,
+    # Also write it to this file (e.g. for node_exporter's textfile collector); None disables it
+    "textfile_path": None,
+    "textfile_interval": 15.0,
+}
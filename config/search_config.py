@@ -0,0 +1,20 @@
+SEARCH_SETTINGS = {
+    # Title matches count more than description matches
+    "field_boosts": {
+        "title": 3.0,
+        "categories": 2.0,
+        "location": 1.5,
+        "description": 1.0,
+    },
+    # BM25 term-frequency saturation and length normalization
+    "k1": 1.2,
+    "b": 0.75,
+    # Type-ahead: the last query term also matches longer terms with this prefix
+    "prefix_weight": 0.8,
+    "min_prefix_length": 2,
+    "max_prefix_expansions": 64,
+    # Merged prefix lists kept between keystrokes
+    "prefix_cache_size": 256,
+    # Ranked results for recent queries, dropped whenever the index changes
+    "query_cache_size": 1024,
+}
@@ -0,0 +1,14 @@
+SERVER_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    # Worker processes sharing the port (SO_REUSEPORT); 0 starts one per CPU
+    "workers": 0,
+    # Browser origins allowed to call the API, e.g. the careers site; "*" allows any
+    "allowed_origins": [],
+    # Upper bound on the page size a client can ask for
+    "max_page_size": 100,
+    # Metrics port of the first worker; worker N serves on metrics_port + N, since
+    # workers can't share one. Kept clear of the Streamlit app's METRICS_SETTINGS port.
+    # None disables the endpoint (a METRICS_SETTINGS textfile_path still gets one file per worker)
+    "metrics_port": 9465,
+}
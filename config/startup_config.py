@@ -0,0 +1,7 @@
+STARTUP_SETTINGS = {
+    # Build the shared services (MongoDB, job catalog, search index, LLM clients) on a
+    # background thread at process start, so the first page renders without waiting on them
+    "background_warmup": True,
+    # Print how long each startup step took once the first page has rendered
+    "report": True,
+}
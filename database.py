@@ -21,21 +21,139 @@ from pymongo.synchronous.database import __doc__ as original_doc
 __doc__ = original_doc
 __all__ = ["Database"]  # noqa: F405
 
-from pymongo import MongoClient
-import streamlit as st
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+import re
 from datetime import datetime
+from typing import Callable, Optional
+from config.db_config import DATABASE_SETTINGS, JOB_LISTING_SETTINGS
+from services.metrics import instrument_methods
 
+# Indexes backing every query shape the services issue
+INDEX_MODELS = {
+    "jobs": [
+        IndexModel(
+            [("title", TEXT), ("categories", TEXT), ("location", TEXT), ("description", TEXT)],
+            name="jobs_text",
+            weights={"title": 10, "categories": 5, "location": 3, "description": 1}
+        ),
+        # Facet filters are equality matches paged in _id order
+        IndexModel([("categories", ASCENDING), ("_id", ASCENDING)], name="jobs_categories"),
+        IndexModel([("location", ASCENDING), ("_id", ASCENDING)], name="jobs_location"),
+        IndexModel([("type", ASCENDING), ("_id", ASCENDING)], name="jobs_type"),
+        IndexModel(
+            [("requisition_id", ASCENDING)],
+            name="jobs_requisition_id",
+            unique=True,
+            # Older imports stored "" for postings without a requisition id
+            partialFilterExpression={"requisition_id": {"$gt": ""}}
+        ),
+    ],
+    "user_contexts": [
+        IndexModel([("user_id", ASCENDING)], name="user_contexts_user_id", unique=True),
+    ],
+    "transcripts": [
+        IndexModel([("session_id", ASCENDING), ("_id", DESCENDING)], name="transcripts_session_id"),
+        # Idle transcripts are removed once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="transcripts_ttl", expireAfterSeconds=0),
+    ],
+    "interactions": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="interactions_user_id_timestamp"),
+    ],
+    "response_cache": [
+        # Mongo removes entries once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="response_cache_ttl", expireAfterSeconds=0),
+    ],
+    "application_sessions": [
+        # Idle sessions are removed once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="application_sessions_ttl", expireAfterSeconds=0),
+    ],
+    "funnel_rollups": [
+        # Dashboards read a range of days, for every job or for one
+        IndexModel([("day", ASCENDING), ("job", ASCENDING)], name="funnel_rollups_day_job"),
+        IndexModel([("job", ASCENDING), ("day", ASCENDING)], name="funnel_rollups_job_day"),
+    ],
+}
+# Indexes no longer declared above; ensure_indexes drops them so writes stop maintaining them
+RETIRED_INDEXES = {
+    # employment_types was never offered as a filter; type already holds its first value
+    "jobs": ["jobs_employment_types"],
+}
+
+# Fields of a job listing entry; the full description is only read on demand
+JOB_SUMMARY_PROJECTION = {"title": 1, "location": 1, "type": 1, "categories": 1, "snippet": 1}
+JOB_DETAIL_PROJECTION = {"description": 1, "apply_url": 1}
+# Fields candidates can filter job listings by; each has an index
+FACET_FIELDS = ("categories", "location", "type")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def job_snippet(description, max_chars=None):
+    """Start of a description for job listings, cut at a word boundary"""
+    max_chars = max_chars or JOB_LISTING_SETTINGS["snippet_chars"]
+    text = WHITESPACE_PATTERN.sub(" ", description or "").strip()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+def funnel_rollup_id(job, day):
+    """_id of the funnel rollup of a job and day: 2024-05-01|Forklift Operator"""
+    return f"{day:%Y-%m-%d}|{job}"
+
+# Representative query shapes checked by audit_indexes(); add new queries here
+QUERY_SHAPES = [
+    {"collection": "jobs", "filter": {"_id": "audit"}},
+    {"collection": "jobs", "filter": {"_id": {"$gt": "audit"}}, "sort": [("_id", ASCENDING)]},
+    {"collection": "jobs", "filter": {"categories": "audit", "_id": {"$gt": "audit"}}, "sort": [("_id", ASCENDING)]},
+    {"collection": "jobs", "filter": {"location": "audit", "_id": {"$gt": "audit"}}, "sort": [("_id", ASCENDING)]},
+    {"collection": "jobs", "filter": {"type": "audit", "_id": {"$gt": "audit"}}, "sort": [("_id", ASCENDING)]},
+    {"collection": "jobs", "filter": {"requisition_id": "audit"}},
+    {"collection": "jobs", "filter": {"requisition_id": {"$in": ["audit"], "$gt": ""}}},
+    {"collection": "jobs", "filter": {"requisition_id": {"$gt": ""}}},
+    {"collection": "jobs", "filter": {"$text": {"$search": "audit"}}},
+    {"collection": "catalog_meta", "filter": {"_id": "jobs"}},
+    {"collection": "user_contexts", "filter": {"user_id": "audit"}},
+    {"collection": "transcripts", "filter": {"session_id": "audit", "count": {"$lt": 1}}},
+    {"collection": "transcripts", "filter": {"session_id": "audit", "_id": {"$lt": "audit"}}, "sort": [("_id", DESCENDING)]},
+    {"collection": "interactions", "filter": {"user_id": "audit"}, "sort": [("timestamp", DESCENDING)]},
+    {"collection": "response_cache", "filter": {"_id": "audit", "expires_at": {"$gt": datetime(2000, 1, 1)}}},
+    {"collection": "application_sessions", "filter": {"_id": "audit", "expires_at": {"$gt": datetime(2000, 1, 1)}}},
+    {"collection": "application_sessions", "filter": {"_id": {"$gt": "audit"}}, "sort": [("_id", ASCENDING)]},
+    {"collection": "funnel_rollups", "filter": {"day": {"$gte": datetime(2000, 1, 1)}}, "sort": [("day", ASCENDING)]},
+    {"collection": "funnel_rollups", "filter": {"job": "audit", "day": {"$gte": datetime(2000, 1, 1)}}, "sort": [("day", ASCENDING)]},
+]
+
+class IndexSetupError(RuntimeError):
+    """Declared indexes that could not be created; the services need every one of them"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("MongoDB indexes missing: " + "; ".join(failures))
+
+@instrument_methods("db")
 class Database:
-    def __init__(self):
-        # Try to get MongoDB URI from Streamlit secrets, fallback to default local URI
-        try:
-            self.mongo_uri = st.secrets["MONGODB_URI"]
-        except:
-            self.mongo_uri = "mongodb://localhost:27017/"
-        
-        # Initialize MongoDB client and database
-        self.client = MongoClient(self.mongo_uri)
-        self.db = self.client.hiring_agent_db  # database name
+    def __init__(self, client: MongoClient = None, client_source: Optional[Callable[[], MongoClient]] = None):
+        # Use an injected client as-is; otherwise ask the pool on every use, so its
+        # health check runs and a replaced client is picked up
+        if client is None and client_source is None:
+            from services.resource_pool import get_resource_pool
+            client_source = get_resource_pool().get_mongo_client
+
+        self._client = client
+        self._client_source = client_source
+        self._bound: Optional[tuple] = None  # (client, database) last resolved
+        self._catalog_listeners = []
+
+    @property
+    def client(self) -> MongoClient:
+        return self._client if self._client is not None else self._client_source()
+
+    @property
+    def db(self):
+        client = self.client
+        bound = self._bound
+        if bound is None or bound[0] is not client:
+            bound = self._bound = (client, client[DATABASE_SETTINGS["database_name"]])
+        return bound[1]
         
     def get_all_jobs(self):
         """Retrieve all jobs from the database"""
@@ -45,17 +163,81 @@ class Database:
         """Retrieve jobs matching specific criteria"""
         return list(self.db.jobs.find(criteria))
     
+    def search_jobs(self, query):
+        """Retrieve jobs matching a text query via the jobs text index, best match first"""
+        return list(
+            self.db.jobs.find(
+                {"$text": {"$search": query}},
+                {"score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})])
+        )
+    
+    def get_job_summaries(self, after=None, limit=None, filters=None):
+        """Retrieve job summaries in _id order, starting after the given _id
+
+        Cursor pagination on the _id index: each page costs the same however
+        deep the candidate has paged. filters maps facet fields to the value
+        jobs must have.
+        """
+        query = dict(filters or {})
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.db.jobs.find(query, JOB_SUMMARY_PROJECTION).sort("_id", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def search_job_summaries(self, query, skip=0, limit=None, filters=None):
+        """Retrieve job summaries matching a text query, best match first"""
+        cursor = self.db.jobs.find(
+            dict(filters or {}, **{"$text": {"$search": query}}),
+            dict(JOB_SUMMARY_PROJECTION, score={"$meta": "textScore"})
+        ).sort([("score", {"$meta": "textScore"})]).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def get_job_facets(self, fields=FACET_FIELDS):
+        """Count jobs per value of each facet field, most common first
+
+        One aggregation returns every facet; list fields count each job once
+        per value.
+        """
+        pipeline = [{"$facet": {
+            field: [
+                {"$unwind": f"${field}"},
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+            ]
+            for field in fields
+        }}]
+        result = next(iter(self.db.jobs.aggregate(pipeline)), {})
+        return {
+            field: [(bucket["_id"], bucket["count"]) for bucket in result.get(field, []) if bucket["_id"] not in (None, "")]
+            for field in fields
+        }
+    
+    def get_job_details(self, job_id):
+        """Retrieve the fields of a job that listings leave out"""
+        return self.db.jobs.find_one({"_id": job_id}, JOB_DETAIL_PROJECTION)
+    
     def add_job(self, job_data):
         """Add a single job to the database"""
-        return self.db.jobs.insert_one(job_data)
+        result = self.db.jobs.insert_one(job_data)
+        self._catalog_changed("insert", [result.inserted_id])
+        return result
     
     def add_jobs(self, jobs_data):
         """Add multiple jobs to the database"""
-        return self.db.jobs.insert_many(jobs_data)
+        result = self.db.jobs.insert_many(jobs_data)
+        self._catalog_changed("insert", result.inserted_ids)
+        return result
     
     def clear_jobs(self):
         """Remove all jobs from the database"""
-        return self.db.jobs.delete_many({})
+        result = self.db.jobs.delete_many({})
+        self._catalog_changed("clear", [])
+        return result
     
     def get_job_by_id(self, job_id):
         """Retrieve a specific job by its ID"""
@@ -63,11 +245,315 @@ class Database:
     
     def update_job(self, job_id, update_data):
         """Update a specific job"""
-        return self.db.jobs.update_one({"_id": job_id}, {"$set": update_data})
+        result = self.db.jobs.update_one({"_id": job_id}, {"$set": update_data})
+        if result.modified_count:
+            self._catalog_changed("update", [job_id])
+        return result
     
     def delete_job(self, job_id):
         """Delete a specific job"""
-        return self.db.jobs.delete_one({"_id": job_id})
+        result = self.db.jobs.delete_one({"_id": job_id})
+        if result.deleted_count:
+            self._catalog_changed("delete", [job_id])
+        return result
+    
+    def sync_jobs_batch(self, jobs):
+        """Upsert a batch of feed postings by requisition_id, skipping unchanged ones
+
+        Each job carries a content_hash; postings whose stored hash matches are
+        not written at all. Returns inserted/updated/unchanged counts.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not jobs:
+            return counts
+        # The $gt lets the planner use the partial requisition_id index
+        stored = {
+            doc["requisition_id"]: doc.get("content_hash")
+            for doc in self.db.jobs.find(
+                {"requisition_id": {"$in": [job["requisition_id"] for job in jobs], "$gt": ""}},
+                {"requisition_id": 1, "content_hash": 1, "_id": 0}
+            )
+        }
+        operations = []
+        for job in jobs:
+            requisition_id = job["requisition_id"]
+            if requisition_id not in stored:
+                counts["inserted"] += 1
+            elif stored[requisition_id] != job["content_hash"]:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            # Later duplicates of the same posting in this batch compare against this one
+            stored[requisition_id] = job["content_hash"]
+            operations.append(UpdateOne({"requisition_id": requisition_id}, {"$set": job}, upsert=True))
+        if operations:
+            self.db.jobs.bulk_write(operations, ordered=False)
+        return counts
+    
+    def finish_job_sync(self, seen_ids, changed, batch_size=1000):
+        """Remove postings whose requisition_id the sync did not see; bump the catalog version once if anything changed
+
+        Postings without a requisition_id (e.g. from a full reload of an older
+        feed) can't be matched against the feed and are left alone. With
+        seen_ids None (the feed was not read in full) nothing is removed.
+        Stored ids are streamed and stale ones deleted batch_size at a time.
+        """
+        removed = 0
+        if seen_ids is not None:
+            stale = []
+            stored = self.db.jobs.find({"requisition_id": {"$gt": ""}}, {"requisition_id": 1, "_id": 0})
+            for doc in stored:
+                if doc["requisition_id"] not in seen_ids:
+                    stale.append(doc["requisition_id"])
+                if len(stale) >= batch_size:
+                    removed += self._delete_postings(stale)
+                    stale = []
+            if stale:
+                removed += self._delete_postings(stale)
+        if changed or removed:
+            self._catalog_changed("sync", [])
+        return removed
+    
+    def _delete_postings(self, requisition_ids):
+        return self.db.jobs.delete_many({"requisition_id": {"$in": requisition_ids, "$gt": ""}}).deleted_count
+    
+    def get_catalog_version(self):
+        """Retrieve the current job catalog version stamp"""
+        meta = self.db.catalog_meta.find_one({"_id": "jobs"}, {"version": 1})
+        return meta["version"] if meta else 0
+    
+    def bump_catalog_version(self):
+        """Increment the job catalog version so every process reloads its cache"""
+        meta = self.db.catalog_meta.find_one_and_update(
+            {"_id": "jobs"},
+            {
+                "$inc": {"version": 1},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta["version"]
+    
+    def add_catalog_listener(self, listener):
+        """Register a callback invoked as listener(op, job_ids, version) after job writes"""
+        self._catalog_listeners.append(listener)
+    
+    def _catalog_changed(self, op, job_ids):
+        version = self.bump_catalog_version()
+        for listener in self._catalog_listeners:
+            listener(op, list(job_ids), version)
+    
+    def ensure_indexes(self):
+        """Create every declared index and drop retired ones; existing identical indexes are left alone
+
+        Each index is created on its own, so one that can't be built (e.g. a
+        unique index over duplicate keys) doesn't hold back the others.
+        Raises IndexSetupError naming every missing index, and the duplicate
+        keys blocking a unique one, after trying them all.
+        """
+        created = {}
+        failures = []
+        for collection, models in INDEX_MODELS.items():
+            created[collection] = []
+            for model in models:
+                try:
+                    created[collection] += self.db[collection].create_indexes([model])
+                except Exception as e:
+                    failure = f"{collection}.{model.document['name']}: {str(e)}"
+                    if model.document.get("unique"):
+                        duplicates = self._duplicate_keys(collection, model)
+                        if duplicates:
+                            failure += f" (duplicate keys: {', '.join(map(str, duplicates))})"
+                    failures.append(failure)
+        for collection, names in RETIRED_INDEXES.items():
+            existing = self.db[collection].index_information()
+            for name in names:
+                if name in existing:
+                    self.db[collection].drop_index(name)
+        if failures:
+            raise IndexSetupError(failures)
+        return created
+    
+    def _duplicate_keys(self, collection, model, limit=5):
+        """A few key values that occur more than once, blocking a unique index"""
+        fields = list(model.document["key"])
+        group_id = f"${fields[0]}" if len(fields) == 1 else {field: f"${field}" for field in fields}
+        try:
+            return [doc["_id"] for doc in self.db[collection].aggregate([
+                {"$match": model.document.get("partialFilterExpression", {})},
+                {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+                {"$limit": limit},
+            ])]
+        except Exception:
+            return []
+    
+    def audit_indexes(self, query_shapes=None):
+        """Explain each known query shape and return those that fall back to a COLLSCAN"""
+        failures = []
+        for shape in query_shapes or QUERY_SHAPES:
+            cursor = self.db[shape["collection"]].find(shape["filter"])
+            if shape.get("sort"):
+                cursor = cursor.sort(shape["sort"])
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+            if "COLLSCAN" in _plan_stages(plan):
+                failures.append(shape)
+        return failures
+    
+    def get_cached_response(self, key):
+        """Retrieve an unexpired shared response cache entry"""
+        return self.db.response_cache.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"response": 1, "expires_at": 1}
+        )
+    
+    def save_cached_response(self, key, response, expires_at):
+        """Store a shared response cache entry"""
+        return self.db.response_cache.update_one(
+            {"_id": key},
+            {"$set": {"response": response, "expires_at": expires_at}},
+            upsert=True
+        )
+    
+    def get_application_session(self, session_id):
+        """Retrieve the saved application data for a session that has not expired"""
+        return self.db.application_sessions.find_one(
+            {"_id": session_id, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+    
+    def save_application_sessions(self, sessions):
+        """Upsert the changed fields of many sessions in one round trip
+
+        sessions maps each session_id to (fields to set, fields to unset); fields
+        left out keep whatever another process stored
+        """
+        if not sessions:
+            return None
+        operations = []
+        for session_id, (values, cleared) in sessions.items():
+            update = {"$set": values}
+            if cleared:
+                update["$unset"] = dict.fromkeys(cleared, "")
+            operations.append(UpdateOne({"_id": session_id}, update, upsert=True))
+        return self.db.application_sessions.bulk_write(operations, ordered=False)
+    
+    def get_application_sessions_batch(self, after=None, limit=None, projection=None):
+        """Application session documents in _id order, starting after the given _id"""
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        cursor = self.db.application_sessions.find(query, projection).sort("_id", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def increment_funnel_rollups(self, increments):
+        """Add stage counts to job/day funnel rollups in one round trip
+
+        increments maps (job, day) to {stage: count}
+        """
+        if not increments:
+            return None
+        return self.db.funnel_rollups.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": funnel_rollup_id(job, day)},
+                    {
+                        "$inc": {f"stages.{stage}": count for stage, count in stages.items()},
+                        "$setOnInsert": {"job": job, "day": day},
+                    },
+                    upsert=True
+                )
+                for (job, day), stages in increments.items()
+            ],
+            ordered=False
+        )
+    
+    def save_funnel_rollups(self, rollups, backfill_run):
+        """Replace job/day funnel rollups with recomputed counts, tagged with the backfill run
+
+        rollups maps (job, day) to {stage: count}
+        """
+        if not rollups:
+            return None
+        return self.db.funnel_rollups.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": funnel_rollup_id(job, day)},
+                    {"job": job, "day": day, "stages": dict(stages), "backfill_run": backfill_run},
+                    upsert=True
+                )
+                for (job, day), stages in rollups.items()
+            ],
+            ordered=False
+        )
+    
+    def finish_funnel_backfill(self, backfill_run, since=None, until=None):
+        """Remove rollups in the backfilled day range that the run found no applications for"""
+        query = {"backfill_run": {"$ne": backfill_run}}
+        days = {}
+        if since is not None:
+            days["$gte"] = since
+        if until is not None:
+            days["$lt"] = until
+        if days:
+            query["day"] = days
+        return self.db.funnel_rollups.delete_many(query).deleted_count
+    
+    def get_funnel_rollups(self, since=None, until=None, job=None):
+        """Funnel rollups for days in [since, until), optionally for one job, oldest day first"""
+        query = {}
+        if job is not None:
+            query["job"] = job
+        days = {}
+        if since is not None:
+            days["$gte"] = since
+        if until is not None:
+            days["$lt"] = until
+        if days:
+            query["day"] = days
+        return list(
+            self.db.funnel_rollups.find(query, {"job": 1, "day": 1, "stages": 1}).sort("day", ASCENDING)
+        )
+    
+    def append_transcript(self, session_id, messages, bucket_size, expires_at):
+        """Append messages to the session's open transcript bucket in one upsert
+
+        Returns the _id of a newly started bucket, or None when an open one
+        took the messages.
+        """
+        result = self.db.transcripts.update_one(
+            {"session_id": session_id, "count": {"$lt": bucket_size}},
+            {
+                "$push": {"messages": {"$each": messages}},
+                "$inc": {"count": len(messages)},
+                "$set": {"expires_at": expires_at},
+            },
+            upsert=True
+        )
+        return result.upserted_id
+    
+    def get_transcript_buckets(self, session_id, before_id=None, inclusive=False, limit=None):
+        """Retrieve a session's transcript buckets, newest first, optionally from before_id back"""
+        query = {"session_id": session_id}
+        if before_id is not None:
+            query["_id"] = {"$lte" if inclusive else "$lt": before_id}
+        cursor = self.db.transcripts.find(query, {"messages": 1}).sort("_id", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def trim_transcript(self, session_id, keep_buckets):
+        """Delete all but the newest keep_buckets buckets of a session's transcript"""
+        oldest_kept = list(
+            self.db.transcripts.find({"session_id": session_id}, {"_id": 1})
+            .sort("_id", DESCENDING).skip(keep_buckets - 1).limit(1)
+        )
+        if not oldest_kept:
+            return 0
+        return self.db.transcripts.delete_many(
+            {"session_id": session_id, "_id": {"$lt": oldest_kept[0]["_id"]}}
+        ).deleted_count
     
     def get_user_context(self, user_id):
         """Retrieve user context from the database"""
@@ -81,7 +567,12 @@ class Database:
                 "application_stage": None,
                 "selected_job": None
             }
-            self.db.user_contexts.insert_one(user_context)
+            # Upsert so concurrent first visits don't collide on the unique user_id index
+            self.db.user_contexts.update_one(
+                {"user_id": user_id},
+                {"$setOnInsert": user_context},
+                upsert=True
+            )
         return user_context
     
     def save_user_interaction(self, user_id, user_input, assistant_response):
@@ -92,15 +583,49 @@ class Database:
             "user_input": user_input,
             "assistant_response": assistant_response
         }
-        self.db.interactions.insert_one(interaction)
+        self.save_user_interactions([interaction])
+    
+    def save_user_interactions(self, interactions):
+        """Save a batch of interactions and each user's latest interaction time
+
+        Two round trips per batch regardless of how many turns or users it
+        covers. Interactions that already carry an _id may be retried safely.
+        """
+        if not interactions:
+            return
+        try:
+            self.db.interactions.insert_many(interactions, ordered=False)
+        except BulkWriteError as e:
+            # A retried batch may contain interactions written by the failed attempt
+            details = e.details
+            if details.get("writeConcernErrors") or any(
+                error.get("code") != 11000 for error in details.get("writeErrors", [])
+            ):
+                raise
         
-        # Update last interaction in user context
-        self.db.user_contexts.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "last_interaction": datetime.utcnow()
-                }
-            },
-            upsert=True
+        # One last_interaction update per user, however many turns they had
+        latest = {}
+        for interaction in interactions:
+            user_id = interaction["user_id"]
+            if user_id not in latest or interaction["timestamp"] > latest[user_id]:
+                latest[user_id] = interaction["timestamp"]
+        self.db.user_contexts.bulk_write(
+            [
+                UpdateOne({"user_id": user_id}, {"$max": {"last_interaction": timestamp}}, upsert=True)
+                for user_id, timestamp in latest.items()
+            ],
+            ordered=False
         )
+
+def _plan_stages(plan):
+    """Collect every stage name in an explain() plan tree"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in plan:
+                stages |= _plan_stages(plan[key])
+        for child in plan.get("inputStages", []):
+            stages |= _plan_stages(child)
+    return stages
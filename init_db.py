@@ -1,5 +1,13 @@
-from database import Database
+from database import Database, job_snippet
+from config.db_config import CATALOG_SETTINGS
+from services.funnel_analytics import FUNNEL_STAGES, FunnelRollups, start_of_day
+from services.job_feed import FeedFormatError, iter_batches, iter_feed_records
+from collections import Counter
+from datetime import datetime, timedelta
+import argparse
+import hashlib
 import json
+import sys
 
 def transform_job(job_data):
     """Transform the job data from jd.json format to our database format"""
@@ -11,6 +19,8 @@ def transform_job(job_data):
         "location": location_str,
         "type": job_data.get('employment_types', ['FULL_TIME'])[0] if job_data.get('employment_types') else 'FULL_TIME',
         "description": job_data.get('description', ''),
+        # Listings show this instead of reading the full description
+        "snippet": job_snippet(job_data.get('description', '')),
         "categories": job_data.get('categories', []),
         "requisition_id": job_data.get('requisition_id', ''),
         # New fields added
@@ -19,12 +29,14 @@ def transform_job(job_data):
         "job_location": job_data.get('js_result_data', {}).get('job_location', [])[0] if job_data.get('js_result_data', {}).get('job_location') else {},
     }
 
+def job_content_hash(job):
+    """Fingerprint of a transformed posting, used to skip unchanged ones on sync"""
+    payload = json.dumps(job, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
 def init_jobs():
     db = Database()
     
-    # Clear existing jobs
-    db.db.jobs.delete_many({})
-    
     try:
         # Read jobs from jd.json
         with open('jd.json', 'r') as file:
@@ -34,12 +46,28 @@ def init_jobs():
         jobs = json_data.get('data', [])
         
         if not jobs:
-            print("No jobs found in the data array!")
+            print("No jobs found in the data array! Existing jobs were kept.")
             return
             
-        # Transform and insert jobs
+        # Transform and check the feed before anything is removed
         transformed_jobs = [transform_job(job) for job in jobs]
-        db.db.jobs.insert_many(transformed_jobs)
+        id_counts = Counter(job["requisition_id"] for job in transformed_jobs if job["requisition_id"])
+        duplicates = sorted(requisition_id for requisition_id, count in id_counts.items() if count > 1)
+        if duplicates:
+            # The unique requisition_id index would stop the insert halfway, after the clear
+            print(
+                f"Error: {len(duplicates)} requisition ids appear more than once in jd.json "
+                f"(e.g. {', '.join(map(str, duplicates[:5]))}). Existing jobs were kept."
+            )
+            return
+        for job in transformed_jobs:
+            job["content_hash"] = job_content_hash(job)
+
+        # Clear existing jobs (bumps the catalog version so running apps reload)
+        db.clear_jobs()
+        db.add_jobs(transformed_jobs)
+        # After the reload, so duplicates in the old postings can't block it
+        db.ensure_indexes()
             
         print("Database initialized with jobs from jd.json!")
         
@@ -53,11 +81,115 @@ def init_jobs():
             print(f"- {job['title']} ({job['location']})")
             
     except FileNotFoundError:
-        print("Error: jd.json file not found!")
+        print("Error: jd.json file not found! Existing jobs were kept.")
     except json.JSONDecodeError:
-        print("Error: Invalid JSON format in jd.json!")
+        print("Error: Invalid JSON format in jd.json! Existing jobs were kept.")
     except Exception as e:
         print(f"Error during database initialization: {str(e)}")
 
+def sync_jobs(feed_path='jd.json', batch_size=None):
+    """Bring the jobs collection in line with the feed without clearing it
+
+    The feed is parsed incrementally and written in bounded batches, so memory
+    holds one batch plus the set of requisition ids seen (one short string per
+    posting); postings missing from the feed are removed only after the whole
+    feed was read successfully.
+    """
+    db = Database()
+    db.ensure_indexes()
+    batch_size = batch_size or CATALOG_SETTINGS["sync_batch_size"]
+    seen_ids = set()
+    counts = Counter()
+
+    try:
+        with open(feed_path, 'r', encoding='utf-8') as file:
+            for records in iter_batches(iter_feed_records(file), batch_size):
+                jobs = []
+                for record in records:
+                    job = transform_job(record)
+                    if not job["requisition_id"]:
+                        # Without a requisition id a posting can't be matched on the next sync
+                        counts["skipped"] += 1
+                        continue
+                    job["content_hash"] = job_content_hash(job)
+                    jobs.append(job)
+                    seen_ids.add(job["requisition_id"])
+                counts.update(db.sync_jobs_batch(jobs))
+    except FileNotFoundError:
+        print(f"Error: {feed_path} file not found!")
+        return None
+    except FeedFormatError as e:
+        print(f"Error: Invalid JSON format in {feed_path}: {str(e)}. No postings were removed.")
+        if counts["inserted"] + counts["updated"]:
+            # Batches before the error were written: running apps must reload them
+            db.finish_job_sync(None, changed=True)
+            print(f"{counts['inserted']} postings were inserted and {counts['updated']} updated before the error.")
+        return None
+
+    if not counts:
+        print("No jobs found in the data array! No postings were removed.")
+        return None
+
+    counts["removed"] = db.finish_job_sync(seen_ids, changed=counts["inserted"] + counts["updated"], batch_size=batch_size)
+    print(
+        f"Synced jobs from {feed_path}: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged, {counts['removed']} removed, {counts['skipped']} skipped"
+    )
+    return counts
+
+def audit_indexes():
+    """Fail if any known query shape is served by a collection scan"""
+    db = Database()
+    db.ensure_indexes()
+    failures = db.audit_indexes()
+    for shape in failures:
+        print(f"COLLSCAN: {shape['collection']} {shape['filter']} sort={shape.get('sort')}")
+    if failures:
+        print(f"Index audit failed: {len(failures)} query shape(s) fall back to a collection scan")
+        return 1
+    print("Index audit passed: every known query shape uses an index")
+    return 0
+
+def backfill_funnel():
+    """Recompute the funnel rollups from the application sessions still stored"""
+    db = Database()
+    db.ensure_indexes()
+    FunnelRollups(db).backfill()
+    return 0
+
+def funnel_report(days=30):
+    """Print stage counts per job for applications started in the last days"""
+    since = start_of_day(datetime.utcnow() - timedelta(days=days - 1))
+    funnel = FunnelRollups(Database()).funnel(since=since)
+    if not funnel:
+        print(f"No applications started in the last {days} days")
+        return 0
+    width = max(len(job) for job in funnel)
+    print(f"Applications started since {since:%Y-%m-%d} that reached each stage")
+    print(f"{'job':{width}} " + " ".join(f"{stage:>12.12}" for stage in FUNNEL_STAGES))
+    for job, stages in funnel.items():
+        print(f"{job:{width}} " + " ".join(f"{stages[stage]:>12}" for stage in FUNNEL_STAGES))
+    return 0
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Initialize the hiring agent database")
+    parser.add_argument("--audit-indexes", action="store_true",
+                        help="only check that known query shapes avoid collection scans")
+    parser.add_argument("--sync", action="store_true",
+                        help="incrementally sync jobs with the feed instead of clearing and reloading")
+    parser.add_argument("--feed", default="jd.json", help="path of the job feed used by --sync")
+    parser.add_argument("--backfill-funnel", action="store_true",
+                        help="recompute the funnel rollups from the stored application sessions")
+    parser.add_argument("--funnel-report", type=int, metavar="DAYS", nargs="?", const=30,
+                        help="print applications per job and funnel stage for the last DAYS days (default 30)")
+    args = parser.parse_args()
+
+    if args.audit_indexes:
+        sys.exit(audit_indexes())
+    if args.backfill_funnel:
+        sys.exit(backfill_funnel())
+    if args.funnel_report is not None:
+        sys.exit(funnel_report(args.funnel_report))
+    if args.sync:
+        sys.exit(0 if sync_jobs(args.feed) is not None else 1)
     init_jobs()  # Changed from init_db() to init_jobs()
@@ -1,8 +1,40 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
-from datetime import datetime
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, fields
+from typing import Dict, Optional, Set, Tuple
+from datetime import datetime, timedelta
 
-@dataclass
+from config.db_config import SESSION_STORE_SETTINGS
+
+# Fields collected after a job is selected, in the order they are asked
+REQUIRED_FIELDS = [
+    'selected_job', 'name', 'phone', 'email',
+    'age_consent', 'country_consent', 'shift_preference',
+    'environment_consent', 'contact_preference'
+]
+
+# A "no" to any of these ends the application
+ELIGIBILITY_FIELDS = ['age_consent', 'country_consent', 'environment_consent']
+
+STAGE_NOT_ELIGIBLE = 'not_eligible'
+STAGE_COMPLETED = 'completed'
+
+FIELD_LABELS = {
+    'selected_job': "Selected job",
+    'name': "Name",
+    'phone': "Phone",
+    'email': "Email",
+    'age_consent': "16 or older",
+    'country_consent': "Can work in the USA",
+    'shift_preference': "Preferred shift",
+    'environment_consent': "Comfortable with a fast paced environment",
+    'contact_preference': "Preferred contact method",
+    'interview_datetime': "Interview",
+}
+
+# slots keep the per-session footprint small when thousands are cached
+@dataclass(slots=True)
 class UserApplicationData:
     selected_job: Optional[str] = None
     name: Optional[str] = None
@@ -14,25 +46,117 @@ class UserApplicationData:
     environment_consent: Optional[bool] = None
     contact_preference: Optional[str] = None
     interview_datetime: Optional[datetime] = None
+    # When the candidate selected the job; funnel analytics count the application on that day
+    started_at: Optional[datetime] = None
     
     def to_dict(self) -> dict:
-        return {k: v for k, v in self.__dict__.items() if v is not None}
+        return {field: getattr(self, field) for field in APPLICATION_FIELDS if getattr(self, field) is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserApplicationData":
+        return cls(**{field: data.get(field) for field in APPLICATION_FIELDS})
+
+    def describe(self) -> str:
+        """Summarize the collected fields as one line for the prompt"""
+        facts = []
+        for field, label in FIELD_LABELS.items():
+            value = getattr(self, field)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = "yes" if value else "no"
+            facts.append(f"{label}: {value}")
+        return "; ".join(facts)
+
+APPLICATION_FIELDS = tuple(field.name for field in fields(UserApplicationData))
+# What the candidate told us, as opposed to the job they picked and when they picked it
+CANDIDATE_FIELDS = tuple(field for field in APPLICATION_FIELDS if field not in ('selected_job', 'started_at'))
 
 class SessionDataManager:
-    def __init__(self):
-        self._session_data: Dict[str, UserApplicationData] = {}
+    """Application data per session: an LRU in memory over an optional MongoDB tier
+
+    Reads are served from the bounded in-process LRU and fall back to the
+    database, so any process can resume a session. Updates only mark a session
+    dirty; a background thread writes the changed fields of dirty sessions in
+    batches, so several answers in quick succession become one write and
+    processes sharing a session do not overwrite each other. Sessions idle for longer
+    than the TTL expire in both tiers. With a funnel (FunnelRollups), every
+    change that moves an application to a new stage is counted there too.
+    """
+
+    def __init__(
+        self,
+        db=None,
+        max_sessions: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        flush_batch_size: Optional[int] = None,
+        funnel=None,
+    ):
+        self.db = db
+        self.funnel = funnel
+        self.max_sessions = max_sessions or SESSION_STORE_SETTINGS["max_sessions"]
+        self.ttl_seconds = ttl_seconds or SESSION_STORE_SETTINGS["ttl_seconds"]
+        self.flush_interval = flush_interval or SESSION_STORE_SETTINGS["flush_interval"]
+        self.flush_batch_size = flush_batch_size or SESSION_STORE_SETTINGS["flush_batch_size"]
+
+        # session_id -> (data, last access); ordered from least to most recently used
+        self._session_data: "OrderedDict[str, Tuple[UserApplicationData, float]]" = OrderedDict()
+        # Sessions changed since the last flush (may include ones already evicted above),
+        # with the fields that changed: only those are written, so workers sharing a
+        # session never overwrite each other's answers with a stale copy
+        self._dirty: Dict[str, Tuple[UserApplicationData, Set[str]]] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._stats = Counter()
+
+        self._flusher = None
+        if self.db is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-data-flush", daemon=True)
+            self._flusher.start()
     
     def get_user_data(self, session_id: str) -> UserApplicationData:
-        if session_id not in self._session_data:
-            self._session_data[session_id] = UserApplicationData()
-        return self._session_data[session_id]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._session_data.get(session_id)
+            if entry is not None:
+                if now - entry[1] < self.ttl_seconds:
+                    self._session_data[session_id] = (entry[0], now)
+                    self._session_data.move_to_end(session_id)
+                    self._stats["hits"] += 1
+                    return entry[0]
+                del self._session_data[session_id]
+                self._stats["expired"] += 1
+            # An evicted session whose last write has not landed yet
+            pending = self._dirty.get(session_id)
+            user_data = pending[0] if pending is not None else None
+
+        if user_data is None:
+            user_data = self._load(session_id)
+
+        with self._lock:
+            entry = self._session_data.get(session_id)
+            if entry is not None:
+                # Another thread loaded it first
+                user_data = entry[0]
+            self._remember(session_id, user_data, now)
+            return user_data
     
     def update_user_data(self, session_id: str, **kwargs) -> None:
         """Update specific fields in user data"""
         user_data = self.get_user_data(session_id)
-        for key, value in kwargs.items():
-            if hasattr(user_data, key):
-                setattr(user_data, key, value)
+        with self._lock:
+            reached = self.funnel.reached(user_data) if self.funnel is not None else None
+            changed = set()
+            for key, value in kwargs.items():
+                if hasattr(user_data, key):
+                    setattr(user_data, key, value)
+                    changed.add(key)
+            if self.funnel is not None:
+                self.funnel.advance(user_data, reached)
+            self._mark_dirty(session_id, user_data, changed)
     
     def is_field_filled(self, session_id: str, field: str) -> bool:
         """Check if a specific field has been filled"""
@@ -42,13 +166,148 @@ class SessionDataManager:
     def get_next_empty_field(self, session_id: str) -> Optional[str]:
         """Get the next empty required field"""
         user_data = self.get_user_data(session_id)
-        required_fields = [
-            'selected_job', 'name', 'phone', 'email', 
-            'age_consent', 'country_consent', 'shift_preference',
-            'environment_consent', 'contact_preference'
-        ]
-        
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if getattr(user_data, field, None) is None:
                 return field
-        return None
\ No newline at end of file
+        return None
+
+    def start_application(self, session_id: str, job_title: str) -> None:
+        """Begin a fresh application for the selected job"""
+        user_data = UserApplicationData(selected_job=job_title, started_at=datetime.utcnow())
+        with self._lock:
+            self._remember(session_id, user_data, time.monotonic())
+            if self.funnel is not None:
+                self.funnel.advance(user_data)
+            # Every field, so answers given for the previous job are cleared too
+            self._mark_dirty(session_id, user_data, set(APPLICATION_FIELDS))
+
+    def get_application_stage(self, session_id: str) -> Optional[str]:
+        """Name the current step: the next field to collect, 'not_eligible' or 'completed'"""
+        user_data = self.get_user_data(session_id)
+        if user_data.selected_job is None:
+            return None
+        if any(getattr(user_data, field) is False for field in ELIGIBILITY_FIELDS):
+            return STAGE_NOT_ELIGIBLE
+        return self.get_next_empty_field(session_id) or STAGE_COMPLETED
+
+    def refresh(self, session_id: str) -> None:
+        """Drop the in-memory copy so the next read picks up writes made by other processes
+
+        A copy with changes not yet written is kept.
+        """
+        with self._lock:
+            if session_id not in self._dirty:
+                self._session_data.pop(session_id, None)
+
+    def flush(self) -> int:
+        """Write every changed session to the database now; returns how many were written"""
+        if self.db is None:
+            return 0
+        if self.funnel is not None:
+            self.funnel.flush()
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                # Snapshot under the lock so a half-applied update is never written
+                documents = {}
+                for session_id, (user_data, changed) in dirty.items():
+                    values = {field: getattr(user_data, field) for field in changed}
+                    documents[session_id] = (
+                        dict({f: v for f, v in values.items() if v is not None}, expires_at=expires_at),
+                        [f for f, v in values.items() if v is None],
+                    )
+            if not documents:
+                return 0
+
+            items = list(documents.items())
+            written = 0
+            try:
+                for start in range(0, len(items), self.flush_batch_size):
+                    self.db.save_application_sessions(dict(items[start:start + self.flush_batch_size]))
+                    written = start + self.flush_batch_size
+            except Exception as e:
+                print(f"Error saving application sessions: {str(e)}")
+                with self._lock:
+                    # Requeue what was not written, merged with any change made meanwhile
+                    for session_id, _ in items[written:]:
+                        user_data, changed = dirty[session_id]
+                        pending = self._dirty.get(session_id)
+                        if pending is None:
+                            self._dirty[session_id] = (user_data, changed)
+                        elif pending[0] is user_data:
+                            pending[1].update(changed)
+                self._stats["flush_errors"] += 1
+                return min(written, len(items))
+
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["sessions_written"] += len(items)
+        return len(items)
+
+    def stats(self) -> dict:
+        """Cache and write-behind counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._session_data)
+            stats["dirty"] = len(self._dirty)
+        return stats
+
+    def close(self) -> None:
+        """Stop the flusher and write any remaining changes"""
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def _load(self, session_id: str) -> UserApplicationData:
+        if self.db is not None:
+            try:
+                doc = self.db.get_application_session(session_id)
+            except Exception as e:
+                print(f"Error loading application session: {str(e)}")
+                doc = None
+            if doc:
+                with self._lock:
+                    self._stats["loads"] += 1
+                return UserApplicationData.from_dict(doc)
+        with self._lock:
+            self._stats["misses"] += 1
+        return UserApplicationData()
+
+    def _remember(self, session_id: str, user_data: UserApplicationData, now: float) -> None:
+        self._session_data[session_id] = (user_data, now)
+        self._session_data.move_to_end(session_id)
+        while len(self._session_data) > self.max_sessions:
+            self._session_data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _mark_dirty(self, session_id: str, user_data: UserApplicationData, changed: Set[str]) -> None:
+        if self.db is None:
+            return
+        pending = self._dirty.get(session_id)
+        if pending is not None and pending[0] is user_data:
+            pending[1].update(changed)
+        else:
+            self._dirty[session_id] = (user_data, set(changed))
+        if len(self._dirty) >= self.flush_batch_size:
+            self._wake.set()
+
+    def _expire_idle(self) -> None:
+        """Drop sessions idle past the TTL; the LRU order puts them first"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            while self._session_data:
+                session_id, (_, last_access) = next(iter(self._session_data.items()))
+                if last_access >= cutoff:
+                    break
+                del self._session_data[session_id]
+                self._stats["expired"] += 1
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self._expire_idle()
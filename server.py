@@ -0,0 +1,474 @@
+"""Headless HTTP API for the careers assistant
+
+Serves the same AIService, JobService and Database as the Streamlit app to
+any client, e.g. a chat widget embedded in the careers site:
+
+    POST /api/chat            one chat turn; with "stream": true the reply is sent as server-sent events
+    GET  /api/jobs            a page of job summaries (?q=, ?cursor=, ?limit=, facet filters such as ?location=)
+    GET  /api/jobs/facets     job counts per category, location and type
+    GET  /api/jobs/{job_id}   one job including its full description
+    GET  /api/sessions/{session_id}/messages   the stored transcript, latest first page (?before=, ?limit=);
+                                               only with TRANSCRIPT_SETTINGS["read_by_session_id"]
+    GET  /healthz
+
+A chat turn is posted as
+
+    {"session_id": "...", "message": "...", "messages": [...], "selected_job": "...", "stream": false}
+
+where messages is the client's transcript so far ({"role", "content"} dicts).
+Clients that omit it get a transcript kept by the server, which they can page
+through to resume a chat when read_by_session_id is enabled (it is off by
+default: the transcript holds the candidate's contact details and the
+session id is its only credential). Omit session_id on the first turn; the
+reply carries one.
+
+Run from the repository root:
+
+    python server.py --workers 4 --port 8080
+
+Workers share the port (SO_REUSEPORT) and each keeps its own ResourcePool
+and metrics: worker N serves them on --metrics-port + N.
+No session state is tied to a worker: the transcript comes with the turn or
+from the transcript store, and application data is re-read from MongoDB
+before a turn and written back once it is answered, so consecutive turns may
+land on different workers.
+"""
+# Imported first, so startup timings start before any heavy import
+from services.startup import get_startup_report
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import uuid
+from typing import Optional
+
+from aiohttp import web
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from config.db_config import JOB_LISTING_SETTINGS, TRANSCRIPT_SETTINGS
+from config.metrics_config import METRICS_SETTINGS
+from config.server_config import SERVER_SETTINGS
+from database import FACET_FIELDS, JOB_DETAIL_PROJECTION, JOB_SUMMARY_PROJECTION
+from services.ai_service import AIService
+from services.async_llm import LLMDeadlineExceeded
+from services.catalog_cache import JobCatalog
+from services.interaction_logger import InteractionLogger
+from services.job_service import JobService
+from services.metrics import MetricsExporter, get_metrics
+from services.resource_pool import ResourcePool, get_resource_pool, install_resource_pool, shutdown_resource_pool
+from services.transcript_store import TranscriptStore
+
+# Load environment variables
+load_dotenv()
+
+AI_SERVICE = web.AppKey("ai_service", AIService)
+JOB_SERVICE = web.AppKey("job_service", JobService)
+TRANSCRIPT_STORE = web.AppKey("transcript_store", TranscriptStore)
+ALLOWED_ORIGINS = web.AppKey("allowed_origins", list)
+WORKER_INDEX = web.AppKey("worker_index", int)
+METRICS_PORT = web.AppKey("metrics_port", object)
+
+# Job fields returned by the detail endpoint
+PUBLIC_JOB_FIELDS = tuple(JOB_SUMMARY_PROJECTION) + tuple(JOB_DETAIL_PROJECTION) + ("employment_types",)
+
+
+def dumps(value) -> str:
+    # ObjectIds and datetimes are sent as strings
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def json_response(payload, status: int = 200) -> web.Response:
+    return web.json_response(payload, status=status, dumps=dumps)
+
+
+def bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=dumps({"error": message}), content_type="application/json")
+
+
+def parse_object_id(value: str):
+    """An _id from a URL or cursor; imported jobs use ObjectIds"""
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+class TokenQueue:
+    """Stream handler that hands tokens from the LLM call to the response writer"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self.queue.put_nowait(token)
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        pass
+
+
+async def chat(request: web.Request) -> web.StreamResponse:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise bad_request("Request body must be JSON")
+    if not isinstance(body, dict):
+        raise bad_request("Request body must be a JSON object")
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise bad_request("message is required")
+    messages = body.get("messages")
+    if messages is not None and not (
+        isinstance(messages, list)
+        and all(isinstance(m, dict) and isinstance(m.get("content"), str) for m in messages)
+    ):
+        raise bad_request("messages must be a list of {role, content} objects")
+
+    session_id = body.get("session_id") or str(uuid.uuid4())
+    ai_service = request.app[AI_SERVICE]
+    # Another worker may have answered this session's previous turn
+    ai_service.session_manager.refresh(session_id)
+    user_context = {"selected_job": await resolve_selected_job(ai_service, session_id, body.get("selected_job"))}
+    if messages is None:
+        # Rebuild the conversation from the stored transcript rather than this worker's copy
+        ai_service.memory_store.discard(session_id)
+
+    if body.get("stream"):
+        return await stream_chat(request, session_id, message, messages, user_context)
+
+    try:
+        response = await ai_service.agenerate_career_response(
+            message, messages, user_context, session_id=session_id
+        )
+    except LLMDeadlineExceeded:
+        raise web.HTTPGatewayTimeout(text=dumps({"error": "The assistant took too long to answer"}),
+                                     content_type="application/json")
+    return json_response(await finish_turn(request, session_id, message, response, messages is None))
+
+
+async def resolve_selected_job(ai_service, session_id: str, selected_job) -> Optional[str]:
+    """The job title for this turn; picking a new one starts an application, so it must be open"""
+    if selected_job is None:
+        return None
+    if not isinstance(selected_job, str) or not selected_job.strip():
+        raise bad_request("selected_job must be a job title")
+    user_data = await asyncio.to_thread(ai_service.session_manager.get_user_data, session_id)
+    if selected_job == user_data.selected_job:
+        # Already applying; a position closed since then is explained in the reply
+        return selected_job
+    job = await asyncio.to_thread(ai_service.job_context.find_job, selected_job)
+    if job is None:
+        raise bad_request(f"Unknown job: {selected_job}")
+    return job["title"]
+
+
+async def stream_chat(request: web.Request, session_id: str, message: str, messages, user_context) -> web.StreamResponse:
+    """Send the reply as server-sent events: session, token..., then done (or error)"""
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        # Keep reverse proxies from buffering the stream
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    async def send(event: str, data: dict) -> None:
+        await response.write(f"event: {event}\ndata: {dumps(data)}\n\n".encode("utf-8"))
+
+    await send("session", {"session_id": session_id})
+    tokens = TokenQueue()
+    turn = asyncio.ensure_future(request.app[AI_SERVICE].agenerate_career_response(
+        message, messages, user_context, session_id=session_id, stream_handler=tokens
+    ))
+    turn.add_done_callback(lambda _: tokens.queue.put_nowait(None))
+    try:
+        streamed = False
+        while (token := await tokens.queue.get()) is not None:
+            await send("token", {"text": token})
+            streamed = True
+        try:
+            text = turn.result()
+            if not streamed:
+                # Local and cached answers arrive whole
+                await send("token", {"text": text})
+            done = await finish_turn(request, session_id, message, text, messages is None)
+        except LLMDeadlineExceeded:
+            await send("error", {"error": "The assistant took too long to answer"})
+        except Exception as e:
+            # Still end the stream with an event the client understands
+            print(f"Error answering chat turn: {str(e)}")
+            await send("error", {"error": "The assistant could not answer"})
+        else:
+            await send("done", done)
+    finally:
+        # The client went away mid-stream
+        if not turn.done():
+            turn.cancel()
+    await response.write_eof()
+    return response
+
+
+async def finish_turn(request: web.Request, session_id: str, message: str, response: str, store_transcript: bool) -> dict:
+    """Persist the turn so any worker can serve the next one"""
+    ai_service = request.app[AI_SERVICE]
+    # Off the event loop, but not left to write-behind: the next turn may reach another worker
+    await asyncio.to_thread(ai_service.session_manager.flush)
+    if store_transcript:
+        await asyncio.to_thread(request.app[TRANSCRIPT_STORE].append, session_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response},
+        ])
+    # Queued and written in batches off the request path
+    request.app[JOB_SERVICE].save_interaction(session_id, message, response)
+    return {
+        "session_id": session_id,
+        "response": response,
+        "application_stage": ai_service.get_application_stage(session_id),
+    }
+
+
+async def list_jobs(request: web.Request) -> web.Response:
+    query = request.query.get("q", "")
+    searching = bool(query.strip())
+    try:
+        limit = min(int(request.query.get("limit", JOB_LISTING_SETTINGS["page_size"])), SERVER_SETTINGS["max_page_size"])
+    except ValueError:
+        raise bad_request("limit must be an integer")
+    if limit < 1:
+        raise bad_request("limit must be positive")
+
+    # Browsing pages by the last _id seen, searching by offset
+    cursor = request.query.get("cursor") or None
+    if cursor is not None:
+        if searching:
+            if not cursor.isdigit():
+                raise bad_request("Invalid cursor")
+            cursor = int(cursor)
+        else:
+            cursor = parse_object_id(cursor)
+    filters = {field: request.query[field] for field in FACET_FIELDS if request.query.get(field)}
+
+    page = await asyncio.to_thread(request.app[JOB_SERVICE].get_job_page, query, cursor, limit, filters)
+    return json_response({
+        "jobs": page.jobs,
+        "next_cursor": None if page.next_cursor is None else str(page.next_cursor),
+    })
+
+
+async def job_facets(request: web.Request) -> web.Response:
+    facets = await asyncio.to_thread(request.app[JOB_SERVICE].get_facets)
+    return json_response({
+        "facets": {
+            field: [{"value": value, "count": count} for value, count in buckets]
+            for field, buckets in facets.items()
+        }
+    })
+
+
+async def job_detail(request: web.Request) -> web.Response:
+    job = await asyncio.to_thread(request.app[JOB_SERVICE].get_job, parse_object_id(request.match_info["job_id"]))
+    if job is None:
+        raise web.HTTPNotFound(text=dumps({"error": "Job not found"}), content_type="application/json")
+    return json_response(dict({field: job.get(field) for field in PUBLIC_JOB_FIELDS}, _id=job["_id"]))
+
+
+async def session_messages(request: web.Request) -> web.Response:
+    """A page of the stored transcript; pass the returned before cursor for the preceding page"""
+    transcript_store = request.app[TRANSCRIPT_STORE]
+    session_id = request.match_info["session_id"]
+    try:
+        limit = min(int(request.query.get("limit", TRANSCRIPT_SETTINGS["window"])), SERVER_SETTINGS["max_page_size"])
+    except ValueError:
+        raise bad_request("limit must be an integer")
+    if limit < 1:
+        raise bad_request("limit must be positive")
+
+    before = request.query.get("before")
+    if before:
+        # "<bucket id>:<index>"
+        bucket_id, _, index = before.rpartition(":")
+        if not bucket_id or not index.isdigit():
+            raise bad_request("Invalid cursor")
+        page = await asyncio.to_thread(
+            transcript_store.earlier, session_id, (parse_object_id(bucket_id), int(index)), limit
+        )
+    else:
+        page = await asyncio.to_thread(transcript_store.recent, session_id, limit)
+    return json_response({
+        "messages": page.messages,
+        "before": None if page.before is None else f"{page.before[0]}:{page.before[1]}",
+    })
+
+
+async def health(request: web.Request) -> web.Response:
+    return json_response({"status": "ok", "pid": os.getpid()})
+
+
+def allowed_origin(request: web.Request) -> Optional[str]:
+    """The request's Origin when it may call the API from a browser"""
+    origin = request.headers.get("Origin")
+    allowed = request.app[ALLOWED_ORIGINS]
+    return origin if origin and ("*" in allowed or origin in allowed) else None
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    """Answer CORS preflight requests from the configured origins"""
+    if request.method == "OPTIONS" and allowed_origin(request):
+        return web.Response(status=204, headers={
+            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Max-Age": "600",
+        })
+    return await handler(request)
+
+
+async def add_cors_headers(request: web.Request, response: web.StreamResponse) -> None:
+    # Runs as headers are sent, so streamed and error responses get them too
+    origin = allowed_origin(request)
+    if origin:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Vary"] = "Origin"
+
+
+def build_services(app: web.Application) -> None:
+    """Shared services for this worker, built like the Streamlit app builds them"""
+    report = get_startup_report()
+    pool = get_resource_pool()
+    metrics = get_metrics()
+    metrics.register_collector("startup", report.stats)
+    pool.get_or_create("metrics_exporter", lambda: worker_metrics_exporter(
+        metrics, app[WORKER_INDEX], app[METRICS_PORT]
+    ).start())
+    with report.step("database"):
+        db = pool.get_database()
+    catalog = pool.get_or_create("job_catalog", lambda: JobCatalog(db), owner=db)
+    interaction_logger = pool.get_or_create(
+        "interaction_logger", lambda: metrics.collected("interaction_logger", InteractionLogger(db))
+    )
+    job_service = pool.get_or_create(
+        "job_service", lambda: JobService(db, catalog=catalog, interaction_logger=interaction_logger)
+    )
+    transcript_store = pool.get_or_create("transcript_store", lambda: TranscriptStore(db))
+    app[JOB_SERVICE] = job_service
+    app[TRANSCRIPT_STORE] = transcript_store
+    with report.step("ai_service"):
+        app[AI_SERVICE] = AIService(
+            db_client=db, catalog=catalog, search_index=job_service.search_index, transcript_store=transcript_store
+        )
+    # Load the catalog (and search index) before the first request
+    with report.step("job_catalog"):
+        catalog.get_jobs()
+
+
+def worker_metrics_exporter(metrics, worker_index: int, metrics_port: Optional[int]) -> MetricsExporter:
+    """An exporter of this worker's registry on its own port and, if configured, its own file"""
+    textfile_path = METRICS_SETTINGS["textfile_path"]
+    if textfile_path:
+        root, extension = os.path.splitext(textfile_path)
+        textfile_path = f"{root}-server-{worker_index}{extension}"
+    return MetricsExporter(
+        metrics,
+        host=METRICS_SETTINGS["http_host"] if metrics_port is not None else "",
+        port=metrics_port + worker_index if metrics_port is not None else None,
+        textfile_path=textfile_path or "",
+    )
+
+
+async def on_startup(app: web.Application) -> None:
+    await asyncio.to_thread(build_services, app)
+    report = get_startup_report()
+    report.mark("services_ready")
+    report.log()
+
+
+async def on_cleanup(app: web.Application) -> None:
+    # The async LLM client's connections belong to this loop
+    await app[AI_SERVICE].async_llm.aclose()
+    # Writes pending session data and interactions
+    await asyncio.to_thread(shutdown_resource_pool)
+
+
+def create_app(allowed_origins: Optional[list] = None, worker_index: int = 0,
+               metrics_port: Optional[int] = SERVER_SETTINGS["metrics_port"]) -> web.Application:
+    app = web.Application(middlewares=[cors_middleware])
+    app[ALLOWED_ORIGINS] = list(allowed_origins if allowed_origins is not None else SERVER_SETTINGS["allowed_origins"])
+    app[WORKER_INDEX] = worker_index
+    app[METRICS_PORT] = metrics_port
+    app.router.add_post("/api/chat", chat)
+    app.router.add_get("/api/jobs", list_jobs)
+    app.router.add_get("/api/jobs/facets", job_facets)
+    app.router.add_get("/api/jobs/{job_id}", job_detail)
+    if TRANSCRIPT_SETTINGS["read_by_session_id"]:
+        app.router.add_get("/api/sessions/{session_id}/messages", session_messages)
+    app.router.add_get("/healthz", health)
+    app.on_response_prepare.append(add_cors_headers)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_worker(host: str, port: int, reuse_port: bool, allowed_origins: list,
+               mongo_uri: Optional[str] = None, llm_base_url: Optional[str] = None,
+               metrics_port: Optional[int] = None, worker_index: int = 0) -> None:
+    """Serve the API in this process"""
+    if mongo_uri or llm_base_url:
+        install_resource_pool(ResourcePool(mongo_uri=mongo_uri, llm_base_url=llm_base_url))
+    web.run_app(
+        create_app(allowed_origins, worker_index=worker_index, metrics_port=metrics_port),
+        host=host,
+        port=port,
+        reuse_port=reuse_port,
+        print=None,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless chat and jobs API")
+    parser.add_argument("--host", default=SERVER_SETTINGS["host"])
+    parser.add_argument("--port", type=int, default=SERVER_SETTINGS["port"])
+    parser.add_argument("--workers", type=int, default=SERVER_SETTINGS["workers"],
+                        help="worker processes; 0 starts one per CPU")
+    parser.add_argument("--allow-origin", action="append", dest="allowed_origins",
+                        help="browser origin allowed to call the API (repeatable)")
+    parser.add_argument("--mongo-uri", help="overrides the MONGODB_URI secret")
+    parser.add_argument("--llm-url", help="overrides the DEEPSEEK_BASE_URL secret")
+    parser.add_argument("--metrics-port", type=int, default=SERVER_SETTINGS["metrics_port"],
+                        help="metrics port of the first worker; worker N uses this port + N")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    allowed_origins = args.allowed_origins or SERVER_SETTINGS["allowed_origins"]
+    worker_args = (args.host, args.port, workers > 1, allowed_origins, args.mongo_uri, args.llm_url, args.metrics_port)
+    print(f"Serving on http://{args.host}:{args.port} with {workers} worker(s)")
+    if args.metrics_port is not None:
+        print(f"Metrics on ports {args.metrics_port}-{args.metrics_port + workers - 1}, one per worker")
+    if workers == 1:
+        run_worker(*worker_args)
+        return
+
+    # Fresh interpreters: MongoClient and the LLM clients must not be inherited through fork
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=worker_args + (index,), name=f"server-worker-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Workers got the same SIGINT and shut down on their own
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
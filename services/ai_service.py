@@ -1,60 +1,43 @@
 
+import asyncio
+import random
 import uuid
-from openai import OpenAI
+from dataclasses import dataclass
 import streamlit as st
-from langchain_community.chat_models import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationChain
 from langchain_core.prompts import PromptTemplate
-from langchain_community.callbacks import StreamlitCallbackHandler
-from models.session_data import SessionDataManager
+from models.session_data import CANDIDATE_FIELDS, SessionDataManager
+from services.application_flow import QUESTIONS, ApplicationFlow, extract_email, extract_phone
+from services.intent_classifier import GENERIC, GREETING, IntentClassifier
+from services.job_context import UNKNOWN_ROLE_MESSAGE, JobContextBuilder
+from services.custom_callbacks import CustomStreamlitCallbackHandler, StreamMetrics
+from services.conversation_memory import ConversationMemoryStore, ConversationSummarizer, SessionMemory
+from services.funnel_analytics import FunnelRollups
+from services.catalog_cache import JobCatalog
+from services.metrics import get_metrics
+from services.resource_pool import get_resource_pool
+from services.response_cache import ResponseCache, contains_personal_data, make_cache_key
 from typing import Optional
-import re
+from config.ai_config import INTENT_SETTINGS
+from config.db_config import TRANSCRIPT_SETTINGS
 
-class AIService:
-    def __init__(self, db_client=None):
-        self.db = db_client
-        self.session_manager = SessionDataManager()
+INTENT_CLASSIFIER_PROMPTS = {
+    GREETING: "You are a classifier that responds with only 'true' or 'false'. Determine if the following text is a greeting response (like 'hi', 'hello', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening', etc.).",
+    GENERIC: "You are a classifier that responds with only 'true' or 'false'. Determine if the following text is a generic/basic response (like 'ok', 'yes', 'thanks', etc.).",
+}
 
-        # Get available jobs from database
-        self.available_jobs = self.db.get_all_jobs() if self.db else []
-        
-        # Configure DeepSeek client
-        self.client = OpenAI(
-            base_url="https://api.deepseek.com",  # DeepSeek API endpoint
-            api_key=st.secrets.get("DEEPSEEK_API_KEY", "")  # Use DeepSeek API key
-        )
-        
-        # Update LangChain to use DeepSeek
-        self.llm = ChatOpenAI(
-            model="deepseek-chat",  # Use DeepSeek model
-            temperature=0.7,
-            openai_api_key=st.secrets.get("DEEPSEEK_API_KEY", ""),
-            openai_api_base="https://api.deepseek.com"
-        )
-        
-        # Initialize or get session ID
-        if 'session_id' not in st.session_state:
-            st.session_state.session_id = str(uuid.uuid4())
-        
-        # Format available jobs text
-        self.available_jobs_text = "\n".join([f"- {job['title']}" for job in self.available_jobs])
-
-        # Initialize memory with return_messages=True and input/output keys
-        self.memory = ConversationBufferMemory(
-            return_messages=True,
-            memory_key="history",
-            input_key="input"
-        )
+metrics = get_metrics()
+TURNS = metrics.counter("ai_turns_total", "Chat turns by where the answer came from", ["source"])
 
-        # Create prompt template
-        self.prompt = PromptTemplate(
-            input_variables=["history", "input"],  # Remove available_jobs_text from input_variables
-            template="""You are AI hiring assistant named 'Recruiter'. 
+# Local answers to greetings and small talk before a role is picked (varied, as the prompt asks)
+BROWSE_MESSAGES = (
+    "Hello! 👋 Take a look at the open positions in the right tab and click 'I'm Interested' on the role you'd like to apply for.",
+    "Hi there! 😊 All our openings are listed in the right tab. Pick the one you like with 'I'm Interested' and we'll get started.",
+    "Hey! Happy to help you apply. 🎯 Browse the positions in the right tab and click 'I'm Interested' on the role that suits you.",
+)
 
-Available Positions in right tab:
-""" + self.available_jobs_text + """
+# Static part of the career prompt; everything after it varies per turn
+CAREER_PROMPT_PREFIX = """You are AI hiring assistant named 'Recruiter'. 
 
 Follow these guidelines:
 
@@ -68,8 +51,9 @@ Follow these guidelines:
    - Keep responses concise and focused
 
 2. Job Selection Rules:
-   - ONLY accept job selections from the above list of available positions
-   - If user mentions any job not from the above list, say: "I don't see that position in our current openings. Please check the available positions in the right tab and click 'I'm Interested' on the role you'd like to apply for. 🎯"
+   - The Job context section lists the selected position, or the open positions that match the conversation
+   - ONLY accept job selections of open positions; all of them are listed in the right tab
+   - If user mentions a job that is not open, say: """ + UNKNOWN_ROLE_MESSAGE + """"
    - Do not proceed with any job-related questions until a valid selection is made from the available positions
 
 3. Initial Interaction:
@@ -94,87 +78,353 @@ Follow these guidelines:
     - Tell them that a 20 minute interview is scheduled at a time of their convenience after connecting with them if they provide all key information and all eligiblity passes else tell them that they are not eligible for the post.
     - After this everytime user asks anything tell them that their interview is already scheduled or they are not eligible for the post.
 
-Current conversation:
-{history}
+"""
+
+@dataclass
+class Turn:
+    """State of one chat turn between preparing the prompt and recording the answer"""
+    session_id: str
+    user_input: str
+    record: bool
+    history: str = ""
+    job_context: str = ""
+    memory: Optional[SessionMemory] = None
+    cache_key: Optional[str] = None
+    response: Optional[str] = None
+    local: bool = False
+    generated: bool = False
+
+def classify_with_llm(llm, intent: str, text: str) -> bool:
+    """Ask the LLM whether text expresses the intent"""
+    messages = [
+        SystemMessage(content=INTENT_CLASSIFIER_PROMPTS[intent]),
+        HumanMessage(content=text.lower())
+    ]
+    response = llm.invoke(messages, config={"tags": ["intent"]})
+    return response.content.lower().strip() == 'true'
+
+def current_session_id() -> str:
+    """The Streamlit session's id, created on first use
+
+    Read per call rather than in __init__, so services can be built off the
+    script thread (e.g. by the startup warm-up).
+    """
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    return st.session_state.session_id
+
+
+class AIService:
+    def __init__(self, db_client=None, catalog=None, memory_store=None, search_index=None, transcript_store=None):
+        self.db = db_client
+        pool = get_resource_pool()
+
+        # Job details come from the shared catalog cache, never from a per-session copy.
+        # Shared services are keyed by the database or catalog they are built on.
+        if catalog is None:
+            catalog_db = db_client or pool.get_database()
+            catalog = pool.get_or_create("job_catalog", lambda: JobCatalog(catalog_db), owner=catalog_db)
+        self.catalog = catalog
+        self.job_context = pool.get_or_create(
+            "job_context", lambda: JobContextBuilder(catalog, search_index=search_index), owner=catalog
+        )
+
+        # Reuse the process-wide LLM router instead of opening new connections
+        self.llm = pool.get_chat_llm()
+        self.async_llm = pool.get_async_llm()
+
+        # Application data outlives reruns and processes: LRU in memory, MongoDB behind it
+        self.funnel = None
+        if self.db is not None:
+            # Stage changes roll up into per-job, per-day funnel counts
+            self.funnel = pool.get_or_create(
+                "funnel_rollups", lambda: metrics.collected("funnel", FunnelRollups(self.db)), owner=self.db
+            )
+        self.session_manager = pool.get_or_create(
+            "session_data",
+            lambda: metrics.collected("session_data", SessionDataManager(db=self.db, funnel=self.funnel)),
+            owner=self.db
+        )
+        self.application_flow = ApplicationFlow(self.session_manager)
+
+        # Local intent classification; only low-confidence cases reach the LLM
+        llm = self.llm
+        self.intent_classifier = pool.get_or_create(
+            "intent_classifier",
+            lambda: metrics.collected(
+                "intent_classifier",
+                IntentClassifier(escalate=lambda intent, text: classify_with_llm(llm, intent, text))
+            )
+        )
+
+        # Conversation windows persist across reruns in a process-wide store
+        if memory_store is None:
+            memory_store = pool.get_or_create(
+                "conversation_memory", lambda: metrics.collected("conversation_memory", ConversationMemoryStore())
+            )
+        self.memory_store = memory_store
+        # Callers that pass no message_history keep their transcript here
+        self.transcript_store = transcript_store
+        self.summarizer = pool.get_or_create(
+            "conversation_summarizer", lambda: ConversationSummarizer(self.llm)
+        )
+        self.response_cache = pool.get_or_create(
+            "response_cache", lambda: metrics.collected("response_cache", ResponseCache(db=self.db)), owner=self.db
+        )
+        self.stream_metrics = pool.get_or_create(
+            "stream_metrics", lambda: metrics.collected("stream", StreamMetrics())
+        )
         
+        # The prompt is the same for every session, so it is compiled once per process
+        self.prompt = pool.get_or_create(
+            "career_prompt",
+            lambda: PromptTemplate(
+                input_variables=["history", "job_context", "input"],
+                template=CAREER_PROMPT_PREFIX + """Current conversation:
+{history}
+
+Job context:
+{job_context}
+
 Human: {input}
 Assistant: """
+            )
         )
 
-        # Initialize conversation chain
-        self.chain = ConversationChain(
-            llm=self.llm,
-            prompt=self.prompt,
-            memory=self.memory,
-            verbose=False
-        )
+        # Conversation history and job context are supplied per call
+        self.chain = pool.get_or_create("career_chain", lambda: self.prompt | self.llm)
 
     def generate_career_response(
         self, 
         user_input: str, 
         message_history: list = None,
         user_context: dict = None,
-        session_id: str = None
+        session_id: str = None,
+        stream_handler=None
     ) -> str:
         if session_id is None:
-            session_id = st.session_state.session_id
-            
+            session_id = current_session_id()
+
+        with metrics.span("ai.turn", sampled=False):
+            turn = self._prepare_turn(user_input, message_history, user_context, session_id)
+            if turn.response is None:
+                # Generate response using the conversation chain, streaming tokens to the handler
+                config = {"tags": ["chat"]}
+                if stream_handler:
+                    config["callbacks"] = [stream_handler]
+                response = self.chain.invoke(
+                    {
+                        "history": turn.history,
+                        "job_context": turn.job_context,
+                        "input": user_input
+                    },
+                    config=config
+                )
+                turn.response = response.content
+                turn.generated = True
+            return self._finish_turn(turn)
+
+    async def agenerate_career_response(
+        self,
+        user_input: str,
+        message_history: list = None,
+        user_context: dict = None,
+        session_id: str = None,
+        stream_handler=None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """Async variant of generate_career_response for event-loop callers
+
+        The LLM call goes through the pooled router (hedging, failover, bounded
+        concurrency, deadline, retry with backoff); the short blocking steps around it run
+        in the default executor so the loop stays free.
+        """
+        if session_id is None:
+            session_id = current_session_id()
+
+        with metrics.span("ai.turn", sampled=False):
+            turn = await asyncio.to_thread(
+                self._prepare_turn, user_input, message_history, user_context, session_id
+            )
+            if turn.response is None:
+                prompt_text = self.prompt.format(
+                    history=turn.history, job_context=turn.job_context, input=user_input
+                )
+                turn.response = await self.async_llm.complete(
+                    [{"role": "user", "content": prompt_text}],
+                    on_token=stream_handler.on_llm_new_token if stream_handler else None,
+                    deadline=deadline,
+                    operation="chat"
+                )
+                turn.generated = True
+                if stream_handler:
+                    stream_handler.on_llm_end(None)
+            return await asyncio.to_thread(self._finish_turn, turn)
+
+    def _prepare_turn(self, user_input: str, message_history: Optional[list], user_context: Optional[dict], session_id: str) -> Turn:
+        """Everything before the LLM call; sets turn.response when no call is needed"""
+        turn = Turn(session_id=session_id, user_input=user_input, record=message_history is None)
         user_data = self.session_manager.get_user_data(session_id)
 
-        # Update conversation memory with message history if provided
-        if message_history:
-            for msg in message_history:
-                if msg["role"] == "user":
-                    self.memory.save_context(
-                        {"input": msg["content"]}, 
-                        {"output": ""}
-                    )
-                elif msg["role"] == "assistant":
-                    self.memory.save_context(
-                        {"input": ""}, 
-                        {"output": msg["content"]}
-                    )
-        
-        # Generate response using the conversation chain
-        response = self.chain.invoke(
-            {
-                "input": user_input
-            }
+        # Start a fresh application when the candidate picks a (different) job
+        selected_job = (user_context or {}).get("selected_job")
+        if selected_job and user_data.selected_job != selected_job:
+            self.session_manager.start_application(session_id, selected_job)
+
+        # Data-capture turns are validated and answered locally when possible, and so
+        # are requests for roles the catalog does not have
+        local_response = self.application_flow.handle(session_id, user_input)
+        if local_response is None and not selected_job and self.job_context.is_unknown_role(user_input):
+            local_response = UNKNOWN_ROLE_MESSAGE
+        if local_response is not None:
+            if turn.record:
+                memory = self.memory_store.get(session_id, loader=self._transcript_loader(session_id))
+                with memory.lock:
+                    memory.record_turn(user_input, local_response)
+            turn.response = local_response
+            turn.local = True
+            return turn
+
+        # The current input is passed separately, so keep it out of the history
+        if message_history and message_history[-1].get("role") == "user" \
+                and message_history[-1].get("content") == user_input:
+            message_history = message_history[:-1]
+
+        # Fold in only the messages added since the previous turn
+        turn.memory = self.memory_store.get(session_id, message_history, loader=self._transcript_loader(session_id))
+
+        with turn.memory.lock:
+            history = turn.memory.get_history()
+            last_reply = turn.memory.last_reply()
+            # Without a transcript from the caller, the memory's window supplies the recent messages
+            recent_messages = message_history if message_history is not None else turn.memory.recent_messages()
+
+        # Greetings and small talk before a role is picked need neither the cache nor the LLM
+        if self.session_manager.get_application_stage(session_id) is None:
+            turn.response = self._small_talk_response(user_input, last_reply)
+            if turn.response is not None:
+                if turn.record:
+                    with turn.memory.lock:
+                        turn.memory.record_turn(user_input, turn.response)
+                turn.local = True
+                return turn
+        with turn.memory.lock:
+            turn.memory.note_prompt()
+
+        turn.job_context = self.job_context.build(user_input, recent_messages, selected_job)
+
+        # Answers that cannot depend on personal data are shared between candidates
+        # whose conversations are at the same point
+        turn.cache_key = self._response_cache_key(
+            session_id, user_input, history, f"{last_reply}\x1f{turn.job_context}"
         )
-        
-        return response["response"]
+        turn.response = self.response_cache.get(turn.cache_key) if turn.cache_key else None
+
+        if turn.response is None:
+            # Facts already captured are stated once instead of relying on old turns
+            candidate_context = self._candidate_context(session_id)
+            if candidate_context:
+                history = f"{candidate_context}\n{history}"
+        turn.history = history
+        return turn
+
+    def _finish_turn(self, turn: Turn) -> str:
+        """Everything after the LLM call: caching, memory and summarization"""
+        TURNS.inc(source="local" if turn.local else "llm" if turn.generated else "cache")
+        if turn.local:
+            return turn.response
+
+        if turn.generated and turn.cache_key and not contains_personal_data(turn.response):
+            self.response_cache.set(turn.cache_key, turn.response)
+
+        # Callers without a transcript of their own rely on the memory to keep one
+        if turn.record:
+            with turn.memory.lock:
+                turn.memory.record_turn(turn.user_input, turn.response)
+
+        # Compact older turns in the background once the response is ready
+        self.summarizer.schedule(turn.memory)
+
+        return turn.response
+
+    def remember_messages(self, session_id: str, messages: list) -> None:
+        """Add messages shown outside a turn (e.g. after a job is selected) to the conversation memory
+
+        Call it before appending them to the stored transcript, which a new
+        memory is rebuilt from.
+        """
+        memory = self.memory_store.get(session_id, loader=self._transcript_loader(session_id))
+        with memory.lock:
+            for message in messages:
+                memory.append(message.get("role"), message.get("content"))
+
+    def _transcript_loader(self, session_id: str):
+        """Reads the stored transcript tail when this process has no memory of the session"""
+        if self.transcript_store is None:
+            return None
+        return lambda: self.transcript_store.recent(session_id, TRANSCRIPT_SETTINGS["rehydrate_messages"]).messages
+
+    def create_stream_handler(self, container) -> CustomStreamlitCallbackHandler:
+        """Handler that streams the next response into a Streamlit placeholder"""
+        return CustomStreamlitCallbackHandler(container, metrics=self.stream_metrics)
+
+    def get_application_stage(self, session_id: str) -> Optional[str]:
+        """Current step of the session's application flow"""
+        return self.session_manager.get_application_stage(session_id)
+
+    def _response_cache_key(self, session_id: str, user_input: str, history: str, context: str) -> Optional[str]:
+        """Cache key for this turn, or None when the answer may involve personal data"""
+        user_data = self.session_manager.get_user_data(session_id)
+        if any(getattr(user_data, field) is not None for field in CANDIDATE_FIELDS) \
+                or contains_personal_data(user_input) or contains_personal_data(history):
+            self.response_cache.record_skip()
+            return None
+        return make_cache_key(
+            user_input,
+            self.session_manager.get_application_stage(session_id),
+            user_data.selected_job,
+            self.catalog.version if self.catalog else None,
+            context
+        )
+
+    def _candidate_context(self, session_id: str) -> str:
+        """Collected facts plus the pending question, so the LLM stays in step with the flow"""
+        lines = []
+        facts = self.session_manager.get_user_data(session_id).describe()
+        if facts:
+            lines.append(f"Candidate details collected so far: {facts}")
+        stage = self.session_manager.get_application_stage(session_id)
+        if stage in QUESTIONS:
+            lines.append(f"Next question to ask: {self.application_flow.question(session_id, stage, acknowledge=False)}")
+        return "\n".join(lines)
+
+    def _small_talk_response(self, user_input: str, last_reply: str) -> Optional[str]:
+        """A local answer for greetings, and for "ok"/"thanks" when there is nothing else to reply to"""
+        # Longer messages carry a question of their own
+        if len(user_input.split()) > INTENT_SETTINGS["max_words"]:
+            return None
+        if self._is_greeting(user_input):
+            return random.choice(BROWSE_MESSAGES)
+        # A "yes" to a question the assistant asked needs the LLM
+        if (not last_reply or last_reply in BROWSE_MESSAGES) and self._is_generic_response(user_input):
+            return random.choice(BROWSE_MESSAGES)
+        return None
 
     def _is_greeting(self, text):
         """Check if input is a greeting"""
-        messages = [
-            SystemMessage(content="You are a classifier that responds with only 'true' or 'false'. Determine if the following text is a greeting response (like 'hi', 'hello', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening', etc.)."),
-            HumanMessage(content=text.lower())  # Call lower() here
-        ]
-        
-        response = self.llm.invoke(messages)
-        return response.content.lower().strip() == 'true'
+        return self.intent_classifier.is_greeting(text)
 
     def _is_generic_response(self, text: str) -> bool:
-        """Check if input is a generic response using GPT"""
-        messages = [
-            SystemMessage(content="You are a classifier that responds with only 'true' or 'false'. Determine if the following text is a generic/basic response (like 'ok', 'yes', 'thanks', etc.)."),
-            HumanMessage(content=text.lower())  # Call lower() here
-        ]
-        
-        response = self.llm.invoke(messages)
-        return response.content.lower().strip() == 'true'
+        """Check if input is a generic response"""
+        return self.intent_classifier.is_generic(text)
 
     def _extract_email(self, text: str) -> Optional[str]:
         """Extract email from text using regex"""
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        match = re.search(email_pattern, text)
-        return match.group(0) if match else None
+        return extract_email(text)
 
     def _extract_phone(self, text: str) -> Optional[str]:
         """Extract phone number from text using regex"""
-        phone_pattern = r'\b\d{10,12}\b'
-        match = re.search(phone_pattern, text)
-        return match.group(0) if match else None
+        return extract_phone(text)
 
     def get_collected_data(self, session_id: str) -> dict:
         """Get all collected data for a session"""
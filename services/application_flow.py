@@ -0,0 +1,282 @@
+import re
+from typing import Callable, Dict, Optional
+
+from models.session_data import (
+    ELIGIBILITY_FIELDS,
+    STAGE_COMPLETED,
+    STAGE_NOT_ELIGIBLE,
+    SessionDataManager,
+)
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'(?<![\w@])\+?\(?\d[\d\s().-]{8,18}\d(?![\w@])')
+NAME_PREFIX_PATTERN = re.compile(
+    r"^\s*(?:(?:hi|hello|hey)[,!.]?\s+)?(?:my\s+(?:full\s+)?name\s+is|my\s+name'?s|i\s+am|i'm|im|this\s+is|it'?s|name\s*:)\s+",
+    re.IGNORECASE
+)
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*){0,3}$")
+# "I am"/"I do"... only as the whole answer ("I am.", "I do, yes"), never "I am a student"
+YES_PATTERN = re.compile(
+    r"^\s*(?:(?:yes|yeah|yea|yep|yup|y|sure|correct|no problem|no worries|not a problem)\b"
+    r"|(?:of course|absolutely|definitely|certainly)\b(?!\s+not\b)"
+    r"|(?:i am|i'm|im|i can|i do|i will)(?=\s*(?:[,.!]|$)))",
+    re.IGNORECASE
+)
+# "no" only as the answer itself: "no", "no.", "no, I'm not", never "no problem"
+NO_PATTERN = re.compile(
+    r"^\s*(?:(?:no|nope|nah|n)(?:\s*$|\s*[,.!]|\s+(?:i|i'm|im|thanks|thank|sorry|sir|ma'?am)\b)"
+    r"|(?:of course|absolutely|definitely|certainly)\s+not\b|not really|not at all"
+    r"|(?:i\s+)?(?:am not|can'?t|cannot|can not|do not|don'?t|will not|won'?t)|i'?m not)",
+    re.IGNORECASE
+)
+# Any negation left in a reply that starts like a yes ("sure, but I can't") makes it unclear
+NEGATION_PATTERN = re.compile(
+    r"\b(?:not|no|never|cannot|can'?t|don'?t|doesn'?t|won'?t|isn'?t|aren'?t)\b(?!\s+(?:a\s+)?(?:problem|worries)\b)",
+    re.IGNORECASE
+)
+UNSURE_PATTERN = re.compile(
+    r"\b(?:not sure|unsure|maybe|perhaps|depends|don'?t know|idk|what|why|how)\b|\?",
+    re.IGNORECASE
+)
+AGE_PATTERN = re.compile(r"\b(\d{1,3})\b")
+# Ages in words ("fifteen", "twenty one") are left to the LLM instead of read as a yes
+NUMBER_WORD_PATTERN = re.compile(
+    r"\b(?:zero|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|\w+teen"
+    r"|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)\b",
+    re.IGNORECASE
+)
+# "under 16", "not yet 16", "over 18": the number alone does not answer the question
+AGE_QUALIFIER_PATTERN = re.compile(
+    r"\b(?:under|below|over|above|not|less|more|younger|older|almost|nearly|turning|soon)\b",
+    re.IGNORECASE
+)
+# "am"/"pm" only after a time or spelled with dots, so "I am flexible" is not a shift
+MORNING_PATTERN = re.compile(
+    r"\b(?:morning|mornings|day|days|daytime)\b|\d\s*am\b|\d\s*a\.m\.|\ba\.m\.",
+    re.IGNORECASE
+)
+NIGHT_PATTERN = re.compile(
+    r"\b(?:night|nights|evening|evenings|overnight)\b|\d\s*pm\b|\d\s*p\.m\.|\bp\.m\.",
+    re.IGNORECASE
+)
+# Replies that name a shift without choosing it ("either", "not mornings")
+SHIFT_UNCLEAR_PATTERN = re.compile(
+    r"\b(?:any|either|both|neither|flexible|whichever|whatever|preference|matter|not|no|don'?t|can'?t|never)\b|\?",
+    re.IGNORECASE
+)
+CONTACT_PHONE_PATTERN = re.compile(r"\b(?:phone|call|text|sms|mobile|cell)\b", re.IGNORECASE)
+CONTACT_EMAIL_PATTERN = re.compile(r"\b(?:e-?mail|mail)\b", re.IGNORECASE)
+
+# Common words that answer or ask something but are never part of somebody's name
+NOT_A_NAME = frozenset({
+    "hi", "hello", "hey", "good", "morning", "afternoon", "evening", "yes", "no",
+    "not", "ok", "okay", "thanks", "thank", "sure", "yeah", "nope", "please",
+    "sorry", "what", "whats", "what's", "why", "how", "when", "where", "who",
+    "which", "help", "job", "jobs", "apply", "position", "positions", "role",
+    "tell", "show", "give", "send", "see", "know", "want", "need", "like",
+    "looking", "more", "about", "other", "another", "any", "some", "all",
+    "me", "you", "your", "my", "i", "it", "this", "that", "there", "here",
+    "is", "are", "was", "do", "does", "can", "could", "would",
+    "the", "a", "an", "and", "or", "of", "to", "for", "in", "on", "at", "with",
+    "salary", "pay", "wage", "wages", "hours", "shift", "benefits", "location",
+    "details", "info", "information", "question", "wait", "again", "else",
+})
+
+# Words a self-introduction is followed by when it is not a name ("I'm from India", "I'm over 18")
+NOT_A_NAME_START = frozenset({
+    "from", "in", "at", "on", "to", "with", "for", "of", "by", "over", "under",
+    "above", "below", "into", "about", "a", "an", "the", "not", "very", "so",
+    "just", "still", "currently", "living", "based", "interested", "ready",
+})
+
+# Words of job titles; a reply made of them is more likely a role than a name
+JOB_TITLE_WORDS = frozenset({
+    "operator", "driver", "associate", "manager", "supervisor", "technician",
+    "loader", "unloader", "picker", "packer", "clerk", "specialist", "assistant",
+    "agent", "representative", "forklift", "warehouse", "lead", "coordinator",
+    "handler", "mechanic", "worker", "helper", "cashier", "attendant", "analyst",
+    "engineer", "customer", "service", "material", "materials", "inventory",
+    "shipping", "receiving", "delivery", "production", "maintenance", "general",
+    "labor", "laborer", "team", "member", "sorter", "stocker", "order", "selector",
+})
+
+# Longer replies are treated as free-form and left to the LLM
+MAX_SHORT_ANSWER_WORDS = 8
+MINIMUM_AGE = 16
+
+QUESTIONS = {
+    'name': "To get started, could you please tell me your full name?",
+    'phone': "Thanks, {name}! 😊 What's the best phone number to reach you?",
+    'email': "What's your email address? 📧",
+    'age_consent': "Are you 16 years of age or older?",
+    'country_consent': "Are you authorized to work in the USA?",
+    'shift_preference': "Which shift do you prefer: Morning or Night? 🌅🌙",
+    'environment_consent': "Are you comfortable working in a fast paced environment?",
+    'contact_preference': "Last question: how would you like us to connect with you, via phone or email?",
+}
+
+ACKNOWLEDGEMENTS = ["Great!", "Perfect, thank you.", "Thanks!", "Noted. 👍"]
+
+NOT_ELIGIBLE_MESSAGE = (
+    "Thank you for your honesty. Unfortunately, you are not eligible for the {job} position "
+    "at this time. We appreciate your interest! 🙏"
+)
+COMPLETED_MESSAGE = (
+    "Thank you, {name}! 🎉 You've completed your application for the {job} position. "
+    "We'll connect with you via {contact} to schedule a 20 minute interview at a time of your convenience."
+)
+COMPLETED_REMINDER = (
+    "Your application for the {job} position is complete and your 20 minute interview will be "
+    "scheduled at a time of your convenience. We'll be in touch soon! 😊"
+)
+NOT_ELIGIBLE_REMINDER = (
+    "As mentioned earlier, you are not eligible for the {job} position at this time. "
+    "Thank you for your interest!"
+)
+
+
+def extract_email(text: str) -> Optional[str]:
+    """Extract an email address from text"""
+    match = EMAIL_PATTERN.search(text)
+    return match.group(0) if match else None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """Extract a 10-12 digit phone number, ignoring separators"""
+    for match in PHONE_PATTERN.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        if 10 <= len(digits) <= 12:
+            return digits
+    return None
+
+
+def extract_name(text: str) -> Optional[str]:
+    """Extract a plausible full name (at least two words), or None to let the LLM handle the reply"""
+    if "?" in text or NUMBER_WORD_PATTERN.search(text):
+        return None
+    text = text.strip()
+    candidate = NAME_PREFIX_PATTERN.sub("", text).strip(" .!")
+    if not NAME_PATTERN.match(candidate):
+        return None
+    words = candidate.split()
+    if len(words) < 2 or any(len(re.sub(r"[^A-Za-z]", "", word)) < 2 for word in words):
+        return None
+    lowered = [word.lower() for word in words]
+    if candidate != text.strip(" .!") and lowered[0] in NOT_A_NAME_START:
+        return None
+    if any(word in NOT_A_NAME or word in JOB_TITLE_WORDS for word in lowered):
+        return None
+    return " ".join(word[:1].upper() + word[1:] for word in words)
+
+
+def extract_yes_no(text: str) -> Optional[bool]:
+    """Interpret a short yes/no reply; anything unclear returns None"""
+    if len(text.split()) > MAX_SHORT_ANSWER_WORDS or UNSURE_PATTERN.search(text):
+        return None
+    is_no = bool(NO_PATTERN.match(text))
+    is_yes = bool(YES_PATTERN.match(text))
+    if is_yes == is_no:
+        return None
+    if is_yes and NEGATION_PATTERN.search(text):
+        return None
+    return is_yes
+
+
+def extract_age_consent(text: str) -> Optional[bool]:
+    """Accept either a stated age or a yes/no reply"""
+    if len(text.split()) > MAX_SHORT_ANSWER_WORDS:
+        return None
+    if NUMBER_WORD_PATTERN.search(text):
+        return None
+    # A stated age wins over the wording ("I'm 15" is a no)
+    ages = AGE_PATTERN.findall(text)
+    if ages and AGE_QUALIFIER_PATTERN.search(text):
+        return None
+    if len(ages) == 1:
+        return int(ages[0]) >= MINIMUM_AGE
+    if ages:
+        return None
+    return extract_yes_no(text)
+
+
+def extract_shift(text: str) -> Optional[str]:
+    """Map a reply to the Morning or Night shift"""
+    if len(text.split()) > MAX_SHORT_ANSWER_WORDS or SHIFT_UNCLEAR_PATTERN.search(text):
+        return None
+    morning = bool(MORNING_PATTERN.search(text))
+    night = bool(NIGHT_PATTERN.search(text))
+    if morning == night:
+        return None
+    return "Morning" if morning else "Night"
+
+
+def extract_contact_preference(text: str) -> Optional[str]:
+    """Map a reply to Phone or Email"""
+    if len(text.split()) > MAX_SHORT_ANSWER_WORDS:
+        return None
+    phone = bool(CONTACT_PHONE_PATTERN.search(text))
+    email = bool(CONTACT_EMAIL_PATTERN.search(text))
+    if phone == email:
+        return None
+    return "Phone" if phone else "Email"
+
+
+EXTRACTORS: Dict[str, Callable[[str], Optional[object]]] = {
+    'name': extract_name,
+    'phone': extract_phone,
+    'email': extract_email,
+    'age_consent': extract_age_consent,
+    'country_consent': extract_yes_no,
+    'shift_preference': extract_shift,
+    'environment_consent': extract_yes_no,
+    'contact_preference': extract_contact_preference,
+}
+
+
+class ApplicationFlow:
+    """Deterministic state machine for the data-capture part of an application
+
+    handle() answers locally when the reply can be validated for the current
+    field, and returns None when the LLM should take the turn instead.
+    """
+
+    def __init__(self, session_manager: SessionDataManager):
+        self.session_manager = session_manager
+
+    def handle(self, session_id: str, user_input: str) -> Optional[str]:
+        stage = self.session_manager.get_application_stage(session_id)
+        if stage is None or not user_input.strip():
+            return None
+
+        user_data = self.session_manager.get_user_data(session_id)
+        if stage == STAGE_COMPLETED:
+            return COMPLETED_REMINDER.format(job=user_data.selected_job)
+        if stage == STAGE_NOT_ELIGIBLE:
+            return NOT_ELIGIBLE_REMINDER.format(job=user_data.selected_job)
+
+        extractor = EXTRACTORS.get(stage)
+        value = extractor(user_input) if extractor else None
+        if value is None:
+            return None
+
+        self.session_manager.update_user_data(session_id, **{stage: value})
+        if stage in ELIGIBILITY_FIELDS and value is False:
+            return NOT_ELIGIBLE_MESSAGE.format(job=user_data.selected_job)
+
+        next_field = self.session_manager.get_next_empty_field(session_id)
+        if next_field is None:
+            return COMPLETED_MESSAGE.format(
+                name=user_data.name,
+                job=user_data.selected_job,
+                contact=user_data.contact_preference.lower(),
+            )
+        return self.question(session_id, next_field)
+
+    def question(self, session_id: str, field: str, acknowledge: bool = True) -> str:
+        """Build the prompt for a field, varying the acknowledgement between turns"""
+        user_data = self.session_manager.get_user_data(session_id)
+        question = QUESTIONS[field].format(name=(user_data.name or "").split(" ")[0])
+        if not acknowledge or field in ('name', 'phone'):
+            return question
+        answered = len(user_data.to_dict())
+        return f"{ACKNOWLEDGEMENTS[answered % len(ACKNOWLEDGEMENTS)]} {question}"
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from config.ai_config import AI_SETTINGS, ASYNC_LLM_SETTINGS, HTTP_POOL_SETTINGS
+from services.conversation_memory import estimate_tokens
+from services.metrics import record_llm_call
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """A generation did not finish, retries included, before its deadline"""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for rate limits, server errors and connection failures, which may succeed on retry"""
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    # Includes APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+
+class _LoopState:
+    """HTTP client, API client and semaphore bound to one event loop"""
+
+    def __init__(self, http_client: httpx.AsyncClient, client: AsyncOpenAI, semaphore: asyncio.Semaphore):
+        self.http_client = http_client
+        self.client = client
+        self.semaphore = semaphore
+
+
+class AsyncLLMClient:
+    """Async chat completions over a pooled keep-alive HTTP client
+
+    Concurrent upstream requests are capped by a semaphore, every call has a
+    deadline, and rate-limit / server / connection errors are retried with
+    full-jitter exponential backoff. asyncio objects belong to the loop that
+    created them, so the HTTP client and semaphore are built once per event
+    loop; a process normally runs one.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: str = "",
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ):
+        self.base_url = base_url or AI_SETTINGS["base_url"]
+        self.api_key = api_key
+        self.model = model or AI_SETTINGS["model_name"]
+        self.temperature = temperature if temperature is not None else AI_SETTINGS["temperature"]
+        self.max_concurrency = max_concurrency or ASYNC_LLM_SETTINGS["max_concurrency"]
+        self.deadline = deadline or ASYNC_LLM_SETTINGS["deadline"]
+        self.max_retries = max_retries if max_retries is not None else ASYNC_LLM_SETTINGS["max_retries"]
+        self.backoff_base = backoff_base if backoff_base is not None else ASYNC_LLM_SETTINGS["backoff_base"]
+        self.backoff_max = backoff_max if backoff_max is not None else ASYNC_LLM_SETTINGS["backoff_max"]
+
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._in_flight = 0
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        on_token: Optional[Callable[[str], None]] = None,
+        deadline: Optional[float] = None,
+        operation: str = "other",
+    ) -> str:
+        """Return the completion text, streaming tokens to on_token when given
+
+        operation labels the call in the exported metrics ("chat", "summary", ...).
+        """
+        deadline = deadline or self.deadline
+        self._count("calls")
+        started = time.perf_counter()
+        first_token = []
+        streamed = []
+
+        def on_token_timed(token: str) -> None:
+            if not first_token:
+                first_token.append(time.perf_counter() - started)
+            streamed.append(token)
+            on_token(token)
+
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        try:
+            text = await asyncio.wait_for(
+                self._complete_with_retries(messages, on_token_timed if on_token else None), deadline
+            )
+        except asyncio.TimeoutError:
+            self._count("deadline_exceeded")
+            record_llm_call(operation, time.perf_counter() - started, error=True)
+            raise LLMDeadlineExceeded(f"LLM call exceeded its {deadline}s deadline") from None
+        except Exception:
+            record_llm_call(operation, time.perf_counter() - started, error=True)
+            raise
+        record_llm_call(
+            operation,
+            time.perf_counter() - started,
+            first_token[0] if first_token else None,
+            prompt_tokens,
+            len(streamed) or estimate_tokens(text),
+        )
+        return text
+
+    def stats(self) -> dict:
+        """Call, retry and concurrency counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the HTTP client owned by the running loop"""
+        with self._lock:
+            state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.http_client.aclose()
+
+    def close(self) -> None:
+        """Close HTTP clients on loops that are still usable; safe from any thread"""
+        with self._lock:
+            states = list(self._states.items())
+            self._states.clear()
+        for loop, state in states:
+            if loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(state.http_client.aclose(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(state.http_client.aclose())
+            except Exception as e:
+                print(f"Error closing async LLM client: {str(e)}")
+
+    async def _complete_with_retries(self, messages, on_token) -> str:
+        state = self._state()
+        # A stream that already produced tokens cannot be replayed without duplicating them
+        emitted = []
+        attempt = 0
+        while True:
+            try:
+                async with state.semaphore:
+                    self._enter()
+                    try:
+                        return await self._request(state.client, messages, on_token, emitted)
+                    finally:
+                        self._leave()
+            except Exception as e:
+                if attempt >= self.max_retries or emitted or not is_transient_error(e):
+                    self._count("failures")
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                self._count("retries")
+                # Back off outside the semaphore so waiting calls can use the slot
+                await asyncio.sleep(delay)
+
+    async def _request(self, client: AsyncOpenAI, messages, on_token, emitted: list) -> str:
+        if on_token is None:
+            response = await client.chat.completions.create(
+                model=self.model, messages=messages, temperature=self.temperature
+            )
+            return response.choices[0].message.content or ""
+
+        stream = await client.chat.completions.create(
+            model=self.model, messages=messages, temperature=self.temperature, stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                emitted.append(token)
+                on_token(token)
+        return "".join(emitted)
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._states.get(loop)
+            if state is None:
+                http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=HTTP_POOL_SETTINGS["max_connections"],
+                        max_keepalive_connections=HTTP_POOL_SETTINGS["max_keepalive_connections"],
+                        keepalive_expiry=HTTP_POOL_SETTINGS["keepalive_expiry"],
+                    ),
+                    timeout=HTTP_POOL_SETTINGS["timeout"],
+                )
+                client = AsyncOpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    http_client=http_client,
+                    # Retries are handled here, with the deadline in mind
+                    max_retries=0,
+                )
+                state = _LoopState(http_client, client, asyncio.Semaphore(self.max_concurrency))
+                self._states[loop] = state
+            return state
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        # Honour the server's Retry-After when it asks for longer
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, min(self.backoff_max, float(response.headers.get("retry-after", 0))))
+            except ValueError:
+                pass
+        return delay
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
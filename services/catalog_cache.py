@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from config.db_config import CATALOG_SETTINGS
+from services.metrics import get_metrics
+
+CATALOG_CHANGES = get_metrics().counter(
+    "catalog_changes_total", "Catalog cache reloads and in-place patches", ["op"]
+)
+
+
+class JobCatalog:
+    """Process-wide, versioned cache of the jobs collection"""
+
+    def __init__(self, db, poll_interval: Optional[float] = None, use_change_stream: Optional[bool] = None):
+        self.db = db
+        self.poll_interval = poll_interval if poll_interval is not None else CATALOG_SETTINGS["poll_interval"]
+        if use_change_stream is None:
+            use_change_stream = CATALOG_SETTINGS["use_change_stream"]
+
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[str, List[dict]], None]] = []
+        self._jobs: Optional[List[dict]] = None
+        self._version: Optional[int] = None
+        self._stale = True
+        self._last_poll = 0.0
+        self._watching = False
+        self._stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+
+        # Writes made through this process invalidate immediately
+        self.db.add_catalog_listener(self._on_local_change)
+        if use_change_stream:
+            self._start_change_stream()
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version stamp of the cached catalog, or None before the first load"""
+        return self._version
+
+    def get_jobs(self) -> List[dict]:
+        """Return the cached job list (shared; callers must not mutate it)"""
+        if self._jobs is None or self._stale or self._poll_due():
+            self._refresh()
+        return self._jobs
+
+    def add_listener(self, listener: Callable[[str, List[dict]], None]) -> None:
+        """Register listener(op, jobs) for "reload", "upsert" and "delete" changes"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._jobs is not None:
+                listener("reload", self._jobs)
+
+    def invalidate(self) -> None:
+        """Force the next read to reload the catalog"""
+        self._stale = True
+
+    def close(self) -> None:
+        """Stop the change stream watcher"""
+        self._stop.set()
+
+    def _poll_due(self) -> bool:
+        return not self._watching and time.monotonic() - self._last_poll >= self.poll_interval
+
+    def _refresh(self) -> None:
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._jobs is not None and not self._stale and not self._poll_due():
+                return
+            self._last_poll = time.monotonic()
+            # Clear the flag before reading so a write racing the reload marks it stale again
+            stale = self._stale
+            self._stale = False
+            version = self.db.get_catalog_version()
+            if self._jobs is not None and not stale and version == self._version:
+                return
+            self._jobs = self.db.get_all_jobs()
+            self._version = version
+            self._notify("reload", self._jobs)
+
+    def _on_local_change(self, op, job_ids, version) -> None:
+        """Patch the cache in place when this write is the only change since it loaded"""
+        with self._lock:
+            if self._jobs is None or self._stale or self._version is None or version != self._version + 1:
+                self._stale = True
+                return
+
+            if op == "sync":
+                # A feed sync can touch any number of postings; reload once
+                self._stale = True
+                return
+
+            if op == "clear":
+                self._jobs = []
+                self._version = version
+                self._notify("reload", self._jobs)
+                return
+
+            changed_ids = set(job_ids)
+            # Copy on write: readers may still be iterating the previous list
+            jobs = [job for job in self._jobs if job["_id"] not in changed_ids]
+            if op == "delete":
+                removed = [job for job in self._jobs if job["_id"] in changed_ids]
+                self._jobs = jobs
+                self._version = version
+                self._notify("delete", removed)
+                return
+
+            upserted = self.db.get_jobs_by_criteria({"_id": {"$in": list(changed_ids)}})
+            self._jobs = jobs + upserted
+            self._version = version
+            self._notify("upsert", upserted)
+
+    def _notify(self, op: str, jobs: List[dict]) -> None:
+        CATALOG_CHANGES.inc(op=op)
+        for listener in self._listeners:
+            listener(op, jobs)
+
+    def _start_change_stream(self) -> None:
+        self._watch_thread = threading.Thread(
+            target=self._watch_catalog_meta,
+            name="job-catalog-watch",
+            daemon=True,
+        )
+        self._watch_thread.start()
+
+    def _watch_catalog_meta(self) -> None:
+        """Invalidate on every catalog_meta change; falls back to polling if unsupported"""
+        try:
+            with self.db.db.catalog_meta.watch(max_await_time_ms=1000) as stream:
+                self._watching = True
+                # A version bump may have landed before the stream opened
+                self.invalidate()
+                while not self._stop.is_set():
+                    if stream.try_next() is not None:
+                        self.invalidate()
+        except Exception as e:
+            # Standalone servers have no change streams; polling takes over
+            if not self._stop.is_set():
+                print(f"Catalog change stream unavailable, polling instead: {str(e)}")
+        finally:
+            self._watching = False
@@ -0,0 +1,308 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from config.ai_config import MEMORY_SETTINGS
+
+ROLE_PREFIXES = {"user": "Human", "assistant": "AI"}
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a job candidate (Human) and a hiring assistant named 'Recruiter' (AI).
+Extend the current summary with the new lines and return only the new summary.
+Keep the selected job, every answer the candidate has given and any eligibility outcome. Keep it under {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting the window"""
+    return max(1, len(text) // 4)
+
+
+def format_lines(turns) -> str:
+    return "\n".join(f"{ROLE_PREFIXES[role]}: {content}" for role, content, _ in turns)
+
+
+class SessionMemory:
+    """One session's conversation: recent turns verbatim, older ones as a running summary"""
+
+    def __init__(self, max_token_limit: int, max_verbatim_messages: int, max_pending_tokens: int):
+        self.max_token_limit = max_token_limit
+        self.max_verbatim_messages = max_verbatim_messages
+        self.max_pending_tokens = max_pending_tokens
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.turns = deque()  # (role, content, tokens), kept verbatim
+        self.token_count = 0
+        # Turns pushed out of the window that the summarizer hasn't folded in yet
+        self.pending = deque()
+        self.pending_tokens = 0
+        # Position of pending[0] among every turn ever queued, so a summary knows what it covered
+        self.pending_start = 0
+        self.summary = ""
+        self.summary_tokens = 0
+        # Number of message_history entries already folded into the memory
+        self.synced = 0
+        # Tokens of every message seen, i.e. what replaying the full history would cost
+        self.total_tokens = 0
+        self.prompt_tokens_saved = 0
+        self.summaries = 0
+        # Bumped on rehydrate so in-flight summaries of the old state are discarded
+        self.epoch = 0
+        self._rendered: Optional[str] = None
+
+    def sync(self, message_history: List[dict]) -> None:
+        """Append only the messages added since the last sync"""
+        if len(message_history) < self.synced:
+            # The transcript was reset (e.g. a new chat), start over
+            self.rehydrate(message_history)
+            return
+        for msg in message_history[self.synced:]:
+            self.append(msg.get("role"), msg.get("content"))
+        self.synced = len(message_history)
+
+    def rehydrate(self, message_history: List[dict]) -> None:
+        """Rebuild from the tail of a transcript without replaying all of it
+
+        Messages just beyond the verbatim window are queued for the background
+        summarizer; anything older is only counted.
+        """
+        epoch = self.epoch + 1
+        self._reset()
+        self.epoch = epoch
+        for msg in reversed(message_history):
+            role, content = msg.get("role"), msg.get("content")
+            if role not in ROLE_PREFIXES or not content:
+                continue
+            tokens = estimate_tokens(content)
+            self.total_tokens += tokens
+            window_full = (
+                len(self.turns) >= self.max_verbatim_messages
+                or (self.token_count + tokens > self.max_token_limit and self.turns)
+            )
+            if not window_full:
+                self.turns.appendleft((role, content, tokens))
+                self.token_count += tokens
+            elif self.pending_tokens + tokens <= self.max_pending_tokens:
+                self.pending.appendleft((role, content, tokens))
+                self.pending_tokens += tokens
+        self.synced = len(message_history)
+
+    def append(self, role: str, content: str) -> None:
+        """Add one message, moving the oldest verbatim turns out to be summarized"""
+        # System notices and empty halves of a turn only bloat the prompt
+        if role not in ROLE_PREFIXES or not content:
+            return
+        tokens = estimate_tokens(content)
+        self.turns.append((role, content, tokens))
+        self.token_count += tokens
+        self.total_tokens += tokens
+        while len(self.turns) > 1 and (
+            len(self.turns) > self.max_verbatim_messages or self.token_count > self.max_token_limit
+        ):
+            turn = self.turns.popleft()
+            self.token_count -= turn[2]
+            self.pending.append(turn)
+            self.pending_tokens += turn[2]
+        # If the summarizer falls behind, the oldest unsummarized turns are lost
+        while self.pending_tokens > self.max_pending_tokens and self.pending:
+            self.pending_tokens -= self.pending.popleft()[2]
+            self.pending_start += 1
+        self._rendered = None
+
+    def record_turn(self, user_input: str, response: str) -> None:
+        """Add a completed exchange when the caller keeps no transcript of its own"""
+        self.append("user", user_input)
+        self.append("assistant", response)
+
+    def get_history(self) -> str:
+        """Render the summary, unsummarized turns and verbatim window for the prompt"""
+        if self._rendered is None:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of earlier conversation: {self.summary}")
+            if self.pending:
+                parts.append(format_lines(self.pending))
+            if self.turns:
+                parts.append(format_lines(self.turns))
+            self._rendered = "\n".join(parts)
+        return self._rendered
+
+    def recent_messages(self) -> List[dict]:
+        """The verbatim window as {"role", "content"} messages, oldest first"""
+        return [{"role": role, "content": content} for role, content, _ in self.turns]
+
+    def last_reply(self) -> str:
+        """The most recent assistant message still in the verbatim window, or "" """
+        for role, content, _ in reversed(self.turns):
+            if role == "assistant":
+                return content
+        return ""
+
+    def note_prompt(self) -> None:
+        """Count the history tokens this turn avoided sending"""
+        sent = self.summary_tokens + self.pending_tokens + self.token_count
+        self.prompt_tokens_saved += max(0, self.total_tokens - sent)
+
+    def apply_summary(self, epoch: int, summary: str, folded_until: int) -> None:
+        """Install a summary covering the pending turns before position `folded_until`
+
+        Turns dropped while it was written are already gone, so only the
+        covered ones that are still queued are removed.
+        """
+        if epoch != self.epoch:
+            return
+        while self.pending and self.pending_start < folded_until:
+            self.pending_tokens -= self.pending.popleft()[2]
+            self.pending_start += 1
+        self.summary = summary
+        self.summary_tokens = estimate_tokens(summary) if summary else 0
+        self.summaries += 1
+        self._rendered = None
+
+    def stats(self) -> dict:
+        return {
+            "messages_verbatim": len(self.turns),
+            "messages_pending": len(self.pending),
+            "summaries": self.summaries,
+            "history_tokens": self.summary_tokens + self.pending_tokens + self.token_count,
+            "total_tokens": self.total_tokens,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+        }
+
+
+class ConversationMemoryStore:
+    """Process-wide LRU of SessionMemory objects keyed by session id"""
+
+    def __init__(self, max_token_limit: Optional[int] = None, max_sessions: Optional[int] = None):
+        self.max_token_limit = max_token_limit or MEMORY_SETTINGS["max_token_limit"]
+        self.max_sessions = max_sessions or MEMORY_SETTINGS["max_sessions"]
+        self.max_verbatim_messages = MEMORY_SETTINGS["max_verbatim_messages"]
+        self.max_pending_tokens = MEMORY_SETTINGS["max_pending_tokens"]
+        self._sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(
+        self,
+        session_id: str,
+        message_history: Optional[List[dict]] = None,
+        loader: Optional[Callable[[], List[dict]]] = None,
+    ) -> SessionMemory:
+        """Return the session's memory, brought up to date with message_history
+
+        Without a message_history, loader() supplies the transcript tail for a
+        session this process has not seen yet (e.g. after a reconnect).
+        """
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            created = memory is None
+            if created:
+                memory = self._sessions[session_id] = SessionMemory(
+                    self.max_token_limit, self.max_verbatim_messages, self.max_pending_tokens
+                )
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+        if message_history is not None:
+            with memory.lock:
+                if created:
+                    memory.rehydrate(message_history)
+                else:
+                    memory.sync(message_history)
+        elif created and loader is not None:
+            transcript = loader()
+            with memory.lock:
+                memory.rehydrate(transcript)
+        return memory
+
+    def discard(self, session_id: str) -> None:
+        """Forget a session's memory"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def session_stats(self, session_id: str) -> Optional[dict]:
+        """Counters for one session, or None if it isn't in memory"""
+        memory = self._sessions.get(session_id)
+        return memory.stats() if memory else None
+
+    def stats(self) -> dict:
+        """Aggregate counters across the sessions currently in memory"""
+        with self._lock:
+            memories = list(self._sessions.values())
+        return {
+            "sessions": len(memories),
+            "summaries": sum(m.summaries for m in memories),
+            "prompt_tokens_saved": sum(m.prompt_tokens_saved for m in memories),
+        }
+
+
+class ConversationSummarizer:
+    """Folds turns that left the verbatim window into the running summary, off the request path"""
+
+    def __init__(self, llm, max_workers: Optional[int] = None):
+        self.llm = llm
+        self.max_summary_words = MEMORY_SETTINGS["summary_max_words"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or MEMORY_SETTINGS["summarizer_workers"],
+            thread_name_prefix="memory-summarizer",
+        )
+        self._scheduled = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, memory: SessionMemory) -> None:
+        """Queue a summary update if the session has turns waiting to be folded in"""
+        if not memory.pending:
+            return
+        with self._lock:
+            if id(memory) in self._scheduled:
+                return
+            self._scheduled.add(id(memory))
+        try:
+            self._executor.submit(self._summarize, memory)
+        except RuntimeError:
+            # Executor already shut down
+            self._scheduled.discard(id(memory))
+
+    def close(self, wait: bool = False) -> None:
+        """Stop summarizing; with wait, let running summaries finish first"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _summarize(self, memory: SessionMemory) -> None:
+        try:
+            with memory.lock:
+                epoch = memory.epoch
+                summary = memory.summary
+                folded = len(memory.pending)
+                folded_until = memory.pending_start + folded
+                new_lines = format_lines(memory.pending)
+            if not folded:
+                return
+
+            prompt = SUMMARY_PROMPT.format(
+                max_words=self.max_summary_words,
+                summary=summary or "(none yet)",
+                new_lines=new_lines,
+            )
+            new_summary = self.llm.invoke(prompt, config={"tags": ["summary"]}).content.strip()
+
+            with memory.lock:
+                memory.apply_summary(epoch, new_summary, folded_until)
+        except Exception as e:
+            # The turns stay pending and are retried after the next response
+            print(f"Error summarizing conversation: {str(e)}")
+        finally:
+            with self._lock:
+                self._scheduled.discard(id(memory))
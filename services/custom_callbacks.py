@@ -1,14 +1,111 @@
-from langchain_community.callbacks import StreamlitCallbackHandler
-from typing import Any
-
-class CustomStreamlitCallbackHandler(StreamlitCallbackHandler):
-    def __init__(self, parent_container):
-        # Call the parent constructor with the parent_container
-        super().__init__(parent_container=parent_container)
-        self._accumulated_text = ""
-        
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config.ai_config import STREAMING_SETTINGS
+
+STREAMING_CURSOR = "▌"
+
+
+class StreamMetrics:
+    """Process-wide counters for streamed responses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.tokens = 0
+        self.frames = 0
+        self.ttft_total = 0.0
+        self.ttft_max = 0.0
+
+    def record(self, time_to_first_token: Optional[float], tokens: int, frames: int) -> None:
+        with self._lock:
+            self.responses += 1
+            self.tokens += tokens
+            self.frames += frames
+            if time_to_first_token is not None:
+                self.ttft_total += time_to_first_token
+                self.ttft_max = max(self.ttft_max, time_to_first_token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "tokens": self.tokens,
+                "frames": self.frames,
+                "avg_time_to_first_token": self.ttft_total / self.responses if self.responses else 0.0,
+                "max_time_to_first_token": self.ttft_max,
+                "tokens_per_frame": self.tokens / self.frames if self.frames else 0.0,
+            }
+
+
+class CustomStreamlitCallbackHandler(BaseCallbackHandler):
+    """Streams LLM tokens into a Streamlit placeholder
+
+    Tokens are buffered and the placeholder is re-rendered at most once per
+    flush interval (or once enough characters are pending), instead of once
+    per token.
+    """
+
+    def __init__(
+        self,
+        parent_container,
+        metrics: Optional[StreamMetrics] = None,
+        flush_interval: Optional[float] = None,
+        flush_chars: Optional[int] = None,
+    ):
+        self.parent_container = parent_container
+        self.metrics = metrics
+        self.flush_interval = flush_interval if flush_interval is not None else STREAMING_SETTINGS["flush_interval"]
+        self.flush_chars = flush_chars if flush_chars is not None else STREAMING_SETTINGS["flush_chars"]
+
+        self._parts: List[str] = []
+        self._pending_chars = 0
+        self._last_flush = 0.0
+        self._started_at = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+        self.tokens = 0
+        self.frames = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self._started_at = time.perf_counter()
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self._started_at = time.perf_counter()
+
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        # Append the new token to the accumulated text
-        self._accumulated_text += token
-        # Update only the dedicated placeholder (this will only update the assistant's new message area)
-        self.parent_container.markdown(self._accumulated_text)
+        if not token:
+            return
+        now = time.perf_counter()
+        if self.time_to_first_token is None:
+            self.time_to_first_token = now - self._started_at
+        self._parts.append(token)
+        self._pending_chars += len(token)
+        self.tokens += 1
+
+        if self._pending_chars >= self.flush_chars or now - self._last_flush >= self.flush_interval:
+            self._render(self.text + STREAMING_CURSOR, now)
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        # Final frame without the cursor
+        if self._parts:
+            self._render(self.text, time.perf_counter())
+        if self.metrics is not None:
+            self.metrics.record(self.time_to_first_token, self.tokens, self.frames)
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        if self.metrics is not None:
+            self.metrics.record(self.time_to_first_token, self.tokens, self.frames)
+
+    def _render(self, text: str, now: float) -> None:
+        self.parent_container.markdown(text)
+        self._pending_chars = 0
+        self._last_flush = now
+        self.frames += 1
+
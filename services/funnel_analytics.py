@@ -0,0 +1,167 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from config.db_config import FUNNEL_SETTINGS, SESSION_STORE_SETTINGS
+from models.session_data import (
+    APPLICATION_FIELDS,
+    ELIGIBILITY_FIELDS,
+    REQUIRED_FIELDS,
+    STAGE_COMPLETED,
+    STAGE_NOT_ELIGIBLE,
+    UserApplicationData,
+)
+
+STAGE_SELECTED = "selected"
+# Job selected, each question asked in turn, then rejected or completed (interview offered)
+FUNNEL_STAGES = [STAGE_SELECTED] + REQUIRED_FIELDS[1:] + [STAGE_NOT_ELIGIBLE, STAGE_COMPLETED]
+# (job title, day the application started) -> stage -> applications
+Rollups = Dict[Tuple[str, datetime], Counter]
+
+
+def reached_stages(user_data: UserApplicationData) -> FrozenSet[str]:
+    """Funnel stages an application has reached: every question asked so far, then its outcome"""
+    if user_data.selected_job is None:
+        return frozenset()
+    reached = [STAGE_SELECTED]
+    for field in REQUIRED_FIELDS[1:]:
+        reached.append(field)
+        value = getattr(user_data, field)
+        if value is None:
+            return frozenset(reached)
+        if value is False and field in ELIGIBILITY_FIELDS:
+            reached.append(STAGE_NOT_ELIGIBLE)
+            return frozenset(reached)
+    reached.append(STAGE_COMPLETED)
+    return frozenset(reached)
+
+
+def start_of_day(moment: Optional[datetime] = None) -> datetime:
+    moment = moment or datetime.utcnow()
+    return datetime(moment.year, moment.month, moment.day)
+
+
+class FunnelRollups:
+    """Applications reaching each funnel stage, per job and per day the application started
+
+    Stage changes become in-memory increments, written as $inc upserts of
+    one document per job and day on flush() (the session data flusher calls
+    it). Dashboards read those documents instead of the raw sessions.
+    backfill() recomputes the rollups from the stored application sessions
+    in bounded batches, e.g. after a deploy that lost increments.
+    """
+
+    def __init__(self, db, write_batch_size: Optional[int] = None, backfill_batch_size: Optional[int] = None):
+        self.db = db
+        self.write_batch_size = write_batch_size or FUNNEL_SETTINGS["write_batch_size"]
+        self.backfill_batch_size = backfill_batch_size or FUNNEL_SETTINGS["backfill_batch_size"]
+        self._lock = threading.Lock()
+        self._pending: Rollups = defaultdict(Counter)
+        self._stats = Counter()
+
+    def reached(self, user_data: UserApplicationData) -> FrozenSet[str]:
+        """The stages user_data has reached, to pass to advance() after changing it"""
+        return reached_stages(user_data)
+
+    def advance(self, user_data: UserApplicationData, before: FrozenSet[str] = frozenset()) -> None:
+        """Count the stages user_data has reached beyond those in before"""
+        new = reached_stages(user_data) - before
+        if not new:
+            return
+        key = (user_data.selected_job, start_of_day(user_data.started_at))
+        with self._lock:
+            self._pending[key].update(new)
+            self._stats["increments"] += len(new)
+
+    def flush(self) -> int:
+        """Write pending increments; returns how many rollups were updated"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+        items = list(pending.items())
+        written = 0
+        try:
+            for start in range(0, len(items), self.write_batch_size):
+                self.db.increment_funnel_rollups(dict(items[start:start + self.write_batch_size]))
+                written = min(start + self.write_batch_size, len(items))
+        except Exception as e:
+            print(f"Error saving funnel rollups: {str(e)}")
+            with self._lock:
+                # Merge the unwritten increments back in with any newer ones
+                for key, stages in items[written:]:
+                    self._pending[key].update(stages)
+                self._stats["flush_errors"] += 1
+        with self._lock:
+            self._stats["rollups_written"] += written
+        return written
+
+    def funnel(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """Stage counts per job for applications started in [since, until)"""
+        jobs: Dict[str, Counter] = defaultdict(Counter)
+        for rollup in self.db.get_funnel_rollups(since=since, until=until):
+            jobs[rollup["job"]].update(rollup.get("stages", {}))
+        return {job: self._ordered(stages) for job, stages in sorted(jobs.items())}
+
+    def daily(
+        self, job: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> List[Tuple[datetime, Dict[str, int]]]:
+        """Stage counts per start day, for one job or all of them, oldest day first"""
+        days: Dict[datetime, Counter] = defaultdict(Counter)
+        for rollup in self.db.get_funnel_rollups(since=since, until=until, job=job):
+            days[rollup["day"]].update(rollup.get("stages", {}))
+        return [(day, self._ordered(stages)) for day, stages in sorted(days.items())]
+
+    def backfill(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """Recompute the rollups of days in [since, until) from the application sessions
+
+        Sessions expire after SESSION_STORE_SETTINGS["ttl_seconds"] idle, so
+        since defaults to the start of the oldest day they can still cover;
+        older rollups are left as they are. Increments made while it runs may
+        be overwritten for the days it covers, so run it when traffic is low.
+        Returns the applications counted.
+        """
+        if since is None:
+            since = start_of_day(datetime.utcnow() - timedelta(seconds=SESSION_STORE_SETTINGS["ttl_seconds"]))
+        backfill_run = datetime.utcnow()
+        rollups: Rollups = defaultdict(Counter)
+        counted = 0
+        after = None
+        projection = dict.fromkeys(APPLICATION_FIELDS + ("expires_at",), 1)
+        while True:
+            batch = self.db.get_application_sessions_batch(after, self.backfill_batch_size, projection)
+            if not batch:
+                break
+            after = batch[-1]["_id"]
+            for doc in batch:
+                user_data = UserApplicationData.from_dict(doc)
+                if user_data.selected_job is None:
+                    continue
+                if user_data.started_at is None and doc.get("expires_at"):
+                    # Sessions saved before start times were recorded: use their last activity
+                    user_data.started_at = doc["expires_at"] - timedelta(seconds=SESSION_STORE_SETTINGS["ttl_seconds"])
+                day = start_of_day(user_data.started_at)
+                if day < since or (until is not None and day >= until):
+                    continue
+                rollups[(user_data.selected_job, day)].update(reached_stages(user_data))
+                counted += 1
+
+        items = list(rollups.items())
+        for start in range(0, len(items), self.write_batch_size):
+            self.db.save_funnel_rollups(dict(items[start:start + self.write_batch_size]), backfill_run)
+        removed = self.db.finish_funnel_backfill(backfill_run, since=since, until=until)
+        with self._lock:
+            self._stats["backfills"] += 1
+            self._stats["backfilled_sessions"] += counted
+        print(f"Backfilled funnel rollups: {counted} applications in {len(items)} rollups, {removed} stale removed")
+        return counted
+
+    def stats(self) -> dict:
+        """Pending and written rollup counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_rollups"] = len(self._pending)
+        return stats
+
+    @staticmethod
+    def _ordered(stages: Counter) -> Dict[str, int]:
+        return {stage: stages.get(stage, 0) for stage in FUNNEL_STAGES}
@@ -0,0 +1,204 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.ai_config import INTENT_SETTINGS
+
+GREETING = "greeting"
+GENERIC = "generic"
+OTHER = "other"
+
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9' ]+")
+SPACE_PATTERN = re.compile(r"\s+")
+# "hiii" -> "hii", "okkkk" -> "okk": keeps the phrase tables small
+REPEAT_PATTERN = re.compile(r"(.)\1{2,}")
+
+GREETING_PHRASES = frozenset({
+    "hi", "hii", "hello", "helo", "hey", "hey there", "hi there", "hello there",
+    "hiya", "howdy", "greetings", "yo", "sup", "whats up", "what's up",
+    "good morning", "good afternoon", "good evening", "good day", "morning",
+    "hi recruiter", "hello recruiter", "hey recruiter", "hi how are you",
+    "hello how are you", "how are you", "how are you doing", "nice to meet you",
+})
+GENERIC_PHRASES = frozenset({
+    "ok", "okk", "okay", "k", "kk", "yes", "yeah", "yep", "yup", "no", "nope",
+    "sure", "fine", "alright", "all right", "thanks", "thank you", "thx", "ty",
+    "thanks a lot", "thank you so much", "great", "cool", "nice", "awesome",
+    "got it", "understood", "sounds good", "perfect", "noted", "right", "hmm",
+    "ok thanks", "okay thanks", "ok thank you", "okay thank you", "bye", "goodbye",
+})
+
+GREETING_PATTERN = re.compile(
+    r"^(?:hi+|hel+o+|hey+|hiya|howdy|greetings|yo|good (?:morning|afternoon|evening|day))"
+    r"(?: (?:there|all|everyone|team|recruiter|friend))?"
+    r"(?: how are you(?: doing)?(?: today)?)?$"
+)
+GENERIC_PATTERN = re.compile(
+    r"^(?:(?:ok(?:ay)?|k+|yes|yeah|yep|no|nope|sure|fine|cool|great|nice|got it|alright)"
+    r"(?: (?:thanks|thank you|thx|cool|great|sure|then|sir|maam))*"
+    r"|thanks?(?: you)?(?: (?:so much|a lot|very much))?)$"
+)
+
+# Seed examples for the optional Naive Bayes fallback
+TRAINING_EXAMPLES: List[Tuple[str, str]] = (
+    [(text, GREETING) for text in (
+        "hi", "hello", "hey", "hi there", "hello there", "hey there", "good morning",
+        "good afternoon", "good evening", "hiya", "howdy", "greetings", "hello recruiter",
+        "hi how are you", "hey how is it going", "hello good morning", "hi again",
+        "hello everyone", "hey whats up", "morning", "hi nice to meet you",
+    )]
+    + [(text, GENERIC) for text in (
+        "ok", "okay", "yes", "no", "sure", "thanks", "thank you", "ok thanks", "cool",
+        "great", "got it", "sounds good", "alright", "fine", "perfect", "noted",
+        "ok cool", "thanks a lot", "yes please", "no thanks", "understood", "awesome",
+    )]
+    + [(text, OTHER) for text in (
+        "what jobs do you have", "how do i apply", "i want to apply for warehouse associate",
+        "my name is john smith", "what is the salary", "are there night shifts",
+        "where is the job located", "can i work part time", "tell me about the role",
+        "i have five years of experience", "is this position remote", "what are the benefits",
+        "when is the interview", "i am interested in the driver role", "john@example.com",
+        "5551234567", "do you sponsor visas", "can you help me with my resume",
+        "what documents do i need", "i prefer morning shift", "how much does it pay",
+        "how many hours per week", "how long is the interview", "how does this work",
+        "what is the pay rate", "is there overtime", "does it include health insurance",
+        "can you tell me more", "which locations are hiring", "who will contact me",
+        "i need a job near dallas", "please show me driver jobs", "is anyone there",
+        "what happens next", "i already applied", "when do i start", "show me openings",
+    )]
+)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and squeeze repeated letters and spaces"""
+    text = NON_WORD_PATTERN.sub(" ", text.lower())
+    text = REPEAT_PATTERN.sub(r"\1\1", text)
+    return SPACE_PATTERN.sub(" ", text).strip()
+
+
+def features(text: str) -> List[str]:
+    words = text.split()
+    padded = f" {text} "
+    return words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class NaiveBayesIntentModel:
+    """Tiny multinomial Naive Bayes over words and character trigrams"""
+
+    def __init__(self, examples: List[Tuple[str, str]], alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels = sorted({label for _, label in examples})
+        self._counts: Dict[str, Counter] = {label: Counter() for label in self.labels}
+        label_totals = Counter(label for _, label in examples)
+        for text, label in examples:
+            self._counts[label].update(features(normalize(text)))
+        self._priors = {label: math.log(label_totals[label] / len(examples)) for label in self.labels}
+        self._totals = {label: sum(counts.values()) for label, counts in self._counts.items()}
+        self._vocabulary = len(set().union(*self._counts.values()))
+
+    def predict(self, text: str) -> Dict[str, float]:
+        """Probability of each label for already-normalized text"""
+        feats = features(text)
+        scores = {}
+        for label in self.labels:
+            counts, denominator = self._counts[label], self._totals[label] + self.alpha * self._vocabulary
+            scores[label] = self._priors[label] + sum(
+                math.log((counts[f] + self.alpha) / denominator) for f in feats
+            )
+        top = max(scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+
+class IntentClassifier:
+    """Local greeting / generic-reply classifier with an LRU cache
+
+    Exact phrases and patterns answer with full confidence. Anything else goes
+    to the optional Naive Bayes model, and predictions below the confidence
+    threshold are escalated to the `escalate(intent, text)` callback when one
+    is provided.
+    """
+
+    def __init__(
+        self,
+        escalate: Optional[Callable[[str, str], bool]] = None,
+        cache_size: Optional[int] = None,
+        confidence_threshold: Optional[float] = None,
+        use_model: Optional[bool] = None,
+    ):
+        self.escalate = escalate
+        self.cache_size = cache_size or INTENT_SETTINGS["cache_size"]
+        self.confidence_threshold = (
+            confidence_threshold if confidence_threshold is not None
+            else INTENT_SETTINGS["confidence_threshold"]
+        )
+        if use_model is None:
+            use_model = INTENT_SETTINGS["use_model"]
+        self.model = NaiveBayesIntentModel(TRAINING_EXAMPLES) if use_model else None
+
+        self._cache: "OrderedDict[Tuple[str, str], bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def is_greeting(self, text: str) -> bool:
+        return self.classify(GREETING, text)
+
+    def is_generic(self, text: str) -> bool:
+        return self.classify(GENERIC, text)
+
+    def classify(self, intent: str, text: str) -> bool:
+        """Return whether text expresses the intent"""
+        key = (intent, normalize(text))
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return result
+            self._stats["misses"] += 1
+
+        result, confidence, source = self._classify_locally(intent, key[1])
+        if confidence < self.confidence_threshold and self.escalate is not None:
+            try:
+                result = self.escalate(intent, text)
+                source = "escalated"
+            except Exception as e:
+                source = "escalation_failed"
+                print(f"Intent escalation failed, using local prediction: {str(e)}")
+
+        with self._lock:
+            self._stats[source] += 1
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        """Cache hit/miss and decision-source counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = stats.get("hits", 0) / lookups if lookups else 0.0
+        return stats
+
+    def _classify_locally(self, intent: str, text: str) -> Tuple[bool, float, str]:
+        phrases, pattern = (
+            (GREETING_PHRASES, GREETING_PATTERN) if intent == GREETING
+            else (GENERIC_PHRASES, GENERIC_PATTERN)
+        )
+        if not text:
+            return False, 1.0, "phrase"
+        if text in phrases:
+            return True, 1.0, "phrase"
+        if pattern.match(text):
+            return True, 1.0, "pattern"
+        if self.model is None:
+            # Without a model, anything the tables don't know is a (confident) no
+            return False, 1.0, "pattern"
+
+        probability = self.model.predict(text)[intent]
+        label = probability >= 0.5
+        return label, probability if label else 1.0 - probability, "model"
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+
+from config.db_config import INTERACTION_LOG_SETTINGS
+
+
+class InteractionLogger:
+    """Writes chat interactions from a bounded queue on a background thread
+
+    log() only enqueues, so a chat turn never waits on MongoDB. The writer
+    drains the queue in batches (by size or after flush_interval) and saves
+    each batch with Database.save_user_interactions. When the queue is full,
+    log() waits up to put_timeout for room and then drops the interaction.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        put_timeout: Optional[float] = None,
+    ):
+        self.db = db
+        self.batch_size = batch_size or INTERACTION_LOG_SETTINGS["batch_size"]
+        self.flush_interval = flush_interval or INTERACTION_LOG_SETTINGS["flush_interval"]
+        self.put_timeout = put_timeout if put_timeout is not None else INTERACTION_LOG_SETTINGS["put_timeout"]
+
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue or INTERACTION_LOG_SETTINGS["max_queue"])
+        # A batch whose write failed, retried before anything newer
+        self._retry: List[dict] = []
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="interaction-logger", daemon=True)
+        self._writer.start()
+
+    def log(self, user_id: str, user_input: str, assistant_response: str) -> bool:
+        """Queue an interaction; returns False if it had to be dropped"""
+        if self._closed.is_set():
+            return False
+        interaction = {
+            # Assigned up front so a retried batch cannot write duplicates
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "timestamp": datetime.utcnow(),
+            "user_input": user_input,
+            "assistant_response": assistant_response,
+        }
+        try:
+            self._queue.put(interaction, timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("logged")
+        return True
+
+    def flush(self) -> int:
+        """Write everything queued so far from the calling thread"""
+        written = 0
+        while True:
+            batch = self._take_batch(wait=False)
+            if not batch:
+                return written
+            if not self._write(batch):
+                return written
+            written += len(batch)
+
+    def stats(self) -> dict:
+        """Queue depth and write counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = self._queue.qsize() + len(self._retry)
+        return stats
+
+    def close(self) -> None:
+        """Stop the writer and flush what is still queued"""
+        self._closed.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            batch = self._take_batch(wait=True)
+            if batch and not self._write(batch):
+                # Give MongoDB a moment before retrying
+                self._closed.wait(self.flush_interval)
+
+    def _take_batch(self, wait: bool) -> List[dict]:
+        with self._lock:
+            batch, self._retry = self._retry, []
+        if batch:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if wait and not self._closed.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[dict]) -> bool:
+        try:
+            self.db.save_user_interactions(batch)
+        except Exception as e:
+            print(f"Error saving interactions, will retry: {str(e)}")
+            with self._lock:
+                self._retry[:0] = batch
+                self._stats["errors"] += 1
+            return False
+        with self._lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        return True
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,128 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+from config.ai_config import JOB_CONTEXT_SETTINGS
+from database import job_snippet
+from services.search_index import JobSearchIndex, tokenize
+
+UNKNOWN_ROLE_MESSAGE = (
+    "I don't see that position in our current openings. Please check the available positions "
+    "in the right tab and click 'I'm Interested' on the role you'd like to apply for. 🎯"
+)
+
+# "apply for the forklift operator position", "interested in a driver job", ...
+ROLE_MENTION_PATTERN = re.compile(
+    r"\b(?:apply(?:ing)?\s+(?:for|to)|interested\s+in|looking\s+for|want(?:\s+to\s+be)?|work(?:ing)?\s+as)\s+"
+    r"(?:an?\s+|the\s+)?(?P<role>[a-z0-9][a-z0-9 &/-]{0,60}?)\s+"
+    r"(?:position|role|job|opening|post|vacancy|vacancies)s?\b",
+    re.IGNORECASE
+)
+# Words that qualify "position" without naming one ("this job", "any open roles")
+GENERIC_ROLE_WORDS = frozenset({
+    "a", "an", "the", "this", "that", "these", "those", "any", "some", "other", "another",
+    "new", "open", "available", "current", "your", "my", "same", "different", "good", "first",
+    "full", "part", "time", "permanent", "temporary", "local", "nearby", "entry", "level",
+})
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(tokenize(title))
+
+
+class JobContextBuilder:
+    """Job context for one turn, sized by the session rather than the catalog
+
+    Describes the selected job, or the top matches for what the candidate has
+    said, and checks locally whether a role the candidate names is open.
+    Lookups derived from the catalog are rebuilt once per catalog version.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        search_index: Optional[JobSearchIndex] = None,
+        max_jobs: Optional[int] = None,
+        snippet_chars: Optional[int] = None,
+        history_messages: Optional[int] = None,
+    ):
+        self.catalog = catalog
+        if search_index is None:
+            search_index = JobSearchIndex()
+            catalog.add_listener(search_index.apply_change)
+        self.search_index = search_index
+        self.max_jobs = max_jobs or JOB_CONTEXT_SETTINGS["max_jobs"]
+        self.snippet_chars = snippet_chars or JOB_CONTEXT_SETTINGS["snippet_chars"]
+        self.history_messages = (
+            history_messages if history_messages is not None else JOB_CONTEXT_SETTINGS["history_messages"]
+        )
+
+        self._lock = threading.Lock()
+        self._jobs: Optional[List[dict]] = None
+        self._by_title: Dict[str, dict] = {}
+        self._lines: Dict[object, str] = {}
+
+    def find_job(self, title: str) -> Optional[dict]:
+        """The open job with this title, ignoring case and punctuation"""
+        return self._lookup().get(normalize_title(title))
+
+    def is_unknown_role(self, text: str) -> bool:
+        """True when the candidate asks for a role that matches no open position"""
+        match = ROLE_MENTION_PATTERN.search(text)
+        if not match:
+            return False
+        terms = [term for term in tokenize(match.group("role")) if term not in GENERIC_ROLE_WORDS]
+        if not terms:
+            return False
+        role = " ".join(terms)
+        if role in self._lookup():
+            return False
+        # Anything the search finds (title, category, location or description) counts as open
+        return not self.search_index.search(role + " ", limit=1)
+
+    def build(self, user_input: str, message_history: Optional[list] = None, selected_job: Optional[str] = None) -> str:
+        """Job context text for the prompt"""
+        lookup = self._lookup()
+        if selected_job:
+            job = lookup.get(normalize_title(selected_job))
+            if job is None:
+                return f"Selected position: {selected_job} (no longer open; suggest choosing another role)"
+            return f"Selected position:\n{self._line(job)}"
+
+        query = " ".join([user_input] + self._recent_user_messages(message_history))
+        jobs = self.search_index.search(query + " ", limit=self.max_jobs)
+        total = len(self._jobs or [])
+        if not jobs:
+            return f"No open position matches the conversation yet ({total} positions are listed in the right tab)."
+        lines = "\n".join(self._line(job) for job in jobs)
+        return f"Positions matching the conversation ({len(jobs)} of {total} open):\n{lines}"
+
+    def _recent_user_messages(self, message_history: Optional[list]) -> List[str]:
+        if not message_history or not self.history_messages:
+            return []
+        messages = [m.get("content", "") for m in message_history if m.get("role") == "user"]
+        return messages[-self.history_messages:]
+
+    def _lookup(self) -> Dict[str, dict]:
+        # Refreshing the catalog also brings the search index up to date
+        jobs = self.catalog.get_jobs()
+        if jobs is not self._jobs:
+            with self._lock:
+                if jobs is not self._jobs:
+                    # The catalog replaces its list on every change, so identity marks a new version
+                    self._by_title = {normalize_title(job.get("title", "")): job for job in jobs}
+                    self._lines = {}
+                    self._jobs = jobs
+        return self._by_title
+
+    def _line(self, job: dict) -> str:
+        key = job.get("_id", id(job))
+        line = self._lines.get(key)
+        if line is None:
+            description = job_snippet(job.get("description"), self.snippet_chars)
+            details = ", ".join(part for part in (job.get("location"), job.get("type")) if part)
+            line = f"- {job.get('title', '')}" + (f" ({details})" if details else "")
+            if description:
+                line += f": {description}"
+            self._lines[key] = line
+        return line
@@ -0,0 +1,113 @@
+import json
+import re
+from typing import IO, Iterator, List
+
+WHITESPACE_PATTERN = re.compile(r"\s*")
+CHUNK_SIZE = 64 * 1024
+
+
+class FeedFormatError(ValueError):
+    """The feed is not a JSON object holding an array under the expected key"""
+
+
+class _Reader:
+    """Character buffer over a text file that only keeps the unparsed tail"""
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping what has been consumed; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at end of file"""
+        while True:
+            self.pos = WHITESPACE_PATTERN.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise FeedFormatError(f"Expected {char!r} at offset {self.pos} of the current chunk")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder):
+        """Decode the next JSON value, reading more of the file until it is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise FeedFormatError(f"Invalid or truncated feed: {e.msg}") from None
+            # At end of file this just sets eof, and the last attempt above decides
+            self.fill()
+
+
+def iter_feed_records(file: IO[str], key: str = "data", chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the records of a {"<key>": [...]} JSON feed one at a time
+
+    Only the current chunk and the record being decoded are held in memory,
+    however large the feed is. Other top-level keys are decoded and skipped.
+    """
+    decoder = json.JSONDecoder()
+    reader = _Reader(file, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value(decoder)
+        reader.expect(":")
+        if name == key:
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value(decoder)
+                    separator = reader.peek()
+                    reader.pos += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise FeedFormatError(f"Expected ',' or ']' between records, got {separator!r}")
+        else:
+            reader.value(decoder)
+
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise FeedFormatError(f"Expected ',' or '}}' after a top-level value, got {separator!r}")
+
+
+def iter_batches(records: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    """Group an iterator into lists of at most size items"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
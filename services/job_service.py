@@ -1,31 +1,175 @@
-from database import Database
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config.db_config import JOB_LISTING_SETTINGS
+from database import FACET_FIELDS, JOB_DETAIL_PROJECTION, JOB_SUMMARY_PROJECTION, Database, job_snippet
+from services.catalog_cache import JobCatalog
+from services.interaction_logger import InteractionLogger
+from services.metrics import get_metrics
+from services.search_index import JobSearchIndex
+
+metrics = get_metrics()
+
+@dataclass
+class JobPage:
+    """One page of job summaries; next_cursor is None on the last page"""
+    jobs: List[dict] = field(default_factory=list)
+    next_cursor: Optional[object] = None
+
+def job_summary(job: dict) -> dict:
+    """The listing fields of a full job document"""
+    summary = {name: job.get(name) for name in JOB_SUMMARY_PROJECTION}
+    summary["_id"] = job.get("_id")
+    if summary["snippet"] is None:
+        # Postings imported before snippets were stored
+        summary["snippet"] = job_snippet(job.get("description"))
+    return summary
+
+class _CatalogView:
+    """Summaries of one catalog version in _id order, with facet postings for filtering"""
+
+    def __init__(self, jobs: List[dict]):
+        ordered = sorted(jobs, key=lambda job: job["_id"])
+        self.summaries = [job_summary(job) for job in ordered]
+        self.ids = [job["_id"] for job in ordered]
+        self.jobs_by_id = {job["_id"]: job for job in ordered}
+        # field -> value -> positions in _id order; the in-memory counterpart of the facet indexes
+        self.postings: Dict[str, Dict[object, List[int]]] = {name: {} for name in FACET_FIELDS}
+        for position, job in enumerate(ordered):
+            for name in FACET_FIELDS:
+                values = job.get(name)
+                for value in values if isinstance(values, list) else [values]:
+                    if value not in (None, ""):
+                        self.postings[name].setdefault(value, []).append(position)
+
+    def positions(self, filters: dict) -> List[int]:
+        """Positions of the jobs matching every filter, in _id order"""
+        lists = sorted((self.postings[name].get(value, []) for name, value in filters.items()), key=len)
+        matched = lists[0]
+        for other in lists[1:]:
+            other = set(other)
+            matched = [position for position in matched if position in other]
+        return matched
 
 class JobService:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, catalog: JobCatalog = None, interaction_logger: InteractionLogger = None):
         self.db = db
+        self.catalog = catalog
+        self.interaction_logger = interaction_logger
+        self.search_index = JobSearchIndex()
+        if self.catalog:
+            # Keep the search index in step with the catalog cache
+            self.catalog.add_listener(self.search_index.apply_change)
+        # Catalog summaries are rebuilt, and facet counts fetched, once per catalog version
+        self._view_lock = threading.Lock()
+        self._view_source = None
+        self._view = _CatalogView([])
+        self._facets = None
 
     def get_all_jobs(self):
-        """Get all jobs from the database"""
-        jobs = self.db.get_all_jobs()
-        print(f"Retrieved {len(jobs)} jobs from database: {jobs}")  # Debug print
-        return jobs
-
-    def match_jobs(self, query):
-        """Match jobs based on query"""
-        if not query:
-            return self.get_all_jobs()
-        
-        criteria = {
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"description": {"$regex": query, "$options": "i"}},
-                {"location": {"$regex": query, "$options": "i"}},
-                {"categories": {"$regex": query, "$options": "i"}}
-            ]
-        }
-        jobs = self.db.get_jobs_by_criteria(criteria)
-        print(f"Matched {len(jobs)} jobs for query '{query}': {jobs}")  # Debug print
-        return jobs
+        """Get all jobs, served from the shared catalog cache when available"""
+        return self.catalog.get_jobs() if self.catalog else self.db.get_all_jobs()
+
+    def match_jobs(self, query, limit=None):
+        """Match jobs based on query, most relevant first"""
+        with metrics.span("jobs.match"):
+            if not query or not query.strip():
+                return self.get_all_jobs()
+
+            if self.catalog:
+                # Refresh the catalog first so the index reflects the current version
+                self.catalog.get_jobs()
+                return self.search_index.search(query, limit=limit)
+            # Without a catalog, fall back to the jobs text index
+            return self.db.search_jobs(query)
+
+    def get_job_page(self, query="", cursor=None, limit=None, filters=None) -> JobPage:
+        """One page of job summaries, all jobs in _id order or search matches by relevance
+
+        Pass the previous page's next_cursor to get the following page.
+        Cursors are opaque: the last _id seen when browsing, an offset when
+        searching. filters maps facet fields (see get_facets) to the value
+        jobs must have.
+        """
+        limit = limit or JOB_LISTING_SETTINGS["page_size"]
+        filters = {name: value for name, value in (filters or {}).items() if value not in (None, "")}
+        with metrics.span("jobs.page"):
+            if query and query.strip():
+                offset = cursor or 0
+                if self.catalog:
+                    jobs = self._search_catalog(query, offset, limit + 1, filters)
+                else:
+                    jobs = self.db.search_job_summaries(query, skip=offset, limit=limit + 1, filters=filters)
+                next_cursor = offset + limit if len(jobs) > limit else None
+            else:
+                if self.catalog:
+                    jobs = self._browse_catalog(cursor, limit + 1, filters)
+                else:
+                    # One more than a page tells whether another page follows
+                    jobs = self.db.get_job_summaries(after=cursor, limit=limit + 1, filters=filters)
+                next_cursor = jobs[limit - 1]["_id"] if len(jobs) > limit else None
+            return JobPage(jobs=jobs[:limit], next_cursor=next_cursor)
+
+    def get_facets(self) -> Dict[str, list]:
+        """(value, job count) pairs for each facet field, most common first
+
+        Aggregated in MongoDB once per catalog version and reused until the
+        catalog changes.
+        """
+        if self.catalog:
+            self.catalog.get_jobs()
+            version = self.catalog.version
+        else:
+            version = self.db.get_catalog_version()
+        cached = self._facets
+        if cached is None or cached[0] != version:
+            cached = (version, self.db.get_job_facets())
+            self._facets = cached
+        return cached[1]
+
+    def get_job(self, job_id):
+        """A full job document, or None for a removed job"""
+        if self.catalog:
+            return self._catalog_view().jobs_by_id.get(job_id)
+        return self.db.get_job_by_id(job_id)
+
+    def get_job_details(self, job_id):
+        """The fields listings leave out (description, apply_url), or None for a removed job"""
+        if self.catalog:
+            job = self._catalog_view().jobs_by_id.get(job_id)
+            return {name: job.get(name) for name in JOB_DETAIL_PROJECTION} if job else None
+        return self.db.get_job_details(job_id)
+
+    def _browse_catalog(self, cursor, count, filters):
+        view = self._catalog_view()
+        if not filters:
+            start = bisect.bisect_right(view.ids, cursor) if cursor is not None else 0
+            return view.summaries[start:start + count]
+        positions = view.positions(filters)
+        if cursor is not None:
+            positions = positions[bisect.bisect_right(positions, bisect.bisect_right(view.ids, cursor) - 1):]
+        return [view.summaries[position] for position in positions[:count]]
+
+    def _search_catalog(self, query, offset, count, filters):
+        view = self._catalog_view()
+        if not filters:
+            return [job_summary(job) for job in self.search_index.search(query, limit=count, offset=offset)]
+        allowed = {view.ids[position] for position in view.positions(filters)}
+        matches = [job for job in self.search_index.search(query) if job["_id"] in allowed]
+        return [job_summary(job) for job in matches[offset:offset + count]]
+
+    def _catalog_view(self) -> _CatalogView:
+        # Refreshing the catalog also brings the search index up to date
+        jobs = self.catalog.get_jobs()
+        if jobs is not self._view_source:
+            with self._view_lock:
+                # The catalog replaces its list on every change, so identity marks a new version
+                if jobs is not self._view_source:
+                    self._view = _CatalogView(jobs)
+                    self._view_source = jobs
+        return self._view
 
     def save_application(self, application_data):
         """
@@ -35,8 +179,10 @@ class JobService:
 
     def save_interaction(self, user_id, user_input, response):
         """
-        Save user interaction to database
+        Save user interaction to database, in the background when a logger is configured
         """
+        if self.interaction_logger:
+            return self.interaction_logger.log(user_id, user_input, response)
         return self.db.save_user_interaction(user_id, user_input, response)
 
     def get_user_context(self, user_id):
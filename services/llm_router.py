@@ -0,0 +1,490 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from config.ai_config import ASYNC_LLM_SETTINGS, LLM_ROUTER_SETTINGS
+from services.async_llm import AsyncLLMClient, LLMDeadlineExceeded, is_transient_error
+from services.metrics import get_metrics
+
+ROUTER_EVENTS = get_metrics().counter(
+    "llm_router_events_total", "LLM router hedges, failovers, fallbacks and opened circuits", ["endpoint", "event"]
+)
+# LangChain message types -> chat completion roles
+MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+_DONE = object()
+
+
+class LLMUnavailable(RuntimeError):
+    """Every configured LLM endpoint has its circuit open"""
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after consecutive failures
+
+    Closed, requests flow. Open, the endpoint is skipped for reset_seconds.
+    Half-open after that, one probe request goes through and its outcome
+    closes or reopens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold or LLM_ROUTER_SETTINGS["breaker_failures"]
+        self.reset_seconds = reset_seconds if reset_seconds is not None else LLM_ROUTER_SETTINGS["breaker_reset"]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def available(self) -> bool:
+        """True when a request may be sent now"""
+        with self._lock:
+            state = self._current_state()
+            return state == self.CLOSED or (state == self.HALF_OPEN and not self._probing)
+
+    def acquire(self) -> bool:
+        """Reserve a request; in the half-open state only the probe gets one"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """The reserved request ended without telling anything about the endpoint"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True when it opened the circuit"""
+        with self._lock:
+            state = self._current_state()
+            self._failures += 1
+            self._probing = False
+            if state == self.HALF_OPEN or (state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                return True
+            return False
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+
+class LatencyTracker:
+    """The latest latencies of an endpoint, for quantile estimates"""
+
+    def __init__(self, window: Optional[int] = None):
+        self._samples = deque(maxlen=window or LLM_ROUTER_SETTINGS["latency_window"])
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class LLMEndpoint:
+    """One upstream chat endpoint with its circuit breaker and latency history"""
+
+    def __init__(
+        self,
+        name: str,
+        client: AsyncLLMClient,
+        fallback: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+        latency_window: Optional[int] = None,
+    ):
+        self.name = name
+        self.client = client
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        # Keyed by streaming: whole-call latency for plain calls, time to first token for streamed ones
+        self.latency = {False: LatencyTracker(latency_window), True: LatencyTracker(latency_window)}
+        # Attempts started and not finished, including those queued on the client's semaphore.
+        # Calls run on the router's own loop and on callers' loops, so it is guarded by a lock
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def begin(self) -> None:
+        """Count an attempt as started"""
+        with self._in_flight_lock:
+            self._in_flight += 1
+
+    def end(self) -> None:
+        """Count an attempt as finished"""
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def load(self) -> float:
+        return self.in_flight / self.client.max_concurrency
+
+
+class _Race:
+    """The attempts of one call; the first to answer (or stream a token) wins"""
+
+    def __init__(self, on_token: Optional[Callable[[str], None]]):
+        self.on_token = on_token
+        self.winner: Optional[asyncio.Task] = None
+        self.tasks: Dict[asyncio.Task, LLMEndpoint] = {}
+        self.hedges = set()
+
+    def claim(self, task: asyncio.Task) -> bool:
+        if self.winner is None:
+            self.winner = task
+            # The losers' output is never used
+            for other in self.tasks:
+                if other is not task:
+                    other.cancel()
+        return self.winner is task
+
+
+class LLMRouter:
+    """Async chat completions spread over an ordered list of endpoints
+
+    Calls go to the first healthy primary endpoint. When it has not answered
+    within the hedge quantile of its recent latencies (time to first token
+    when streaming), a second request goes to the next endpoint, or the same
+    one when there is no other, and whichever answers first wins. Failed
+    calls fail over to the next endpoint, endpoints that keep failing are
+    skipped by their circuit breaker, and fallback endpoints take new calls
+    first when the primary ones are saturated or unavailable.
+
+    complete() has the signature of AsyncLLMClient.complete(); complete_sync()
+    runs it on a background event loop for thread callers.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        hedge: Optional[bool] = None,
+        hedge_quantile: Optional[float] = None,
+        hedge_initial_delay: Optional[float] = None,
+        hedge_min_delay: Optional[float] = None,
+        min_latency_samples: Optional[int] = None,
+        fallback_load: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ):
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        settings = LLM_ROUTER_SETTINGS
+        self.endpoints = endpoints
+        self.hedge = hedge if hedge is not None else settings["hedge"]
+        self.hedge_quantile = hedge_quantile or settings["hedge_quantile"]
+        self.hedge_initial_delay = (
+            hedge_initial_delay if hedge_initial_delay is not None else settings["hedge_initial_delay"]
+        )
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else settings["hedge_min_delay"]
+        self.min_latency_samples = (
+            min_latency_samples if min_latency_samples is not None else settings["min_latency_samples"]
+        )
+        self.fallback_load = fallback_load or settings["fallback_load"]
+        self.deadline = deadline or ASYNC_LLM_SETTINGS["deadline"]
+
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        on_token: Optional[Callable[[str], None]] = None,
+        deadline: Optional[float] = None,
+        operation: str = "other",
+    ) -> str:
+        """Return the completion text, streaming tokens to on_token when given
+
+        The deadline covers every attempt of the call, hedges and failovers included.
+        """
+        deadline = deadline or self.deadline
+        self._count("calls")
+        try:
+            return await asyncio.wait_for(self._route(messages, on_token, deadline, operation), deadline)
+        except asyncio.TimeoutError:
+            self._count("deadline_exceeded")
+            raise LLMDeadlineExceeded(f"LLM call exceeded its {deadline}s deadline") from None
+
+    def complete_sync(
+        self,
+        messages: List[Dict[str, str]],
+        on_token: Optional[Callable[[str], None]] = None,
+        deadline: Optional[float] = None,
+        operation: str = "other",
+    ) -> str:
+        """complete() for thread callers; on_token runs on the calling thread"""
+        loop = self._background_loop()
+        if on_token is None:
+            return asyncio.run_coroutine_threadsafe(
+                self.complete(messages, None, deadline, operation), loop
+            ).result()
+
+        tokens = queue.SimpleQueue()
+        future = asyncio.run_coroutine_threadsafe(self.complete(messages, tokens.put, deadline, operation), loop)
+        future.add_done_callback(lambda _: tokens.put(_DONE))
+        while True:
+            token = tokens.get()
+            if token is _DONE:
+                return future.result()
+            on_token(token)
+
+    def load(self) -> float:
+        """In-flight attempts over the concurrency of the primary endpoints"""
+        primaries = [endpoint for endpoint in self.endpoints if not endpoint.fallback] or self.endpoints
+        return sum(endpoint.in_flight for endpoint in primaries) / sum(
+            endpoint.client.max_concurrency for endpoint in primaries
+        )
+
+    def stats(self) -> dict:
+        """Router counters, plus each endpoint's client counters and hedge delays"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["load"] = self.load()
+        stats["open_circuits"] = sum(endpoint.breaker.state != CircuitBreaker.CLOSED for endpoint in self.endpoints)
+        for endpoint in self.endpoints:
+            for name, value in endpoint.client.stats().items():
+                stats[f"{endpoint.name}_{name}"] = value
+            stats[f"{endpoint.name}_circuit_open"] = int(endpoint.breaker.state == CircuitBreaker.OPEN)
+            stats[f"{endpoint.name}_hedge_delay_seconds"] = self._hedge_delay(endpoint, True)
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the endpoints' HTTP clients owned by the running loop"""
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
+
+    def close(self) -> None:
+        """Close every endpoint's HTTP clients and stop the background loop"""
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+        with self._lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+
+    async def _route(self, messages, on_token, deadline: float, operation: str) -> str:
+        streaming = on_token is not None
+        candidates = self._candidates()
+        race = _Race(on_token)
+        last_error: Optional[Exception] = None
+        hedge_at = None
+
+        def launch(endpoint: LLMEndpoint) -> asyncio.Task:
+            task = asyncio.ensure_future(self._attempt(endpoint, messages, race, deadline, operation))
+            race.tasks[task] = endpoint
+            return task
+
+        try:
+            while True:
+                if not race.tasks:
+                    # First attempt, or failover after every running attempt failed
+                    endpoint = self._next_endpoint(candidates)
+                    if endpoint is None:
+                        if last_error is not None:
+                            raise last_error
+                        self._count("unavailable")
+                        raise LLMUnavailable("Every LLM endpoint has its circuit open")
+                    if last_error is not None:
+                        self._event(endpoint, "failover")
+                    launch(endpoint)
+                    hedge_at = None
+                    if self.hedge and not race.hedges and self.load() < self.fallback_load:
+                        hedge_at = time.monotonic() + self._hedge_delay(endpoint, streaming)
+
+                timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None else None
+                done, _ = await asyncio.wait(race.tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_at = None
+                    if race.winner is None:
+                        endpoint = self._next_endpoint(candidates) or self._hedge_same(race)
+                        if endpoint is not None:
+                            self._event(endpoint, "hedge")
+                            race.hedges.add(launch(endpoint))
+                    continue
+
+                for task in done:
+                    endpoint = race.tasks.pop(task)
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if error is None:
+                        if race.claim(task):
+                            if task in race.hedges:
+                                self._event(endpoint, "hedge_win")
+                            return task.result()
+                    elif race.winner is task:
+                        # Tokens were already streamed to the caller; another endpoint cannot continue them
+                        raise error
+                    else:
+                        last_error = error
+        finally:
+            for task in race.tasks:
+                task.cancel()
+
+    async def _attempt(self, endpoint: LLMEndpoint, messages, race: _Race, deadline: float, operation: str) -> str:
+        task = asyncio.current_task()
+        streaming = race.on_token is not None
+        started = time.perf_counter()
+        first_token = []
+
+        def on_token(token: str) -> None:
+            if not first_token:
+                first_token.append(True)
+                endpoint.latency[True].add(time.perf_counter() - started)
+            if race.claim(task):
+                race.on_token(token)
+
+        endpoint.begin()
+        try:
+            text = await endpoint.client.complete(
+                messages, on_token=on_token if streaming else None, deadline=deadline, operation=operation
+            )
+        except asyncio.CancelledError:
+            endpoint.breaker.release()
+            if not (streaming and first_token):
+                # A lower bound of the latency, so lost hedges still count towards the tail
+                endpoint.latency[streaming].add(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            if is_transient_error(e) or isinstance(e, LLMDeadlineExceeded):
+                if endpoint.breaker.record_failure():
+                    self._event(endpoint, "circuit_open")
+            else:
+                endpoint.breaker.release()
+            raise
+        finally:
+            endpoint.end()
+        endpoint.breaker.record_success()
+        if not streaming:
+            endpoint.latency[False].add(time.perf_counter() - started)
+        return text
+
+    def _candidates(self) -> List[LLMEndpoint]:
+        """Endpoints in the order this call should try them"""
+        primaries = [endpoint for endpoint in self.endpoints if not endpoint.fallback]
+        fallbacks = [endpoint for endpoint in self.endpoints if endpoint.fallback]
+        if fallbacks and (
+            self.load() >= self.fallback_load or not any(endpoint.breaker.available() for endpoint in primaries)
+        ):
+            self._event(fallbacks[0], "fallback")
+            return fallbacks + primaries
+        return primaries + fallbacks
+
+    @staticmethod
+    def _next_endpoint(candidates: List[LLMEndpoint]) -> Optional[LLMEndpoint]:
+        """Take the next candidate whose circuit lets a request through"""
+        while candidates:
+            endpoint = candidates.pop(0)
+            if endpoint.breaker.acquire():
+                return endpoint
+        return None
+
+    @staticmethod
+    def _hedge_same(race: _Race) -> Optional[LLMEndpoint]:
+        # With no other endpoint to try, a second request to the same one still cuts the tail
+        for endpoint in race.tasks.values():
+            if endpoint.breaker.state == CircuitBreaker.CLOSED:
+                return endpoint
+        return None
+
+    def _hedge_delay(self, endpoint: LLMEndpoint, streaming: bool) -> float:
+        tracker = endpoint.latency[streaming]
+        if len(tracker) < self.min_latency_samples:
+            return self.hedge_initial_delay
+        return max(self.hedge_min_delay, tracker.quantile(self.hedge_quantile))
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-router", daemon=True)
+                thread.start()
+                self._loop, self._loop_thread = loop, thread
+            if threading.current_thread() is self._loop_thread:
+                raise RuntimeError("complete_sync() cannot run on the router's own loop; await complete()")
+            return self._loop
+
+    def _event(self, endpoint: LLMEndpoint, event: str) -> None:
+        self._count(event)
+        ROUTER_EVENTS.inc(endpoint=endpoint.name, event=event)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+class RouterChatModel(BaseChatModel):
+    """LangChain chat model whose calls go through an LLMRouter
+
+    Lets the career chain, the conversation summarizer and the intent
+    classifier share the router's endpoints, hedging and circuit breakers.
+    The operation label of a call is its first tag ("chat", "summary", ...).
+    """
+
+    router: Any
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        payload = [
+            {"role": MESSAGE_ROLES.get(message.type, "user"), "content": message.content}
+            for message in messages
+        ]
+        on_token = run_manager.on_llm_new_token if run_manager is not None and self.streaming else None
+        # Skip the "seq:step:N" tags LangChain adds to runs inside a chain
+        tags = run_manager.tags if run_manager is not None else []
+        operation = next((tag for tag in tags if ":" not in tag), "other")
+        text = self.router.complete_sync(payload, on_token=on_token, operation=operation)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
@@ -0,0 +1,436 @@
+import functools
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.metrics_config import METRICS_SETTINGS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+INF_LABEL = 'le="+Inf"'
+NAME_PATTERN = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(*parts: str) -> str:
+    return NAME_PATTERN.sub("_", "_".join(part for part in parts if part))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, **labels):
+        """The child for these label values; keep it to skip the lookup on hot paths"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. calls or tokens"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labelnames, key) -> List[str]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labelnames, key, INF_LABEL)} {count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or METRICS_SETTINGS["latency_buckets"]))
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class _Span:
+    __slots__ = ("_calls", "_errors", "_seconds", "_started")
+
+    def __init__(self, calls, errors, seconds):
+        self._calls = calls
+        self._errors = errors
+        self._seconds = seconds
+        self._started = 0.0
+
+    def __enter__(self):
+        self._calls.inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._seconds.observe(time.perf_counter() - self._started)
+        # Streamlit's rerun/stop are BaseExceptions, not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self._errors.inc()
+        return False
+
+
+class _CountingSpan:
+    """A span that is not timed; shared by every unsampled call of one name"""
+    __slots__ = ("_calls", "_errors")
+
+    def __init__(self, calls, errors):
+        self._calls = calls
+        self._errors = errors
+
+    def __enter__(self):
+        self._calls.inc()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self._errors.inc()
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class MetricsRegistry:
+    """Process-wide counters, histograms and timing spans in Prometheus text format
+
+    Spans always count calls and errors; only sample_rate of them are timed,
+    so the duration histogram's _count is the number of sampled calls.
+    Components that keep their own stats() register them as collectors and
+    are exported as gauges.
+    """
+
+    def __init__(self, namespace: Optional[str] = None, sample_rate: Optional[float] = None, enabled: Optional[bool] = None):
+        self.namespace = namespace if namespace is not None else METRICS_SETTINGS["namespace"]
+        self.sample_rate = sample_rate if sample_rate is not None else METRICS_SETTINGS["sample_rate"]
+        self.enabled = enabled if enabled is not None else METRICS_SETTINGS["enabled"]
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+        # Span name -> (calls, errors, seconds, counting span), resolved once per name
+        self._spans: Dict[str, tuple] = {}
+
+        self.span_calls = self.counter("span_calls_total", "Calls of instrumented operations", ["span"])
+        self.span_errors = self.counter("span_errors_total", "Instrumented operations that raised", ["span"])
+        self.span_seconds = self.histogram("span_seconds", "Duration of sampled instrumented operations", ["span"])
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(_metric_name(self.namespace, name), documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=None) -> Histogram:
+        return self._register(Histogram(_metric_name(self.namespace, name), documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collect: Callable[[], dict]) -> None:
+        """Export the numeric values of collect() as <namespace>_<name>_<key> gauges"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def collected(self, name: str, component):
+        """Register component.stats as a collector and return the component"""
+        self.register_collector(name, component.stats)
+        return component
+
+    def span(self, name: str, sampled: bool = True):
+        """Context manager counting and (when sampled, or always with sampled=False) timing name"""
+        if not self.enabled:
+            return NULL_SPAN
+        children = self._spans.get(name)
+        if children is None:
+            calls = self.span_calls.labels(span=name)
+            errors = self.span_errors.labels(span=name)
+            children = (calls, errors, self.span_seconds.labels(span=name), _CountingSpan(calls, errors))
+            self._spans[name] = children
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return children[3]
+        return _Span(children[0], children[1], children[2])
+
+    def render(self) -> str:
+        """The registry in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for component, collect in collectors:
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"Error collecting {component} metrics: {str(e)}")
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = _metric_name(self.namespace, component, key)
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry"""
+    return _registry
+
+
+def instrument_methods(prefix: str, registry: Optional[MetricsRegistry] = None):
+    """Class decorator wrapping every public method in a span named <prefix>.<method>"""
+    registry = registry or _registry
+
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not callable(method):
+                continue
+            setattr(cls, name, _spanned(registry, f"{prefix}.{name}", method))
+        return cls
+
+    return decorate
+
+
+def _spanned(registry: MetricsRegistry, span_name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with registry.span(span_name):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+LLM_REQUESTS = _registry.counter("llm_requests_total", "LLM calls by operation and outcome", ["operation", "status"])
+LLM_SECONDS = _registry.histogram("llm_request_seconds", "LLM call duration", ["operation"])
+LLM_FIRST_TOKEN_SECONDS = _registry.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed token", ["operation"]
+)
+LLM_TOKENS = _registry.counter(
+    "llm_tokens_total", "Prompt and completion tokens (estimated when the API reports no usage)",
+    ["operation", "kind"]
+)
+
+
+def record_llm_call(
+    operation: str,
+    seconds: float,
+    time_to_first_token: Optional[float] = None,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    error: bool = False,
+) -> None:
+    """Record one LLM call; every call is recorded, as each costs far more than this"""
+    if not _registry.enabled:
+        return
+    LLM_REQUESTS.inc(operation=operation, status="error" if error else "ok")
+    LLM_SECONDS.observe(seconds, operation=operation)
+    if time_to_first_token is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(time_to_first_token, operation=operation)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, operation=operation, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, operation=operation, kind="completion")
+
+
+class MetricsExporter:
+    """Serves the registry over HTTP and/or writes it to a file periodically"""
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        textfile_path: Optional[str] = None,
+        textfile_interval: Optional[float] = None,
+    ):
+        self.registry = registry or _registry
+        self.host = host if host is not None else METRICS_SETTINGS["http_host"]
+        self.port = port if port is not None else METRICS_SETTINGS["http_port"]
+        self.textfile_path = textfile_path if textfile_path is not None else METRICS_SETTINGS["textfile_path"]
+        self.textfile_interval = textfile_interval or METRICS_SETTINGS["textfile_interval"]
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "MetricsExporter":
+        if self.host and self.port is not None:
+            try:
+                self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+                self._httpd.daemon_threads = True
+            except OSError as e:
+                # Another app process on this host already serves the endpoint
+                print(f"Metrics endpoint not started on {self.host}:{self.port}: {str(e)}")
+            else:
+                self._spawn("metrics-http", self._httpd.serve_forever)
+        if self.textfile_path:
+            self._spawn("metrics-textfile", self._write_loop)
+        return self
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        return self._httpd.server_address[:2] if self._httpd else None
+
+    def write_textfile(self) -> None:
+        """Write the exposition atomically so scrapers never read a partial file"""
+        directory = os.path.dirname(os.path.abspath(self.textfile_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(self.registry.render())
+            os.replace(temp_path, self.textfile_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        if self.textfile_path:
+            try:
+                self.write_textfile()
+            except Exception as e:
+                print(f"Error writing metrics file: {str(e)}")
+
+    def _spawn(self, name: str, target: Callable[[], None]) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.textfile_interval):
+            try:
+                self.write_textfile()
+            except Exception as e:
+                print(f"Error writing metrics file: {str(e)}")
+
+    def _handler_class(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
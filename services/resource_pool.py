@@ -0,0 +1,229 @@
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import streamlit as st
+from pymongo import MongoClient
+
+from config.ai_config import AI_SETTINGS, LLM_ENDPOINTS, LLM_ROUTER_SETTINGS
+from config.db_config import DATABASE_SETTINGS, RESOURCE_POOL_SETTINGS
+from services.async_llm import AsyncLLMClient
+from services.llm_router import CircuitBreaker, LLMEndpoint, LLMRouter, RouterChatModel
+from services.metrics import get_metrics
+
+
+def get_secret(name: str, default: Any = None) -> Any:
+    """Read a value from Streamlit secrets, falling back to a default"""
+    try:
+        return st.secrets[name]
+    except Exception:
+        return default
+
+
+class ResourcePool:
+    """Process-wide owner of the clients shared by every Streamlit session"""
+
+    def __init__(
+        self,
+        mongo_uri: Optional[str] = None,
+        health_check_interval: Optional[float] = None,
+        mongo_client: Optional[MongoClient] = None,
+        chat_llm: Optional[Any] = None,
+        llm_base_url: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_endpoints: Optional[List[dict]] = None,
+    ):
+        self.mongo_uri = mongo_uri or get_secret("MONGODB_URI", DATABASE_SETTINGS["default_uri"])
+        self.health_check_interval = (
+            health_check_interval
+            if health_check_interval is not None
+            else RESOURCE_POOL_SETTINGS["health_check_interval"]
+        )
+        self.llm_base_url = llm_base_url or get_secret("DEEPSEEK_BASE_URL", AI_SETTINGS["base_url"])
+        self.llm_api_key = llm_api_key or get_secret("DEEPSEEK_API_KEY", "")
+        # Entries as in LLM_ENDPOINTS; base_url and api_key default to the two above
+        self.llm_endpoints = llm_endpoints or LLM_ENDPOINTS
+        self._lock = threading.RLock()
+        # Clients passed in (benchmarks, offline tools) are used as-is, without health checks
+        self._mongo_client: Optional[MongoClient] = mongo_client
+        self._external_mongo = mongo_client is not None
+        self._external_chat_llm = chat_llm
+        self._chat_llm: Optional[RouterChatModel] = None
+        self._shared: Dict[str, Any] = {}
+        self._last_mongo_check = 0.0
+        self._closed = False
+
+    def get_mongo_client(self) -> MongoClient:
+        """Return the shared MongoClient, reconnecting if the health check fails"""
+        if self._external_mongo:
+            return self._mongo_client
+        client = self._mongo_client
+        if client is not None and not self._mongo_check_due():
+            return client
+
+        with self._lock:
+            self._ensure_open()
+            if self._mongo_client is None:
+                self._mongo_client = self._create_mongo_client()
+                self._last_mongo_check = time.monotonic()
+            elif self._mongo_check_due():
+                self._last_mongo_check = time.monotonic()
+                if not self._ping_mongo(self._mongo_client):
+                    self._mongo_client.close()
+                    self._mongo_client = self._create_mongo_client()
+            return self._mongo_client
+
+    def get_chat_llm(self) -> RouterChatModel:
+        """Return the shared LangChain chat model, backed by the LLM router"""
+        if self._external_chat_llm is not None:
+            return self._external_chat_llm
+        router = self.get_async_llm()
+        with self._lock:
+            self._ensure_open()
+            if self._chat_llm is None:
+                # The endpoint clients record latency, time to first token and tokens of every call
+                self._chat_llm = RouterChatModel(router=router, streaming=AI_SETTINGS["streaming"])
+            return self._chat_llm
+
+    def get_async_llm(self) -> LLMRouter:
+        """Return the shared LLM router over the configured endpoints"""
+        return self.get_or_create(
+            "async_llm", lambda: get_metrics().collected("async_llm", self._create_llm_router())
+        )
+
+    def get_database(self):
+        """Return the shared Database wrapper, which reads the pooled MongoClient on every use"""
+        return self.get_or_create("database", self._create_database)
+
+    def _create_database(self):
+        from database import Database, IndexSetupError
+
+        db = Database(client_source=self.get_mongo_client)
+        # Indexes are declared in code and created once per process at startup
+        try:
+            db.ensure_indexes()
+        except IndexSetupError:
+            # Queries such as $text search fail without them: stop here rather than later
+            raise
+        except Exception as e:
+            print(f"Error ensuring MongoDB indexes: {str(e)}")
+        return db
+
+    def get_or_create(self, name: str, factory: Callable[[], Any], owner: Any = None) -> Any:
+        """Return a named process-wide singleton, building it on first use
+
+        Pass the object the singleton is built from (e.g. its Database) as
+        owner, so services built on another one get their own instance.
+        """
+        if owner is not None:
+            name = f"{name}@{id(owner)}"
+        instance = self._shared.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            self._ensure_open()
+            if name not in self._shared:
+                self._shared[name] = factory()
+            return self._shared[name]
+
+    def shutdown(self) -> None:
+        """Close every pooled client; safe to call more than once"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for instance in self._shared.values():
+                close = getattr(instance, "close", None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception as e:
+                        print(f"Error closing shared resource: {str(e)}")
+            self._shared.clear()
+            if self._mongo_client is not None:
+                self._mongo_client.close()
+            self._chat_llm = None
+            self._mongo_client = None
+
+    def _ensure_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("ResourcePool has been shut down")
+
+    def _mongo_check_due(self) -> bool:
+        return time.monotonic() - self._last_mongo_check >= self.health_check_interval
+
+    def _create_mongo_client(self) -> MongoClient:
+        return MongoClient(
+            self.mongo_uri,
+            maxPoolSize=DATABASE_SETTINGS["max_pool_size"],
+            minPoolSize=DATABASE_SETTINGS["min_pool_size"],
+            maxIdleTimeMS=DATABASE_SETTINGS["max_idle_time_ms"],
+            connectTimeoutMS=DATABASE_SETTINGS["connect_timeout_ms"],
+            serverSelectionTimeoutMS=DATABASE_SETTINGS["server_selection_timeout_ms"],
+        )
+
+    def _create_llm_router(self) -> LLMRouter:
+        settings = LLM_ROUTER_SETTINGS
+        endpoints = []
+        for config in self.llm_endpoints:
+            base_url = get_secret(config["base_url_secret"]) if config.get("base_url_secret") else None
+            api_key = get_secret(config["api_key_secret"]) if config.get("api_key_secret") else None
+            client = AsyncLLMClient(
+                base_url=base_url or config.get("base_url") or self.llm_base_url,
+                api_key=api_key or config.get("api_key") or self.llm_api_key,
+                model=config.get("model"),
+                temperature=config.get("temperature"),
+                max_concurrency=config.get("max_concurrency"),
+                # A lone endpoint keeps the client's own retries; otherwise the router fails over sooner
+                max_retries=settings["endpoint_retries"] if len(self.llm_endpoints) > 1 else None,
+            )
+            endpoints.append(LLMEndpoint(
+                config.get("name") or f"endpoint{len(endpoints)}",
+                client,
+                fallback=config.get("fallback", False),
+                breaker=CircuitBreaker(settings["breaker_failures"], settings["breaker_reset"]),
+            ))
+        return LLMRouter(endpoints)
+
+    @staticmethod
+    def _ping_mongo(client: MongoClient) -> bool:
+        try:
+            client.admin.command("ping")
+            return True
+        except Exception as e:
+            print(f"MongoDB health check failed, reconnecting: {str(e)}")
+            return False
+
+
+_pool: Optional[ResourcePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_resource_pool() -> ResourcePool:
+    """Return the process-wide ResourcePool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ResourcePool()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def shutdown_resource_pool() -> None:
+    """Shut down the process-wide ResourcePool so the next call starts fresh"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def install_resource_pool(pool: ResourcePool) -> ResourcePool:
+    """Make pool the process-wide ResourcePool, e.g. one built on offline clients"""
+    global _pool
+    with _pool_lock:
+        _pool = pool
+        atexit.register(pool.shutdown)
+    return pool
@@ -0,0 +1,140 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config.ai_config import RESPONSE_CACHE_SETTINGS
+from services.application_flow import EMAIL_PATTERN, NAME_PREFIX_PATTERN, PHONE_PATTERN
+from services.intent_classifier import normalize
+
+
+ROLE_PREFIX_PATTERN = re.compile(r"^(?:Human|AI): ")
+
+
+def contains_personal_data(text: str) -> bool:
+    """Screen text (or a rendered history) for emails, phone numbers or self-introductions"""
+    if EMAIL_PATTERN.search(text) or PHONE_PATTERN.search(text):
+        return True
+    return any(
+        NAME_PREFIX_PATTERN.match(ROLE_PREFIX_PATTERN.sub("", line))
+        for line in text.splitlines()
+    )
+
+
+def make_cache_key(
+    user_input: str, stage: Optional[str], selected_job: Optional[str], catalog_version, context: str = ""
+) -> str:
+    """Key a response by what it may depend on: the question, flow position, catalog and context
+
+    context is whatever else the prompt conditions on (the last reply and the
+    job context), so "yes" or "tell me more" only hit after the same reply.
+    """
+    raw = "\x1f".join([normalize(user_input), stage or "", selected_job or "", str(catalog_version), context])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of generated responses, bounded by entry count and bytes
+
+    With a Database, misses fall through to the shared response_cache
+    collection so several app processes share hits.
+    """
+
+    def __init__(
+        self,
+        db=None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.db = db if RESPONSE_CACHE_SETTINGS["shared_tier"] else None
+        self.ttl_seconds = ttl_seconds or RESPONSE_CACHE_SETTINGS["ttl_seconds"]
+        self.max_entries = max_entries or RESPONSE_CACHE_SETTINGS["max_entries"]
+        self.max_bytes = max_bytes or RESPONSE_CACHE_SETTINGS["max_bytes"]
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, response, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, checking the shared tier on a local miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                self._discard(key)
+
+        if self.db is not None:
+            try:
+                doc = self.db.get_cached_response(key)
+            except Exception as e:
+                print(f"Error reading shared response cache: {str(e)}")
+                doc = None
+            if doc:
+                remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                with self._lock:
+                    self._store(key, doc["response"], now + remaining)
+                    self._stats["hits"] += 1
+                    self._stats["shared_hits"] += 1
+                return doc["response"]
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, response: str) -> None:
+        """Cache a response locally and in the shared tier"""
+        with self._lock:
+            self._store(key, response, time.monotonic() + self.ttl_seconds)
+            self._stats["stores"] += 1
+
+        if self.db is not None:
+            try:
+                self.db.save_cached_response(
+                    key, response, datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                )
+            except Exception as e:
+                print(f"Error writing shared response cache: {str(e)}")
+
+    def record_skip(self) -> None:
+        """Count a turn that was deliberately not cached (personal data)"""
+        with self._lock:
+            self._stats["skipped"] += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = stats.get("hits", 0) / lookups if lookups else 0.0
+        return stats
+
+    def _store(self, key: str, response: str, expires_at: float) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (expires_at, response, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
@@ -0,0 +1,295 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config.search_config import SEARCH_SETTINGS
+from services.metrics import get_metrics
+
+QUERY_CACHE = get_metrics().counter("search_query_cache_total", "Ranked-result cache lookups", ["result"])
+QUERY_CACHE_HITS = QUERY_CACHE.labels(result="hit")
+QUERY_CACHE_MISSES = QUERY_CACHE.labels(result="miss")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "of", "on", "or", "our", "the", "to", "we", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def job_field_text(job: dict, field: str) -> str:
+    """Flatten a job field (string or list) into searchable text"""
+    value = job.get(field)
+    if not value:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+class JobSearchIndex:
+    """In-memory inverted index over job documents with BM25 ranking"""
+
+    def __init__(self, field_boosts: Optional[Dict[str, float]] = None, k1: float = None, b: float = None):
+        self.field_boosts = field_boosts or SEARCH_SETTINGS["field_boosts"]
+        self.k1 = k1 if k1 is not None else SEARCH_SETTINGS["k1"]
+        self.b = b if b is not None else SEARCH_SETTINGS["b"]
+        self.prefix_weight = SEARCH_SETTINGS["prefix_weight"]
+        self.min_prefix_length = SEARCH_SETTINGS["min_prefix_length"]
+        self.max_prefix_expansions = SEARCH_SETTINGS["max_prefix_expansions"]
+        self.prefix_cache_size = SEARCH_SETTINGS["prefix_cache_size"]
+        self.query_cache_size = SEARCH_SETTINGS["query_cache_size"]
+
+        self._lock = threading.RLock()
+        self._reset()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, jobs: List[dict]) -> None:
+        """Replace the index contents with the given jobs"""
+        with self._lock:
+            self._reset()
+            for job in jobs:
+                self._add(job)
+
+    def add(self, job: dict) -> None:
+        """Index a job, replacing any previous version with the same _id"""
+        with self._lock:
+            self._remove(job["_id"])
+            self._add(job)
+
+    def remove(self, job_id) -> None:
+        """Drop a job from the index"""
+        with self._lock:
+            self._remove(job_id)
+
+    def apply_change(self, op: str, jobs: List[dict]) -> None:
+        """JobCatalog listener keeping the index in step with the catalog cache"""
+        if op == "reload":
+            self.build(jobs)
+        elif op == "upsert":
+            for job in jobs:
+                self.add(job)
+        elif op == "delete":
+            for job in jobs:
+                self.remove(job["_id"])
+
+    def search(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """Return jobs matching the query, best match first
+
+        The last query term also matches as a prefix so results update while
+        the candidate is still typing.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        prefix = terms[-1] if not query[-1:].isspace() and len(terms[-1]) >= self.min_prefix_length else None
+
+        depth = None if limit is None else offset + limit
+        key = (tuple(terms), prefix is not None, depth)
+        with self._lock:
+            ranked = self._query_cache.get(key)
+            if ranked is not None:
+                self._query_cache.move_to_end(key)
+                QUERY_CACHE_HITS.inc()
+            else:
+                QUERY_CACHE_MISSES.inc()
+                # One ranked list per query term; the prefix term merges its expansions
+                term_lists = [self._ranked(term) for term in (terms[:-1] if prefix else terms)]
+                if prefix:
+                    term_lists.append(self._ranked_prefix(prefix))
+                ranked = self._score_all(term_lists) if depth is None else self._top_k(term_lists, depth)
+                self._query_cache[key] = ranked
+                if len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+            hits = ranked[offset:] if depth is None else ranked[offset:depth]
+            return [self._docs[doc_id] for doc_id, _ in hits]
+
+    def _score_all(self, term_lists: List[list]) -> list:
+        if len(term_lists) == 1:
+            return term_lists[0]
+        scores: Dict[int, float] = {}
+        for ranked in term_lists:
+            for doc_id, score in ranked:
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _top_k(self, term_lists: List[list], k: int) -> list:
+        """Threshold-algorithm walk over impact-sorted lists, stopping once
+        no unseen document can still make the top k"""
+        if len(term_lists) == 1:
+            return term_lists[0][:k]
+
+        lookups = [self._score_maps[id(ranked)] for ranked in term_lists]
+        heap = []
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            exhausted = True
+            for ranked in term_lists:
+                if depth >= len(ranked):
+                    continue
+                exhausted = False
+                doc_id, score = ranked[depth]
+                threshold += score
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                total = sum(lookup.get(doc_id, 0.0) for lookup in lookups)
+                # Ties break toward earlier-indexed documents
+                entry = (total, -doc_id)
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+            depth += 1
+            if exhausted or (len(heap) == k and heap[0][0] >= threshold):
+                break
+        return [(-neg_id, total) for total, neg_id in sorted(heap, reverse=True)]
+
+    def _reset(self) -> None:
+        self._docs: Dict[int, dict] = {}
+        self._doc_ids: Dict[object, int] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self._sorted_terms: Optional[List[str]] = None
+        self._impact_cache: Dict[str, Dict[int, float]] = {}
+        self._ranked_cache: Dict[str, list] = {}
+        self._prefix_cache: "OrderedDict[str, list]" = OrderedDict()
+        # Random-access scores for each cached ranked list, keyed by id(list)
+        self._score_maps: Dict[int, Dict[int, float]] = {}
+        self._query_cache: "OrderedDict[tuple, list]" = OrderedDict()
+
+    def _add(self, job: dict) -> None:
+        doc_id = self._next_id
+        self._next_id += 1
+
+        # Field boosts are folded into the term frequency (a simplified BM25F)
+        weighted_tf: Dict[str, float] = {}
+        length = 0
+        for field, boost in self.field_boosts.items():
+            tokens = tokenize(job_field_text(job, field))
+            length += len(tokens)
+            for token in tokens:
+                weighted_tf[token] = weighted_tf.get(token, 0.0) + boost
+
+        self._docs[doc_id] = job
+        self._doc_ids[job["_id"]] = doc_id
+        self._doc_terms[doc_id] = weighted_tf
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in weighted_tf.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[doc_id] = tf
+        self._invalidate_scores()
+
+    def _remove(self, job_id) -> None:
+        doc_id = self._doc_ids.pop(job_id, None)
+        if doc_id is None:
+            return
+        del self._docs[doc_id]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+        self._invalidate_scores()
+
+    def _invalidate_scores(self) -> None:
+        # Corpus size and average length feed every score
+        self._impact_cache.clear()
+        self._ranked_cache.clear()
+        self._prefix_cache.clear()
+        self._score_maps.clear()
+        self._query_cache.clear()
+
+    def _impacts(self, term: str) -> Dict[int, float]:
+        """BM25 contribution of a term to each document containing it"""
+        impacts = self._impact_cache.get(term)
+        if impacts is not None:
+            return impacts
+
+        postings = self._postings.get(term)
+        if not postings:
+            return {}
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs if n_docs else 0.0
+        idf = math.log(1.0 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        k1, b = self.k1, self.b
+        lengths = self._doc_lengths
+
+        impacts = {}
+        for doc_id, tf in postings.items():
+            norm = k1 * (1.0 - b + b * lengths[doc_id] / avg_length) if avg_length else k1
+            impacts[doc_id] = idf * tf * (k1 + 1.0) / (tf + norm)
+        self._impact_cache[term] = impacts
+        return impacts
+
+    def _ranked(self, term: str) -> list:
+        """Documents containing the term, highest impact first (cached)"""
+        ranked = self._ranked_cache.get(term)
+        if ranked is None:
+            impacts = self._impacts(term)
+            ranked = self._rank(impacts)
+            self._ranked_cache[term] = ranked
+            self._score_maps[id(ranked)] = impacts
+        return ranked
+
+    def _ranked_prefix(self, prefix: str) -> list:
+        """Best score per document across terms starting with the prefix (cached)"""
+        ranked = self._prefix_cache.get(prefix)
+        if ranked is not None:
+            self._prefix_cache.move_to_end(prefix)
+            return ranked
+
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+
+        best: Dict[int, float] = dict(self._impacts(prefix))
+        start = bisect_left(terms, prefix)
+        expansions = 0
+        for i in range(start, len(terms)):
+            term = terms[i]
+            if not term.startswith(prefix):
+                break
+            if term == prefix:
+                continue
+            expansions += 1
+            if expansions > self.max_prefix_expansions:
+                break
+            for doc_id, score in self._impacts(term).items():
+                score *= self.prefix_weight
+                if score > best.get(doc_id, 0.0):
+                    best[doc_id] = score
+
+        ranked = self._rank(best)
+        self._prefix_cache[prefix] = ranked
+        self._score_maps[id(ranked)] = best
+        if len(self._prefix_cache) > self.prefix_cache_size:
+            _, evicted = self._prefix_cache.popitem(last=False)
+            del self._score_maps[id(evicted)]
+        return ranked
+
+    @staticmethod
+    def _rank(scores: Dict[int, float]) -> list:
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
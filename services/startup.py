@@ -0,0 +1,135 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from config.startup_config import STARTUP_SETTINGS
+
+# Taken when this module is first imported, which entry points do before any heavy import
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """How long each startup step took and when the process reached each milestone
+
+    Only the first run of a step is recorded; reruns that find the shared
+    services already built do not overwrite it.
+    """
+
+    def __init__(self, started: float = PROCESS_STARTED):
+        self.started = started
+        self._lock = threading.Lock()
+        self._steps: Dict[str, float] = {}
+        self._milestones: Dict[str, float] = {}
+        self._logged = False
+
+    @contextmanager
+    def step(self, name: str):
+        """Time the block as the named step"""
+        started = time.perf_counter()
+        yield
+        with self._lock:
+            self._steps.setdefault(name, time.perf_counter() - started)
+
+    def mark(self, milestone: str) -> None:
+        """Record the time since process start at which milestone was first reached"""
+        with self._lock:
+            self._milestones.setdefault(milestone, time.perf_counter() - self.started)
+
+    def reached(self, milestone: str) -> bool:
+        return milestone in self._milestones
+
+    def stats(self) -> dict:
+        """Step durations and milestone times in seconds"""
+        with self._lock:
+            stats = {f"{name}_seconds": seconds for name, seconds in self._steps.items()}
+            stats.update({f"{name}_at_seconds": seconds for name, seconds in self._milestones.items()})
+        return stats
+
+    def summary(self) -> str:
+        with self._lock:
+            milestones = ", ".join(f"{name} at {seconds:.2f} s" for name, seconds in self._milestones.items())
+            steps = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self._steps.items())
+        return f"Startup: {milestones or 'no milestones'} (steps: {steps or 'none'})"
+
+    def log(self) -> None:
+        """Print the summary once per process, when reporting is enabled"""
+        with self._lock:
+            if self._logged or not STARTUP_SETTINGS["report"]:
+                return
+            self._logged = True
+        print(self.summary())
+
+
+class Warmup:
+    """Runs build once, usually on a background thread; result() waits for what it returns"""
+
+    def __init__(self, build: Callable[[], Any], report: StartupReport):
+        self.build = build
+        self.report = report
+        self._done = threading.Event()
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+
+    def start(self) -> "Warmup":
+        """Run build on a background thread"""
+        threading.Thread(target=self.run, name="startup-warmup", daemon=True).start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self._done.is_set() and self._error is not None
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """What build returned, re-raising its error"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Startup warm-up is still running")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def run(self) -> None:
+        """Run build on the calling thread"""
+        try:
+            with self.report.step("warmup"):
+                self._result = self.build()
+            self.report.mark("services_ready")
+        except BaseException as e:
+            print(f"Error warming up services: {str(e)}")
+            self._error = e
+        finally:
+            self._done.set()
+        # Report once both the first page and the warm-up are done, whichever finishes last
+        if self.report.reached("first_page"):
+            self.report.log()
+
+
+_report = StartupReport()
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_startup_report() -> StartupReport:
+    """The process-wide startup report"""
+    return _report
+
+
+def start_warmup(build: Callable[[], Any], background: bool = True) -> Warmup:
+    """Run build once per process, and again after a failed attempt
+
+    In the background by default; with background=False it runs on the
+    calling thread before this returns.
+    """
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None or _warmup.failed:
+            _warmup = Warmup(build, _report)
+            if background:
+                _warmup.start()
+            else:
+                _warmup.run()
+        return _warmup
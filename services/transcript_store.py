@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from config.db_config import TRANSCRIPT_SETTINGS
+
+# (bucket _id, index): the position just after the next older message
+TranscriptCursor = Tuple[object, int]
+
+
+@dataclass
+class TranscriptPage:
+    """Messages oldest first; before is the cursor for the page preceding them, None at the start"""
+    messages: List[dict] = field(default_factory=list)
+    before: Optional[TranscriptCursor] = None
+
+
+class TranscriptStore:
+    """Chat transcripts per session, stored as capped buckets of messages
+
+    Each append is a single $push into the session's open bucket, so a turn
+    costs one write however long the conversation is. Reads walk buckets
+    newest first and touch only as many as the requested window needs.
+    """
+
+    def __init__(
+        self,
+        db,
+        bucket_size: Optional[int] = None,
+        max_buckets: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.db = db
+        self.bucket_size = bucket_size or TRANSCRIPT_SETTINGS["bucket_size"]
+        self.max_buckets = max_buckets or TRANSCRIPT_SETTINGS["max_buckets"]
+        self.ttl_seconds = ttl_seconds or TRANSCRIPT_SETTINGS["ttl_seconds"]
+
+    def append(self, session_id: str, messages: List[dict]) -> None:
+        """Add messages ({"role", "content"}) to the end of the session's transcript"""
+        if not messages:
+            return
+        now = datetime.utcnow()
+        documents = [{"role": m.get("role"), "content": m.get("content"), "at": now} for m in messages]
+        try:
+            started = self.db.append_transcript(
+                session_id, documents, self.bucket_size, now + timedelta(seconds=self.ttl_seconds)
+            )
+            if started is not None:
+                # Only a new bucket can push the session past its cap
+                self.db.trim_transcript(session_id, self.max_buckets)
+        except Exception as e:
+            print(f"Error saving transcript: {str(e)}")
+
+    def recent(self, session_id: str, limit: Optional[int] = None) -> TranscriptPage:
+        """The latest messages of the session"""
+        return self._page(session_id, None, limit or TRANSCRIPT_SETTINGS["window"])
+
+    def earlier(self, session_id: str, before: TranscriptCursor, limit: Optional[int] = None) -> TranscriptPage:
+        """The messages preceding a page, given its before cursor"""
+        return self._page(session_id, before, limit or TRANSCRIPT_SETTINGS["page_size"])
+
+    def _page(self, session_id: str, before: Optional[TranscriptCursor], limit: int) -> TranscriptPage:
+        # Enough buckets for the page, plus one to tell whether older messages remain
+        bucket_count = -(-limit // self.bucket_size) + 1
+        try:
+            buckets = self.db.get_transcript_buckets(
+                session_id,
+                before_id=before[0] if before else None,
+                inclusive=bool(before and before[1] > 0),
+                limit=bucket_count
+            )
+        except Exception as e:
+            print(f"Error loading transcript: {str(e)}")
+            return TranscriptPage()
+
+        chunks = []
+        needed = limit
+        cursor = None
+        for position, bucket in enumerate(buckets):
+            messages = bucket.get("messages", [])
+            end = before[1] if before and bucket["_id"] == before[0] else len(messages)
+            start = max(0, end - needed)
+            chunks.append(messages[start:end])
+            needed -= end - start
+            if needed == 0:
+                if start > 0:
+                    cursor = (bucket["_id"], start)
+                elif position + 1 < len(buckets):
+                    cursor = (bucket["_id"], 0)
+                break
+        else:
+            if buckets and len(buckets) == bucket_count:
+                # Undersized buckets ran out before the page filled up
+                cursor = (buckets[-1]["_id"], 0)
+
+        messages = [
+            {"role": message["role"], "content": message["content"]}
+            for chunk in reversed(chunks)
+            for message in chunk
+        ]
+        return TranscriptPage(messages=messages, before=cursor)
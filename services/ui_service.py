@@ -1,6 +1,13 @@
 import streamlit as st
 from datetime import datetime
 
+# Facet filters shown above job lists, with their labels
+FILTER_LABELS = {
+    "categories": "Category",
+    "location": "Location",
+    "type": "Type",
+}
+
 class UIService:
     def __init__(self, job_service):
         self.job_service = job_service
@@ -14,50 +21,101 @@ class UIService:
                 st.write(message["content"])
 
     def display_open_positions(self):
-        """Display all open positions in a dedicated section"""
+        """Display open positions, one page at a time, in a dedicated section"""
         st.header("📋 Open Positions")
         
-        # Get all jobs from the job service
-        all_jobs = self.job_service.match_jobs("")  # Empty string to get all jobs
-        st.write(f"DEBUG: Found {len(all_jobs)} jobs")  # Debug print
+        # Category, location and type filters with cached job counts
+        filters = self.display_job_filters(key="open_positions", columns=3)
+        
+        # Only the current page of job summaries is fetched
+        page = self.get_job_page(filters=filters, key="open_positions")
         
-        if not all_jobs:
-            st.warning("No jobs found in the database. Please add some jobs first.")
+        if not page.jobs:
+            if any(filters.values()):
+                st.info("No positions match these filters.")
+            else:
+                st.warning("No jobs found in the database. Please add some jobs first.")
             return
             
-        # Create columns for job categories
+        # Distribute this page's jobs across three columns
         cols = st.columns(3)
+        for idx, job in enumerate(page.jobs):
+            with cols[idx % 3]:
+                with st.expander(f"{job['title']} - {job.get('location', 'No location')}"):
+                    st.write(f"**Type:** {job.get('type', 'Not specified')}")
+                    categories = job.get('categories')
+                    if categories:
+                        if isinstance(categories, str):
+                            categories = [categories]  # Convert string to list if necessary
+                        st.write(f"**Categories:** {', '.join(categories)}")
+                    self.display_job_description(job, key="open_positions")
+                    if st.button("Learn More", key=f"learn_more_{job['_id']}"):
+                        st.session_state.selected_job = job['title']
         
-        # Group jobs by category
-        jobs_by_category = {}
-        for job in all_jobs:
-            categories = job.get('categories', ['Uncategorized'])
-            if isinstance(categories, str):
-                categories = [categories]  # Convert string to list if necessary
-            
-            for category in categories:
-                if category not in jobs_by_category:
-                    jobs_by_category[category] = []
-                jobs_by_category[category].append(job)
-        
-        st.write(f"DEBUG: Categories found: {list(jobs_by_category.keys())}")  # Debug print
-        
-        # Distribute categories across columns
-        categories = list(jobs_by_category.keys())
-        for idx, category in enumerate(categories):
-            col_idx = idx % 3
-            with cols[col_idx]:
-                st.subheader(category)
-                for job in jobs_by_category[category]:
-                    with st.expander(f"{job['title']} - {job.get('location', 'No location')}"):
-                        st.write(f"**Type:** {job.get('type', 'Not specified')}")
-                        if job.get('description'):
-                            st.write("**Description:**")
-                            st.write(job['description'][:200] + "..." if len(job['description']) > 200 else job['description'])
-                        if job.get('apply_url'):
-                            st.write(f"[Apply Here]({job['apply_url']})")
-                        if st.button("Learn More", key=f"learn_more_{job['title']}_{idx}"):
-                            st.session_state.selected_job = job['title']
+        self.display_page_controls(page, key="open_positions")
+
+    def display_job_filters(self, key="jobs", columns=1):
+        """Select boxes for the facet filters; returns the chosen field -> value"""
+        facets = self.job_service.get_facets()
+        filters = {}
+        cols = st.columns(columns)
+        for idx, (field, label) in enumerate(FILTER_LABELS.items()):
+            counts = dict(facets.get(field, []))
+            if not counts:
+                continue
+            with cols[idx % columns]:
+                filters[field] = st.selectbox(
+                    label,
+                    [None] + list(counts),
+                    format_func=lambda value, counts=counts: "All" if value is None else f"{value} ({counts[value]})",
+                    key=f"{key}_filter_{field}"
+                )
+        return filters
+
+    def get_job_page(self, query="", filters=None, key="jobs"):
+        """Current page of a paged job list; a new query or filter starts again at page one"""
+        filters = {field: value for field, value in (filters or {}).items() if value is not None}
+        state = st.session_state.get(f"{key}_pages")
+        if state is None or state["query"] != query or state["filters"] != filters:
+            # Cursors of the pages visited so far, so the candidate can page back
+            state = {"query": query, "filters": filters, "cursors": [None]}
+            st.session_state[f"{key}_pages"] = state
+        return self.job_service.get_job_page(query, cursor=state["cursors"][-1], filters=filters)
+
+    def display_page_controls(self, page, key="jobs"):
+        """Previous/Next buttons for a list paged with get_job_page"""
+        cursors = st.session_state[f"{key}_pages"]["cursors"]
+        if len(cursors) == 1 and page.next_cursor is None:
+            return
+        prev_col, page_col, next_col = st.columns([1, 1, 1])
+        with prev_col:
+            if st.button("◀ Previous", key=f"{key}_previous", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with page_col:
+            st.caption(f"Page {len(cursors)}")
+        with next_col:
+            if st.button("Next ▶", key=f"{key}_next", disabled=page.next_cursor is None, use_container_width=True):
+                cursors.append(page.next_cursor)
+                st.rerun()
+
+    def display_job_description(self, job, key="jobs"):
+        """A job's snippet; the full description is fetched once the candidate asks for it"""
+        open_jobs = st.session_state.setdefault(f"{key}_open_descriptions", set())
+        if job["_id"] in open_jobs:
+            details = self.job_service.get_job_details(job["_id"]) or {}
+            if details.get("description"):
+                st.markdown("**Description:**")
+                st.markdown(details["description"])
+            if details.get("apply_url"):
+                st.markdown(f"[Apply Here]({details['apply_url']})")
+            return
+        if job.get("snippet"):
+            st.markdown("**Description:**")
+            st.markdown(job["snippet"])
+        if st.button("Read full description", key=f"{key}_describe_{job['_id']}"):
+            open_jobs.add(job["_id"])
+            st.rerun()
 
     def display_jobs(self, matched_jobs):
         """
@@ -0,0 +1,96 @@
+import pytest
+
+from models.session_data import STAGE_NOT_ELIGIBLE, SessionDataManager
+from services.application_flow import (
+    ApplicationFlow,
+    extract_age_consent,
+    extract_name,
+    extract_shift,
+    extract_yes_no,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("yes", True),
+    ("Yep, I am", True),
+    ("No problem", True),
+    ("no worries", True),
+    ("no", False),
+    ("No.", False),
+    ("no, I'm not", False),
+    ("nope", False),
+    ("I do not", False),
+    ("absolutely not", False),
+    ("of course not", False),
+    ("I will not", False),
+    ("I'm from India", None),
+    ("I am a student", None),
+    ("sure, but I can't", None),
+    ("maybe", None),
+    ("no idea what that means", None),
+])
+def test_extract_yes_no(text, expected):
+    assert extract_yes_no(text) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I'm 25", True),
+    ("16", True),
+    ("I'm 15", False),
+    ("yes", True),
+    ("I am under 16", None),
+    ("not yet 16", None),
+    ("below 16", None),
+    ("I'm 15 and 16", None),
+    ("I'm fifteen", None),
+    ("sixteen", None),
+    ("I am twenty one", None),
+    ("I do not", False),
+    ("I am a student", None),
+])
+def test_extract_age_consent(text, expected):
+    assert extract_age_consent(text) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Morning", "Morning"),
+    ("nights please", "Night"),
+    ("7am start", "Morning"),
+    ("after 10 p.m.", "Night"),
+    ("I am flexible", None),
+    ("I am ok with any", None),
+    ("either is fine", None),
+    ("not mornings", None),
+])
+def test_extract_shift(text, expected):
+    assert extract_shift(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("john smith", "John Smith"),
+    ("My name is Maria Lopez", "Maria Lopez"),
+    ("I'm Will Turner", "Will Turner"),
+    ("tell me more", None),
+    ("whats the salary", None),
+    ("what's the pay?", None),
+    ("Dallas?", None),
+    ("show me other jobs", None),
+    ("I'm fifteen", None),
+    ("y", None),
+    ("I'm from India", None),
+    ("Forklift Operator", None),
+    ("Maria", None),
+    ("J Smith", None),
+])
+def test_extract_name(text, expected):
+    assert extract_name(text) == expected
+
+
+def test_negative_country_answer_ends_the_application():
+    flow = ApplicationFlow(SessionDataManager())
+    flow.session_manager.start_application("s1", "Forklift Operator")
+    for answer in ("Maria Lopez", "555 123 4567", "maria@example.com", "I'm 25"):
+        flow.handle("s1", answer)
+    assert flow.session_manager.get_application_stage("s1") == "country_consent"
+    flow.handle("s1", "I do not")
+    assert flow.session_manager.get_application_stage("s1") == STAGE_NOT_ELIGIBLE
@@ -0,0 +1,245 @@
+"""Local OpenAI-compatible chat completions server for exercising the LLM clients
+
+Serves POST /chat/completions (and /v1/chat/completions), plain or as SSE
+when the request sets "stream": true, with optional injected latency,
+slow outliers, 5xx failures and 429 rate limits. GET /v1/stats returns the request counters. Point the app at it with the
+DEEPSEEK_BASE_URL secret, or start it in-process:
+
+    with FakeOpenAIServer(latency=0.2, failure_rate=0.1) as base_url:
+        client = AsyncLLMClient(base_url=base_url, api_key="test")
+
+Run standalone with: python -m tools.fake_openai_server --port 8089
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_REPLY = (
+    "Thanks for your interest! 😊 Please take a look at the available positions "
+    "on the right and click 'I'm Interested' on the role you'd like to apply for."
+)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 stalls bursts of concurrent connections
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response (deadlines, cancellation) are expected
+        pass
+
+
+class FakeOpenAIServer:
+    """Threaded fake of the chat completions endpoint"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        reply: str = DEFAULT_REPLY,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        failure_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        # A fraction of requests waits slow_latency longer, for a latency tail
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> str:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _delay(self) -> float:
+        if not self.slow_rate:
+            return self.latency
+        with self._lock:
+            if self._random.random() >= self.slow_rate:
+                return self.latency
+            self.stats["slow"] += 1
+        return self.latency + self.slow_latency
+
+    def _outcome(self) -> str:
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                outcome = "rate_limited"
+            elif roll < self.rate_limit_rate + self.failure_rate:
+                outcome = "failed"
+            else:
+                outcome = "ok"
+            self.stats[outcome] += 1
+            return outcome
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so client connection pooling is exercised
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                # Request counters, for load tools running in another process
+                if self.path.rstrip("/").endswith("/stats"):
+                    with server._lock:
+                        stats = dict(server.stats)
+                    self._send_json(200, stats)
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                request = json.loads(body or b"{}")
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+
+                outcome = server._outcome()
+                if outcome == "rate_limited":
+                    self._send_json(429, {"error": {"message": "rate limited", "type": "rate_limit"}},
+                                    {"Retry-After": "0"})
+                elif outcome == "failed":
+                    self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                elif request.get("stream"):
+                    self._stream(request)
+                else:
+                    self._send_json(200, self._completion(request))
+
+            def _completion(self, request):
+                return {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": server.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }
+
+            def _stream(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                tokens = [word + " " for word in server.reply.split(" ")]
+                tokens[-1] = tokens[-1].rstrip()
+                for token in tokens + [None]:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "fake"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": token} if token is not None else {},
+                            "finish_reason": None if token is not None else "stop",
+                        }],
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                    if server.token_delay and token is not None:
+                        time.sleep(server.token_delay)
+                self._write_chunk("data: [DONE]\n\n")
+                self._write_chunk("")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Extra seconds before slow responses")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        host=args.host,
+        port=args.port,
+        reply=args.reply,
+        latency=args.latency,
+        token_delay=args.token_delay,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+    )
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()